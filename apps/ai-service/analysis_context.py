@@ -0,0 +1,153 @@
+"""
+Analysis Context Module
+Decode-once image context shared by the report's analysis functions.
+
+An upload used to be decoded from disk by every metric (basic / advanced
+metrics, dominant colors, each cognitive marketing check, feature congestion)
+and the saliency PNG was re-read several times. An `AnalysisContext` decodes
+the image and the saliency map once and derives the gray / HSV / LAB / RGB
+planes lazily, so each plane is computed at most once per report.
+
+Analysis functions accept either paths (thin wrappers, unchanged behaviour)
+or a context; `as_context` normalizes both.
+
+The saliency plane comes from the model's float saliency map (passed in, or
+read from the float16 `.npy` sidecar written next to the overlay), not from
+the JET overlay PNG, which is only meant for display. Overlays without a
+sidecar (e.g. from older analyses) fall back to the overlay's grayscale.
+"""
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+class AnalysisContext:
+    def __init__(self, image_path=None, saliency_map_path=None, bgr=None, saliency=None, saliency_density=None, scanpaths=None, rgb=None):
+        """
+        Args:
+            image_path (str, optional): Original image; decoded on first access if neither
+                `bgr` nor `rgb` is given.
+            saliency_map_path (str, optional): Saliency overlay written by the model; its
+                density sidecar is loaded on first access.
+            bgr (np.ndarray, optional): Already decoded (H, W, 3) BGR image.
+            saliency (np.ndarray, optional): Already computed (H, W) uint8 saliency map.
+            saliency_density (np.ndarray, optional): (H, W) float saliency map in [0, 1]
+                as returned by `SaliencyModel.predict_result`.
+            scanpaths (np.ndarray, optional): (scanpaths, fixations, 2) simulated (x, y)
+                fixations (see `ScanpathEngine.simulate`).
+            rgb (np.ndarray, optional): Already decoded (H, W, 3) RGB image (e.g. the
+                upload as decoded for the model, see upload_ingest.py).
+        """
+        self.image_path = image_path
+        self.saliency_map_path = saliency_map_path
+        self.saliency_density = saliency_density
+        self.scanpaths = scanpaths
+
+        self._planes = {}
+        if bgr is not None:
+            self._planes["bgr"] = bgr
+        if rgb is not None:
+            self._planes["rgb"] = rgb
+        if saliency is not None:
+            self._planes["saliency"] = saliency
+
+        # Report stages read the context from several threads at once
+        self._lock = threading.RLock()
+
+    def _plane(self, name, compute):
+        plane = self._planes.get(name)
+        if plane is None:
+            with self._lock:
+                plane = self._planes.get(name)
+                if plane is None:
+                    plane = compute()
+                    self._planes[name] = plane
+        return plane
+
+    def _load_bgr(self):
+        if "rgb" in self._planes:
+            return cv2.cvtColor(self._planes["rgb"], cv2.COLOR_RGB2BGR)
+        if self.image_path is None:
+            raise ValueError("AnalysisContext has no image")
+        img = cv2.imread(self.image_path)
+        if img is None:
+            raise ValueError(f"Could not load image: {self.image_path}")
+        return img
+
+    def _load_saliency(self):
+        if self.saliency_density is None and self.saliency_map_path is not None:
+            self.saliency_density = load_density_sidecar(self.saliency_map_path)
+        if self.saliency_density is not None:
+            return (np.clip(self.saliency_density, 0, 1) * 255).astype(np.uint8)
+
+        if self.saliency_map_path is None:
+            raise ValueError("AnalysisContext has no saliency map")
+        # Legacy overlays without a density sidecar
+        saliency = cv2.imread(self.saliency_map_path, cv2.IMREAD_GRAYSCALE)
+        if saliency is None:
+            raise ValueError(f"Could not load saliency map: {self.saliency_map_path}")
+        return saliency
+
+    @property
+    def bgr(self):
+        return self._plane("bgr", self._load_bgr)
+
+    @property
+    def rgb(self):
+        return self._plane("rgb", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def gray(self):
+        return self._plane("gray", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self):
+        return self._plane("hsv", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2HSV))
+
+    @property
+    def lab(self):
+        return self._plane("lab", lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2LAB))
+
+    @property
+    def saliency(self):
+        """
+        Saliency map as an (H, W) uint8 image (saliency * 255).
+        """
+        return self._plane("saliency", self._load_saliency)
+
+def density_sidecar_path(saliency_map_path):
+    """
+    Path of the float16 saliency sidecar stored next to a saliency overlay.
+    """
+    return os.path.splitext(saliency_map_path)[0] + ".npy"
+
+def save_density_sidecar(saliency_map_path, saliency):
+    """
+    Persists a [0, 1] saliency map next to its overlay as float16 `.npy`.
+    """
+    path = density_sidecar_path(saliency_map_path)
+    np.save(path, saliency.astype(np.float16))
+    return path
+
+def load_density_sidecar(saliency_map_path):
+    """
+    Loads the float32 saliency map stored next to an overlay, or None if there is none.
+    """
+    path = density_sidecar_path(saliency_map_path)
+    if not os.path.exists(path):
+        return None
+    return np.load(path).astype(np.float32)
+
+def as_context(image, saliency=None):
+    """
+    Returns the AnalysisContext passed in either argument, or builds one from
+    an image path / BGR array and a saliency map path.
+    """
+    for value in (image, saliency):
+        if isinstance(value, AnalysisContext):
+            return value
+    if isinstance(image, np.ndarray):
+        return AnalysisContext(bgr=image, saliency_map_path=saliency)
+    return AnalysisContext(image_path=image, saliency_map_path=saliency)
@@ -0,0 +1,95 @@
+"""
+Latency vs. cores of sequential and parallel DeepGaze IIE backbone execution.
+
+For every core count the process is pinned to that many CPUs (Linux) and the
+model runs either sequentially with all of them as intra-op threads, or with
+the backbones in parallel (`MixtureModel.parallel`, see
+SALIENCY_PARALLEL_BACKBONES) sharing them. Prints a markdown table:
+
+    python benchmark_parallel.py --cores 1,2,4,8,16 --height 1080 --width 1920
+"""
+
+import argparse
+import os
+import time
+
+import torch
+
+import deepgaze_pytorch
+
+
+def time_model(model, image, centerbias, repeats):
+    """
+    Fastest of `repeats` forward passes (after one warm-up pass), in seconds.
+    """
+    with torch.no_grad():
+        model(image, centerbias)
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model(image, centerbias)
+            durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def benchmark_parallel(model, core_counts, size=(1080, 1920), repeats=3):
+    """
+    Returns:
+        list: one dict per core count with the sequential and parallel latency.
+    """
+    h, w = size
+    image = torch.randint(0, 255, (1, 3, h, w)).float()
+    centerbias = torch.zeros(1, h, w)
+    backbones = len(model.models)
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+
+    rows = []
+    for cores in core_counts:
+        if available is not None:
+            os.sched_setaffinity(0, available[:cores])
+
+        model.parallel = 0
+        torch.set_num_threads(cores)
+        sequential = time_model(model, image, centerbias, repeats)
+
+        workers = min(backbones, cores)
+        model.parallel = workers
+        torch.set_num_threads(max(1, cores // workers))
+        parallel = time_model(model, image, centerbias, repeats)
+
+        rows.append({"cores": cores, "workers": workers, "threads": max(1, cores // workers),
+                     "sequential": sequential, "parallel": parallel})
+
+    if available is not None:
+        os.sched_setaffinity(0, available)
+    model.parallel = 0
+    return rows
+
+
+def markdown_table(rows):
+    lines = [
+        "| Cores | Sequential (s) | Parallel (s) | Workers x threads | Speedup |",
+        "|-------|----------------|--------------|-------------------|---------|",
+    ]
+    for row in rows:
+        lines.append(f"| {row['cores']} | {row['sequential']:.3f} | {row['parallel']:.3f} | {row['workers']} x {row['threads']} "
+                     f"| {row['sequential'] / row['parallel']:.2f}x |")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parallel DeepGaze IIE backbone execution")
+    parser.add_argument("--cores", default="1,2,4,8,16", help="Comma-separated core counts")
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    core_counts = [cores for cores in (int(value) for value in args.cores.split(",")) if cores <= cpu_count]
+
+    model = deepgaze_pytorch.DeepGazeIIE(pretrained=True).eval()
+    model = model.prune().fused()
+    rows = benchmark_parallel(model, core_counts, size=(args.height, args.width), repeats=args.repeats)
+    print(f"DeepGaze IIE at {args.width}x{args.height}, {cpu_count} CPU(s) available")
+    print(markdown_table(rows))
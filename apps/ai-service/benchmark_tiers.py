@@ -0,0 +1,90 @@
+"""
+Latency vs. accuracy of the DeepGaze IIE model tiers (see saliency_engine.MODEL_TIERS).
+
+Every tier predicts the same screenshots through a SaliencyEngine with its
+cache disabled. Accuracy is LL / NSS / AUC against fixations sampled from
+the full model's prediction (see quantization.score_predictions), so "full"
+is the reference row. Prints a markdown table for ENHANCEMENTS.md:
+
+    python benchmark_tiers.py --images datasets/calibration --max-images 16
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from quantization import load_images, score_predictions
+from saliency_engine import MODEL_TIERS, SaliencyEngine
+
+
+def benchmark_tiers(engine, images, tiers=None, precision="fp32", repeats=1, fixations_per_image=200):
+    """
+    Returns:
+        list: one dict per tier with its latency (mean seconds per image) and mean metrics.
+    """
+    tiers = tiers or list(MODEL_TIERS)
+    timings = {tier: [] for tier in tiers}
+
+    def timed(tier):
+        def predict(img_np):
+            durations = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                log_density = engine.log_density(img_np, precision, tier)
+                durations.append(time.perf_counter() - start)
+            timings[tier].append(min(durations))
+            return log_density
+        return predict
+
+    # Warm up: builds the tier models and prepares the center bias
+    for tier in tiers:
+        engine.log_density(images[0], precision, tier)
+
+    scores = score_predictions(images, {tier: timed(tier) for tier in tiers}, reference="full" if "full" in tiers else tiers[0],
+                               fixations_per_image=fixations_per_image)
+
+    rows = []
+    for tier in tiers:
+        served_precision, served_tier = engine.resolve(precision, tier)
+        backbones, components = MODEL_TIERS[served_tier]
+        rows.append({
+            "tier": tier,
+            "served": f"{served_tier}/{served_precision}",
+            "backbones": len(backbones) if backbones is not None else "all",
+            "components": components or "all",
+            "latency": float(np.mean(timings[tier])),
+            **scores[tier],
+        })
+    return rows
+
+
+def markdown_table(rows):
+    reference = next((row["latency"] for row in rows if row["tier"] == "full"), None)
+    lines = [
+        "| Tier | Served | Backbones | Components | Latency (s) | Speedup | LL | NSS | AUC |",
+        "|------|--------|-----------|------------|-------------|---------|----|-----|-----|",
+    ]
+    for row in rows:
+        speedup = f"{reference / row['latency']:.2f}x" if reference else "-"
+        lines.append(f"| {row['tier']} | {row['served']} | {row['backbones']} | {row['components']} | {row['latency']:.3f} | {speedup} "
+                     f"| {row['ll']:.4f} | {row['nss']:.4f} | {row['auc']:.4f} |")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the DeepGaze model tiers")
+    parser.add_argument("--images", required=True, help="Folder of UI screenshots")
+    parser.add_argument("--max-images", type=int, default=16)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--precision", default="fp32", choices=["fp32", "bf16", "int8"])
+    parser.add_argument("--repeats", type=int, default=1, help="Timed runs per image (the fastest counts)")
+    args = parser.parse_args()
+
+    engine = SaliencyEngine(cache_mb=0)
+    images = load_images(args.images, size=(args.height, args.width), max_images=args.max_images)
+    rows = benchmark_tiers(engine, images, precision=args.precision, repeats=args.repeats)
+    print(f"{len(images)} screenshot(s) at {args.width}x{args.height}, {torch.get_num_threads()} thread(s), {engine.device}")
+    print(markdown_table(rows))
@@ -0,0 +1,108 @@
+"""
+Center Bias Module
+Memoized log center bias for DeepGaze.
+
+DeepGaze needs the MIT1003 center-bias template rescaled to the exact image
+size and renormalized as a log density. That zoom + logsumexp used to run on
+every request; `CenterBiasProvider` keeps the result per (H, W) in an LRU with
+a byte budget (screenshots come in a handful of viewport sizes), can
+precompute the common viewport sizes at startup, and hands out ready-made
+torch tensors on the inference device.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+from scipy.ndimage import zoom
+from scipy.special import logsumexp
+
+# (height, width) of common desktop / laptop / mobile viewports
+COMMON_VIEWPORTS = [
+    (1080, 1920),
+    (900, 1440),
+    (768, 1366),
+    (800, 1280),
+    (1440, 2560),
+    (844, 390),
+    (932, 430),
+    (1024, 768),
+]
+
+class CenterBiasProvider:
+    def __init__(self, template=None, template_path="centerbias_mit1003.npy", cache_mb=None):
+        """
+        Args:
+            template (np.ndarray, optional): Log center-bias template (default: loaded from `template_path`).
+            template_path (str): Template file; a uniform bias is used if it is missing.
+            cache_mb (int, optional): Byte budget of the LRU (default: CENTERBIAS_CACHE_MB env var or 128).
+        """
+        if template is None:
+            if os.path.exists(template_path):
+                template = np.load(template_path)
+            else:
+                print("Warning: Center bias file not found. Using uniform bias.")
+                template = np.zeros((1024, 1024))
+        self.template = template
+
+        self.cache_bytes = (cache_mb or int(os.getenv("CENTERBIAS_CACHE_MB", 128))) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_size = 0
+
+    def log_centerbias(self, h, w):
+        """
+        Returns the (h, w) log center bias (read-only; copy before modifying in place).
+        """
+        key = ("numpy", h, w)
+        centerbias = self._get(key)
+        if centerbias is None:
+            centerbias = zoom(self.template, (h/self.template.shape[0], w/self.template.shape[1]), order=0, mode='nearest')
+            centerbias -= logsumexp(centerbias)
+            centerbias.setflags(write=False)
+            self._put(key, centerbias, centerbias.nbytes)
+        return centerbias
+
+    def tensor(self, h, w, device="cpu"):
+        """
+        Returns the (1, h, w) log center bias as a torch tensor on `device`.
+        The tensor is shared between callers and must not be modified in place.
+        """
+        device = torch.device(device)
+        key = ("tensor", str(device), h, w)
+        centerbias = self._get(key)
+        if centerbias is None:
+            centerbias = torch.from_numpy(np.array(self.log_centerbias(h, w))[np.newaxis]).to(device)
+            self._put(key, centerbias, centerbias.element_size() * centerbias.nelement())
+        return centerbias
+
+    def precompute(self, sizes=None, device=None):
+        """
+        Fills the cache for `sizes` (default: COMMON_VIEWPORTS), as tensors on `device` if given.
+        """
+        for h, w in sizes or COMMON_VIEWPORTS:
+            if device is None:
+                self.log_centerbias(h, w)
+            else:
+                self.tensor(h, w, device)
+
+    def _get(self, key):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+            return value[0] if value is not None else None
+
+    def _put(self, key, value, size):
+        if size > self.cache_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                self._cache_size -= self._cache.pop(key)[1]
+            self._cache[key] = (value, size)
+            self._cache_size += size
+            while self._cache_size > self.cache_bytes:
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cache_size -= evicted_size
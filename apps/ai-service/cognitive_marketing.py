@@ -6,16 +6,19 @@ Strictly adheres to visually verifiable data (Saliency, Edges, Colors).
 
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
 
-def analyze_whitespace_ratio(image_path: str) -> Dict:
+from analysis_context import AnalysisContext, as_context
+
+ImageSource = Union[str, AnalysisContext]
+
+def analyze_whitespace_ratio(image_path: ImageSource) -> Dict:
     """
     Analyze whitespace/negative space ratio.
     Ground Truth: Pixel intensity analysis.
     Scientific Basis: Lin (2004) - Whitespace improves comprehension.
     """
-    img = cv2.imread(image_path)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = as_context(image_path).gray
     
     # Threshold to identify "empty" areas (near white/light)
     _, binary = cv2.threshold(gray, 240, 255, cv2.THRESH_BINARY)
@@ -46,19 +49,19 @@ def analyze_whitespace_ratio(image_path: str) -> Dict:
     }
 
 
-def detect_cta_placement(image_path: str, saliency_map_path: str) -> Dict:
+def detect_cta_placement(image_path: ImageSource, saliency_map_path: str = None) -> Dict:
     """
     Detect likely CTA button positions using visual saliency and saturation.
     Ground Truth: Saliency map intensity + Color saturation.
     """
-    img = cv2.imread(image_path)
-    h, w = img.shape[:2]
+    ctx = as_context(image_path, saliency_map_path)
+    h, w = ctx.bgr.shape[:2]
     
     # Load saliency map
-    saliency = cv2.imread(saliency_map_path, cv2.IMREAD_GRAYSCALE)
+    saliency = ctx.saliency
     
     # Identify highly saturated regions (likely CTAs)
-    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    hsv = ctx.hsv
     saturation = hsv[:, :, 1]
     
     # High saturation + high value = likely CTA
@@ -115,14 +118,13 @@ def detect_cta_placement(image_path: str, saliency_map_path: str) -> Dict:
     }
 
 
-def analyze_visual_hierarchy(image_path: str) -> Dict:
+def analyze_visual_hierarchy(image_path: ImageSource) -> Dict:
     """
     Analyze size-based visual hierarchy.
     Ground Truth: Contour area distribution.
     Scientific Basis: Gestalt Principle of Size.
     """
-    img = cv2.imread(image_path)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = as_context(image_path).gray
     
     # Edge detection to find content blocks
     edges = cv2.Canny(gray, 50, 150)
@@ -170,14 +172,15 @@ def analyze_visual_hierarchy(image_path: str) -> Dict:
 
 from feature_congestion import compute_feature_congestion
 
-def analyze_visual_complexity(image_path: str) -> Dict:
+def analyze_visual_complexity(image_path: ImageSource) -> Dict:
     """
     Analyze Visual Complexity using Rosenholtz's Feature Congestion model.
     Replaces legacy edge density method.
     """
+    ctx = as_context(image_path)
     try:
         # Use the new Feature Congestion module
-        fc_data = compute_feature_congestion(image_path)
+        fc_data = compute_feature_congestion(ctx)
         
         return {
             "complexity_score": fc_data["complexity_score"],
@@ -193,8 +196,7 @@ def analyze_visual_complexity(image_path: str) -> Dict:
     except Exception as e:
         print(f"Feature Congestion analysis failed: {e}")
         # Fallback to simple edge density if FC fails
-        img = cv2.imread(image_path)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = ctx.gray
         edges = cv2.Canny(gray, 100, 200)
         edge_density = np.count_nonzero(edges) / edges.size
         score = min(100, edge_density * 500)
@@ -206,13 +208,13 @@ def analyze_visual_complexity(image_path: str) -> Dict:
             "recommendation": "Simplify layout."
         }
 
-def analyze_saliency_distribution(saliency_map_path: str) -> Dict:
+def analyze_saliency_distribution(saliency_map_path: ImageSource) -> Dict:
     """
     Analyze how attention is distributed across the layout.
     Replaces 'Scroll Depth Prediction' with verifiable attention distribution.
     Ground Truth: Saliency map pixel intensity.
     """
-    saliency = cv2.imread(saliency_map_path, cv2.IMREAD_GRAYSCALE)
+    saliency = as_context(None, saliency_map_path).saliency
     h, w = saliency.shape
     
     # Divide into vertical thirds
@@ -243,16 +245,18 @@ def analyze_saliency_distribution(saliency_map_path: str) -> Dict:
     }
 
 
-def generate_cognitive_marketing_analysis(image_path: str, saliency_map_path: str) -> Dict:
+def generate_cognitive_marketing_analysis(image_path: ImageSource, saliency_map_path: str = None) -> Dict:
     """
     Main function to run all cognitive marketing analyses.
+    The image and saliency map are decoded once and shared by every analysis.
     """
+    ctx = as_context(image_path, saliency_map_path)
     return {
-        "whitespace": analyze_whitespace_ratio(image_path),
-        "cta_placement": detect_cta_placement(image_path, saliency_map_path),
-        "visual_hierarchy": analyze_visual_hierarchy(image_path),
-        "visual_complexity": analyze_visual_complexity(image_path),
-        "saliency_distribution": analyze_saliency_distribution(saliency_map_path)
+        "whitespace": analyze_whitespace_ratio(ctx),
+        "cta_placement": detect_cta_placement(ctx),
+        "visual_hierarchy": analyze_visual_hierarchy(ctx),
+        "visual_complexity": analyze_visual_complexity(ctx),
+        "saliency_distribution": analyze_saliency_distribution(ctx)
     }
 
 if __name__ == "__main__":
@@ -252,16 +252,25 @@ def build_gaze_path_efficiency(saliency_map_path):
     """
     Computes gaze path efficiency based on hotspot distribution.
     Uses existing saliency map to calculate sequential scanning distance.
+    `saliency_map_path` may also be an AnalysisContext; if it carries simulated
+    DeepGaze III scanpaths, their saccade lengths are scored instead.
     Returns efficiency score (0-100) where higher = more efficient scanning path.
     """
     import cv2
     import numpy as np
     
+    from analysis_context import as_context
+    
     try:
-        saliency = cv2.imread(saliency_map_path, cv2.IMREAD_GRAYSCALE)
-        if saliency is None:
+        try:
+            ctx = as_context(None, saliency_map_path)
+            saliency = ctx.saliency
+        except ValueError:
             return {"score": 50, "insight": "Unable to compute gaze path.", "recommendation": "N/A"}
         
+        if getattr(ctx, "scanpaths", None) is not None:
+            return _scanpath_efficiency(ctx.scanpaths, saliency.shape)
+        
         total_area = saliency.size
         
         # Extract hotspots using same logic as calculate_metrics
@@ -337,6 +346,39 @@ def build_gaze_path_efficiency(saliency_map_path):
         }
 
 
+def _scanpath_efficiency(scanpaths, shape):
+    """
+    Gaze path efficiency from simulated (scanpaths, fixations, 2) fixations: the mean
+    saccade length as a share of the screen diagonal, on the same scale as the hotspot path.
+    """
+    import numpy as np
+    
+    scanpaths = np.asarray(scanpaths, dtype=np.float64)
+    saccades = np.linalg.norm(np.diff(scanpaths, axis=1), axis=-1)
+    h, w = shape[:2]
+    distance_ratio = float(saccades.mean() / np.sqrt(h**2 + w**2))
+    distance_percent = int(distance_ratio * 100)
+    
+    if distance_ratio < 0.25:
+        score = 90
+        insight = f"Simulated viewers move between nearby elements (average saccade {distance_percent}% of the screen diagonal)."
+        recommendation = "Excellent scanning efficiency. Maintain current layout."
+    elif distance_ratio < 0.5:
+        score = 70
+        insight = f"Simulated viewers make moderate jumps between focal points (average saccade {distance_percent}% of the screen diagonal)."
+        recommendation = "Good. Consider grouping related elements closer if possible."
+    else:
+        score = 40
+        insight = f"Simulated viewers jump across the page (average saccade {distance_percent}% of the screen diagonal). High eye travel required."
+        recommendation = "Reduce scanning fatigue: group related CTAs within closer proximity."
+    
+    return {
+        "score": score,
+        "insight": insight,
+        "recommendation": recommendation
+    }
+
+
 def get_strategic_action_plan(metrics, adv_metrics, cognitive_data):
     """Generates the prioritized Strategic Action Plan."""
     
@@ -98,9 +98,9 @@ def build_fixation_selection_network():
     ]))
 
 
-def build_deepgaze_mixture(backbone_config, components=10):
+def build_deepgaze_mixture(backbone_config, components=10, pretrained_backbone=True):
     feature_class = import_class(backbone_config['type'])
-    features = feature_class()
+    features = feature_class() if pretrained_backbone else feature_class(pretrained=False)
 
     feature_extractor = FeatureExtractor(features, backbone_config['used_features'])
 
@@ -136,9 +136,15 @@ class DeepGazeIIE(MixtureModel):
     :note
     See Linardos, A., Kümmerer, M., Press, O., & Bethge, M. (2021). Calibrated prediction in and out-of-domain for state-of-the-art saliency modeling. ArXiv:2105.12441 [Cs], http://arxiv.org/abs/2105.12441
     """
-    def __init__(self, pretrained=True):
+    def __init__(self, pretrained=True, pretrained_backbones=None):
+        # the DeepGaze IIE checkpoint includes the backbone weights, so the backbones' own
+        # (ImageNet) checkpoints are only downloaded when not loading it
+        if pretrained_backbones is None:
+            pretrained_backbones = not pretrained
+
         # we average over 3 instances per backbone, each instance has 10 crossvalidation folds
-        backbone_models = [build_deepgaze_mixture(backbone_config, components=3 * 10) for backbone_config in BACKBONES]
+        backbone_models = [build_deepgaze_mixture(backbone_config, components=3 * 10, pretrained_backbone=pretrained_backbones)
+                           for backbone_config in BACKBONES]
         super().__init__(backbone_models)
 
         if pretrained:
@@ -72,7 +72,8 @@ class DeepGazeIII(DeepGazeIIIMixture):
     See Kümmerer, M., Bethge, M., & Wallis, T.S.A. (2022). DeepGaze III: Modeling free-viewing human scanpaths with deep learning. Journal of Vision 2022, https://doi.org/10.1167/jov.22.5.7
     """
     def __init__(self, pretrained=True):
-        features = RGBDenseNet201()
+        # the DeepGaze III checkpoint includes the backbone weights
+        features = RGBDenseNet201(pretrained=not pretrained)
 
         feature_extractor = FeatureExtractor(features, [
             '1.features.denseblock4.denselayer32.norm1',
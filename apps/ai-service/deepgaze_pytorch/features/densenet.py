@@ -10,9 +10,12 @@ from .normalizer import Normalizer
 
 
 class RGBDenseNet201(nn.Sequential):
-    def __init__(self):
+    def __init__(self, pretrained=True):
         super(RGBDenseNet201, self).__init__()
-        self.densenet = torch.hub.load('pytorch/vision:v0.6.0', 'densenet201', pretrained=True)
+        if pretrained:
+            self.densenet = torch.hub.load('pytorch/vision:v0.6.0', 'densenet201', pretrained=True)
+        else:
+            self.densenet = torchvision.models.densenet201()
         self.normalizer = Normalizer()
         super(RGBDenseNet201, self).__init__(self.normalizer, self.densenet)
 
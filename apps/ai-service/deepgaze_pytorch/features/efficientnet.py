@@ -13,9 +13,9 @@ from .normalizer import Normalizer
 
 
 class RGBEfficientNetB5(nn.Sequential):
-    def __init__(self):
+    def __init__(self, pretrained=True):
         super(RGBEfficientNetB5, self).__init__()
-        self.efficientnet = EfficientNet.from_pretrained('efficientnet-b5')
+        self.efficientnet = EfficientNet.from_pretrained('efficientnet-b5') if pretrained else EfficientNet.from_name('efficientnet-b5')
         self.normalizer = Normalizer()
         super(RGBEfficientNetB5, self).__init__(self.normalizer, self.efficientnet)
 
@@ -10,9 +10,12 @@ from .normalizer import Normalizer
     
 
 class RGBResNext50(nn.Sequential):
-    def __init__(self):
+    def __init__(self, pretrained=True):
         super(RGBResNext50, self).__init__()
-        self.resnext = torch.hub.load('pytorch/vision:v0.6.0', 'resnext50_32x4d', pretrained=True) 
+        if pretrained:
+            self.resnext = torch.hub.load('pytorch/vision:v0.6.0', 'resnext50_32x4d', pretrained=True)
+        else:
+            self.resnext = torchvision.models.resnext50_32x4d()
         self.normalizer = Normalizer()
         super(RGBResNext50, self).__init__(self.normalizer, self.resnext)
 
@@ -13,7 +13,7 @@ from torch.utils import model_zoo
 from .normalizer import Normalizer
 
 
-def load_model(model_name):
+def load_model(model_name, pretrained=True):
 
     model_urls = {
             'resnet50_trained_on_SIN': 'https://bitbucket.org/robert_geirhos/texture-vs-shape-pretrained-models/raw/6f41d2e86fc60566f78de64ecff35cc61eb6436f/resnet50_train_60_epochs-c8e5653e.pth.tar',
@@ -29,6 +29,9 @@ def load_model(model_name):
         #model = torch.nn.DataParallel(model)  # .cuda()
         # fake DataParallel structrue
         model = torch.nn.Sequential(OrderedDict([('module', model)]))
+        if not pretrained:
+            # architecture only, weights are loaded by the caller
+            return model
         checkpoint = model_zoo.load_url(model_urls[model_name], map_location=torch.device('cpu'))
     elif "vgg16" in model_name:
         #print("Using the VGG-16 architecture.")
@@ -79,9 +82,9 @@ class RGBShapeNetB(nn.Sequential):
 
 
 class RGBShapeNetC(nn.Sequential):
-    def __init__(self):
+    def __init__(self, pretrained=True):
         super(RGBShapeNetC, self).__init__()
-        self.shapenet = load_model("resnet50_trained_on_SIN_and_IN_then_finetuned_on_IN")
+        self.shapenet = load_model("resnet50_trained_on_SIN_and_IN_then_finetuned_on_IN", pretrained=pretrained)
         self.normalizer = Normalizer()
         super(RGBShapeNetC, self).__init__(self.normalizer, self.shapenet)
 
@@ -117,7 +117,15 @@ class LayerNorm(nn.Module):
             'center={center}, scale={scale}'.format(**self.__dict__)
 
 
-def gaussian_filter_1d(tensor, dim, sigma, truncate=4, kernel_size=None, padding_mode='replicate', padding_value=0.0):
+def gaussian_filter_1d(tensor, dim, sigma, truncate=4, kernel_size=None, padding_mode='replicate', padding_value=0.0, kernel=None):
+    """Applies a 1d gaussian filter along `dim`
+
+    `kernel` (1 x 1 x kernel_size) is a precomputed, normalized kernel for `sigma`
+    (see `GaussianFilterNd.frozen_kernel`); it replaces the per-call kernel construction.
+    """
+    if kernel is not None:
+        return _convolve_1d(tensor, dim, kernel, padding_mode, padding_value)
+
     sigma = torch.as_tensor(sigma, device=tensor.device, dtype=tensor.dtype)
 
     if kernel_size is not None:
@@ -127,8 +135,6 @@ def gaussian_filter_1d(tensor, dim, sigma, truncate=4, kernel_size=None, padding
 
     kernel_size = kernel_size.detach()
 
-    kernel_size_int = kernel_size.detach().cpu().numpy()
-
     mean = (torch.as_tensor(kernel_size, dtype=tensor.dtype) - 1) / 2
 
     grid = torch.arange(kernel_size, device=tensor.device) - mean
@@ -138,6 +144,16 @@ def gaussian_filter_1d(tensor, dim, sigma, truncate=4, kernel_size=None, padding
 
     grid = grid.detach()
 
+    # create gaussian kernel from grid using current sigma
+    kernel = torch.exp(-0.5 * (grid / sigma) ** 2)
+    kernel = kernel / kernel.sum()
+
+    return _convolve_1d(tensor, dim, kernel, padding_mode, padding_value)
+
+
+def _convolve_1d(tensor, dim, kernel, padding_mode, padding_value):
+    kernel_size_int = kernel.shape[-1]
+
     source_shape = tensor.shape
 
     tensor = torch.movedim(tensor, dim, len(source_shape)-1)
@@ -150,10 +166,6 @@ def gaussian_filter_1d(tensor, dim, sigma, truncate=4, kernel_size=None, padding
     padding = (math.ceil((kernel_size_int - 1) / 2), math.ceil((kernel_size_int - 1) / 2))
     tensor_ = F.pad(tensor, padding, padding_mode, padding_value)
 
-    # create gaussian kernel from grid using current sigma
-    kernel = torch.exp(-0.5 * (grid / sigma) ** 2)
-    kernel = kernel / kernel.sum()
-
     # convolve input with gaussian kernel
     tensor_ = F.conv1d(tensor_, kernel)
     tensor_ = tensor_.view(dim_last_shape)
@@ -194,8 +206,30 @@ class GaussianFilterNd(nn.Module):
         self.padding_mode = padding_mode
         self.padding_value = padding_value
 
+        # (sigma version, device, dtype) -> kernel, see `frozen_kernel`
+        self._frozen_kernel = None
+
+    def frozen_kernel(self, device, dtype):
+        """The normalized 1 x 1 x kernel_size kernel for the current sigma
+
+        Computed once and reused until sigma changes (e.g. by `load_state_dict`).
+        Only valid where no gradient has to flow back to sigma.
+        """
+        key = (self.sigma.data_ptr(), self.sigma._version, device, dtype)
+        # read and replaced as one tuple, so concurrent forward passes never mix key and kernel
+        frozen = self._frozen_kernel
+        if frozen is None or frozen[0] != key:
+            with torch.no_grad():
+                kernel = gaussian_kernel_1d(float(self.sigma), self.truncate, self.kernel_size)
+            frozen = self._frozen_kernel = (key, kernel.to(device=device, dtype=dtype).view(1, 1, -1))
+        return frozen[1]
+
     def forward(self, tensor):
         """Applies the gaussian filter to the given tensor"""
+        kernel = None
+        if not (torch.is_grad_enabled() and self.sigma.requires_grad) and not torch.compiler.is_compiling():
+            kernel = self.frozen_kernel(tensor.device, tensor.dtype)
+
         for dim in self.dims:
             tensor = gaussian_filter_1d(
                 tensor,
@@ -205,11 +239,63 @@ class GaussianFilterNd(nn.Module):
                 kernel_size=self.kernel_size,
                 padding_mode=self.padding_mode,
                 padding_value=self.padding_value,
+                kernel=kernel,
             )
 
         return tensor
 
 
+def gaussian_kernel_1d(sigma, truncate=4, kernel_size=None):
+    """The normalized gaussian kernel that `gaussian_filter_1d` builds for `sigma`"""
+    if kernel_size is None:
+        kernel_size = int(2 * math.ceil(truncate * sigma) + 1)
+    grid = torch.arange(kernel_size) - (torch.tensor(kernel_size, dtype=torch.float32) - 1) / 2
+    kernel = torch.exp(-0.5 * (grid / sigma) ** 2)
+    return kernel / kernel.sum()
+
+
+class GaussianFilterBank2d(nn.Module):
+    """A fixed per-channel gaussian filter for inference
+
+    Applies a different, frozen gaussian blur to every channel of a
+    B x C x H x W tensor with two depthwise convolutions (height, then width).
+    Kernels are precomputed once from the given sigmas exactly like
+    `gaussian_filter_1d` computes them on the fly; smaller kernels are
+    zero-padded to the largest kernel size so all channels run in one op
+    (on CPU this beats one convolution per kernel size, whose depthwise
+    kernels are much slower for few channels than the padded taps cost).
+    """
+
+    def __init__(self, sigmas, truncate=4, padding_mode='replicate', padding_value=0.0):
+        super().__init__()
+
+        kernels = [gaussian_kernel_1d(float(sigma), truncate) for sigma in sigmas]
+        max_kernel_size = max(len(kernel) for kernel in kernels)
+
+        padded_kernels = torch.zeros(len(kernels), max_kernel_size)
+        for k, kernel in enumerate(kernels):
+            offset = (max_kernel_size - len(kernel)) // 2
+            padded_kernels[k, offset:offset + len(kernel)] = kernel
+
+        self.channels = len(kernels)
+        self.padding = (max_kernel_size - 1) // 2
+        self.padding_mode = padding_mode
+        self.padding_value = padding_value
+        self.register_buffer('kernel_h', padded_kernels.view(self.channels, 1, max_kernel_size, 1))
+        self.register_buffer('kernel_w', padded_kernels.view(self.channels, 1, 1, max_kernel_size))
+
+    def forward(self, tensor):
+        p = self.padding
+        tensor = F.pad(tensor, (0, 0, p, p), self.padding_mode, self.padding_value)
+        tensor = F.conv2d(tensor, self.kernel_h.to(tensor.dtype), groups=self.channels)
+        tensor = F.pad(tensor, (p, p, 0, 0), self.padding_mode, self.padding_value)
+        tensor = F.conv2d(tensor, self.kernel_w.to(tensor.dtype), groups=self.channels)
+        return tensor
+
+    def extra_repr(self):
+        return f'channels={self.channels}, padding={self.padding}'
+
+
 class Conv2dMultiInput(nn.Module):
     def __init__(self, in_channels, out_channels, kernel_size, bias=True):
         super().__init__()
@@ -1,12 +1,16 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
 import functools
 import math
+import threading
 
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
-from .layers import GaussianFilterNd
+from .layers import GaussianFilterNd, GaussianFilterBank2d
 
 
 def encode_scanpath_features(x_hist, y_hist, size, device=None, include_x=True, include_y=True, include_duration=False):
@@ -48,28 +52,145 @@ def encode_scanpath_features(x_hist, y_hist, size, device=None, include_x=True,
 
     return torch.cat((XS, YS, distances), axis=1)
 
+
+def nearest_source_index(size, output_size, device=None):
+    """The input index `F.interpolate(mode='nearest')` reads for every output index along one axis"""
+    # the index map resized by F.interpolate itself, so rounding matches it exactly
+    index = torch.arange(size, dtype=torch.float32, device=device).view(1, 1, size)
+    return F.interpolate(index, size=output_size).view(-1).long()
+
+
+def encode_scanpath_readout_features(x_hist, y_hist, size, readout_shape, device=None):
+    """`encode_scanpath_features` at `size`, nearest-resized to `readout_shape`, without the full size maps
+
+    Only the stimulus coordinates the resize samples are computed, broadcast against
+    the fixation history, so the memory scales with the readout grid instead of the
+    stimulus size.
+    """
+    xs = nearest_source_index(size[1], readout_shape[1], device=device).to(torch.float32)
+    ys = nearest_source_index(size[0], readout_shape[0], device=device).to(torch.float32)
+
+    XS = xs.view(1, 1, 1, -1) - x_hist.to(torch.float32).unsqueeze(2).unsqueeze(3)
+    YS = ys.view(1, 1, -1, 1) - y_hist.to(torch.float32).unsqueeze(2).unsqueeze(3)
+    XS, YS = torch.broadcast_tensors(XS, YS)
+
+    distances = torch.sqrt(XS**2 + YS**2)
+
+    return torch.cat((XS, YS, distances), axis=1)
+
+class StopForward(Exception):
+    """Raised by FeatureExtractor hooks to end the backbone forward pass once every target has run"""
+
+
+# Per-thread {id(FeatureExtractor): (outputs, versions)} of running forward passes
+_tapped_outputs = threading.local()
+
+
 class FeatureExtractor(torch.nn.Module):
-    def __init__(self, features, targets):
+    """Returns the outputs of the `targets` layers of a backbone
+
+    With `truncate` the backbone stops right after the last target layer has
+    run, so the remaining blocks and the classifier head are never computed
+    (`prune` also frees their weights). Tapped outputs are only cloned for
+    targets whose output a later layer modifies in place (e.g. a norm layer
+    followed by ReLU(inplace=True)); those are detected from the tensor
+    version counters on the first forward pass. Outputs are collected per
+    thread, so concurrent forward passes (e.g. the API's job workers sharing
+    one model) don't mix their taps.
+    """
+    def __init__(self, features, targets, truncate=True):
         super().__init__()
         self.features = features
         self.targets = targets
+        self.truncate = truncate
         #print("Targets are {}".format(targets))
         self.outputs = {}
+        self.versions = {}
+        self.inplace_targets = set()
 
         for target in targets:
             layer = dict([*self.features.named_modules()])[target]
             layer.register_forward_hook(self.save_outputs_hook(target))
 
+    def _tapped(self):
+        """This thread's (outputs, versions) dicts of the running forward pass"""
+        if torch.compiler.is_compiling():
+            return self.outputs, self.versions
+        extractors = getattr(_tapped_outputs, 'extractors', None)
+        if extractors is None:
+            extractors = _tapped_outputs.extractors = {}
+        return extractors.setdefault(id(self), ({}, {}))
+
     def save_outputs_hook(self, layer_id: str):
         def fn(_, __, output):
-            self.outputs[layer_id] = output.clone()
+            outputs, versions = self._tapped()
+            if torch.compiler.is_compiling():
+                # exported / compiled graphs run to the end (layers after the targets are dead code)
+                outputs[layer_id] = output.clone()
+                return
+            if layer_id in self.inplace_targets or torch.is_inference_mode_enabled():
+                # inference tensors have no version counter to check
+                output = output.clone()
+            else:
+                versions[layer_id] = output._version
+            outputs[layer_id] = output
+            if self.truncate and len(outputs) == len(self.targets):
+                raise StopForward()
         return fn
 
     def forward(self, x):
 
-        self.outputs.clear()
-        self.features(x)
-        return [self.outputs[target] for target in self.targets]
+        tapped, versions = self._tapped()
+        tapped.clear()
+        versions.clear()
+        try:
+            self.features(x)
+        except StopForward:
+            pass
+
+        # hand the outputs over instead of keeping them alive on the module until the next call
+        outputs = [tapped.pop(target) for target in self.targets]
+        modified = {target for target, output in zip(self.targets, outputs)
+                    if target in versions and output._version != versions[target]}
+        if modified:
+            # a later layer overwrote these outputs in place: clone them from now on and redo this pass
+            self.inplace_targets |= modified
+            return self.forward(x)
+        return outputs
+
+    def prune(self, sample=None):
+        """Replaces the backbone layers that never run before the last target with Identity
+
+        Frees the weights of the truncated blocks and the classifier head. Call it after
+        loading weights (the state dict loses the pruned keys); needs `truncate`, and
+        pruned backbones can't be exported (exported graphs don't stop early).
+
+        Returns:
+            list: names of the pruned layers.
+        """
+        assert self.truncate, "Pruning needs a truncating FeatureExtractor"
+        if sample is None:
+            sample = torch.zeros(1, 3, 224, 224, device=next(self.features.parameters()).device)
+
+        executed = set()
+        leaves = [(name, module) for name, module in self.features.named_modules() if not list(module.children())]
+        handles = [module.register_forward_pre_hook(lambda module, _: executed.add(module)) for _, module in leaves]
+        try:
+            with torch.no_grad():
+                self.forward(sample)
+        finally:
+            for handle in handles:
+                handle.remove()
+
+        pruned = []
+        for name, module in leaves:
+            if module in executed or not (list(module.parameters(recurse=False)) or list(module.buffers(recurse=False))):
+                continue
+            parent_name, _, child_name = name.rpartition('.')
+            parent = self.features.get_submodule(parent_name) if parent_name else self.features
+            setattr(parent, child_name, nn.Identity())
+            pruned.append(name)
+        return pruned
 
 
 def upscale(tensor, size):
@@ -87,6 +208,39 @@ def upscale(tensor, size):
     return tensor
 
 
+def downscale_centerbias(centerbias, saliency_map_factor):
+    return F.interpolate(
+        centerbias.view(centerbias.shape[0], 1, centerbias.shape[1], centerbias.shape[2]),
+        scale_factor=1 / saliency_map_factor,
+        recompute_scale_factor=False,
+    )[:, 0, :, :]
+
+
+def nearest_log_counts(low_size, size, device=None, dtype=torch.float32):
+    """Log of how often `F.interpolate(mode='nearest')` repeats every pixel of a `low_size` map at `size`
+
+    A log density normalized with these weights at low resolution (see
+    `normalize_low_res`) is exactly normalized once upsampled to `size`.
+    """
+    log_counts = []
+    for low, full in zip(low_size, size):
+        index = nearest_source_index(low, full, device=device)
+        counts = torch.zeros(low, dtype=dtype, device=device).scatter_add(0, index, torch.ones(index.shape, dtype=dtype, device=device))
+        log_counts.append(counts.log())
+    return log_counts[0][:, np.newaxis] + log_counts[1][np.newaxis, :]
+
+
+def normalize_low_res(log_density, size):
+    """Normalizes a (..., h, w) log density so that it sums to one after nearest upsampling to `size`"""
+    log_counts = nearest_log_counts(log_density.shape[-2:], size, device=log_density.device, dtype=log_density.dtype)
+    return log_density - (log_density + log_counts).logsumexp(dim=(-2, -1), keepdim=True)
+
+
+def upsample_log_density(log_density, centerbias):
+    """Nearest-upsamples a B x C x h x w log density from `normalize_low_res` to the center bias size"""
+    return F.interpolate(log_density, size=[centerbias.shape[1], centerbias.shape[2]])
+
+
 class Finalizer(nn.Module):
     """Transforms a readout into a gaze prediction
 
@@ -130,14 +284,21 @@ class Finalizer(nn.Module):
         self.gauss = GaussianFilterNd([2, 3], sigma, truncate=3, trainable=learn_sigma)
         self.center_bias_weight = nn.Parameter(torch.Tensor([center_bias_weight]), requires_grad=learn_center_bias_weight)
 
-    def forward(self, readout, centerbias):
-        """Applies the finalization steps to the given readout"""
+    def downscale_centerbias(self, centerbias):
+        """The center bias at the resolution the readout is smoothed at (B x H x W)"""
+        return downscale_centerbias(centerbias, self.saliency_map_factor)
 
-        downscaled_centerbias = F.interpolate(
-            centerbias.view(centerbias.shape[0], 1, centerbias.shape[1], centerbias.shape[2]),
-            scale_factor=1 / self.saliency_map_factor,
-            recompute_scale_factor=False,
-        )[:, 0, :, :]
+    def forward(self, readout, centerbias, downscaled_centerbias=None, upsample=True):
+        """Applies the finalization steps to the given readout
+
+        `downscaled_centerbias` (see `downscale_centerbias`) can be passed in by
+        callers that finalize many readouts for the same center bias. With
+        `upsample=False` the log density stays at the smoothing resolution,
+        normalized for the stimulus size (see `upsample_log_density`).
+        """
+
+        if downscaled_centerbias is None:
+            downscaled_centerbias = self.downscale_centerbias(centerbias)
 
         out = F.interpolate(
             readout,
@@ -153,6 +314,9 @@ class Finalizer(nn.Module):
         # add to center bias
         out = out + self.center_bias_weight * downscaled_centerbias
 
+        if not upsample:
+            return normalize_low_res(out, centerbias.shape[1:])
+
         out = F.interpolate(out[:, np.newaxis, :, :], size=[centerbias.shape[1], centerbias.shape[2]])[:, 0, :, :]
 
         # normalize
@@ -243,9 +407,7 @@ class DeepGazeIII(torch.nn.Module):
         x = self.saliency_network(x)
 
         if self.scanpath_network is not None:
-            scanpath_features = encode_scanpath_features(x_hist, y_hist, size=(orig_shape[2], orig_shape[3]), device=x.device)
-            #scanpath_features = F.interpolate(scanpath_features, scale_factor=1 / self.downsample / self.readout_factor)
-            scanpath_features = F.interpolate(scanpath_features, readout_shape)
+            scanpath_features = encode_scanpath_readout_features(x_hist, y_hist, size=(orig_shape[2], orig_shape[3]), readout_shape=readout_shape, device=x.device)
             y = self.scanpath_network(scanpath_features)
         else:
             y = None
@@ -265,6 +427,22 @@ class DeepGazeIII(torch.nn.Module):
         self.finalizer.train(mode=mode)
 
 
+def compute_readout_input(features, x, downsample, readout_factor):
+    """Runs the feature extractor and resamples all tapped features to the readout grid"""
+    orig_shape = x.shape
+    x = F.interpolate(
+        x,
+        scale_factor=1 / downsample,
+        recompute_scale_factor=False,
+    )
+    x = features(x)
+
+    readout_shape = [math.ceil(orig_shape[2] / downsample / readout_factor), math.ceil(orig_shape[3] / downsample / readout_factor)]
+    x = [F.interpolate(item, readout_shape) for item in x]
+
+    return torch.cat(x, dim=1)
+
+
 class DeepGazeIIIMixture(torch.nn.Module):
     def __init__(self, features, saliency_networks, scanpath_networks, fixation_selection_networks, finalizers, downsample=2, readout_factor=2, saliency_map_factor=2, included_fixations=-2, initial_sigma=8.0):
         super().__init__()
@@ -285,40 +463,53 @@ class DeepGazeIIIMixture(torch.nn.Module):
         self.fixation_selection_networks = torch.nn.ModuleList(fixation_selection_networks)
         self.finalizers = torch.nn.ModuleList(finalizers)
 
-    def forward(self, x, centerbias, x_hist=None, y_hist=None, durations=None):
-        orig_shape = x.shape
-        x = F.interpolate(
-            x,
-            scale_factor=1 / self.downsample,
-            recompute_scale_factor=False,
-        )
-        x = self.features(x)
+    def extract_features(self, x):
+        """Computes the readout input (all tapped backbone features on the readout grid)"""
+        return compute_readout_input(self.features, x, self.downsample, self.readout_factor)
 
-        readout_shape = [math.ceil(orig_shape[2] / self.downsample / self.readout_factor), math.ceil(orig_shape[3] / self.downsample / self.readout_factor)]
-        x = [F.interpolate(item, readout_shape) for item in x]
+    def saliency_readout(self, readout_input):
+        """Every component's saliency network output (the part of the readout independent of the fixation history)"""
+        return [saliency_network(readout_input) for saliency_network in self.saliency_networks]
 
-        x = torch.cat(x, dim=1)
+    def readout(self, readout_input, centerbias, x_hist=None, y_hist=None, durations=None, upsample=True, saliency=None):
+        """Computes the mixture log density from precomputed `extract_features` output
 
-        predictions = []
+        The components are combined at the smoothing resolution and only the mixture is
+        upsampled to the stimulus size (`upsample=False` skips that, see `upsample_log_density`).
+        `saliency` is precomputed `saliency_readout` output, e.g. to predict many fixation
+        histories on one image (`readout_input` is not used then).
+        """
+        if saliency is None:
+            saliency = self.saliency_readout(readout_input)
+        readout_shape = list(saliency[0].shape[2:])
+        low_res = len({finalizer.saliency_map_factor for finalizer in self.finalizers}) == 1
 
-        readout_input = x
+        # the fixation history is encoded once and shared by all scanpath networks
+        scanpath_features = None
+        if any(scanpath_network is not None for scanpath_network in self.scanpath_networks):
+            scanpath_features = encode_scanpath_readout_features(
+                x_hist, y_hist, size=(centerbias.shape[1], centerbias.shape[2]), readout_shape=readout_shape, device=saliency[0].device,
+            )
 
-        for saliency_network, scanpath_network, fixation_selection_network, finalizer in zip(
-            self.saliency_networks, self.scanpath_networks, self.fixation_selection_networks, self.finalizers
-        ):
+        # every finalizer downscales the same center bias; do it once per saliency map factor
+        downscaled_centerbiases = {}
+
+        predictions = []
 
-            x = saliency_network(readout_input)
+        for x, scanpath_network, fixation_selection_network, finalizer in zip(
+            saliency, self.scanpath_networks, self.fixation_selection_networks, self.finalizers
+        ):
 
             if scanpath_network is not None:
-                scanpath_features = encode_scanpath_features(x_hist, y_hist, size=(orig_shape[2], orig_shape[3]), device=x.device)
-                scanpath_features = F.interpolate(scanpath_features, readout_shape)
                 y = scanpath_network(scanpath_features)
             else:
                 y = None
 
             x = fixation_selection_network((x, y))
 
-            x = finalizer(x, centerbias)
+            if finalizer.saliency_map_factor not in downscaled_centerbiases:
+                downscaled_centerbiases[finalizer.saliency_map_factor] = finalizer.downscale_centerbias(centerbias)
+            x = finalizer(x, centerbias, downscaled_centerbias=downscaled_centerbiases[finalizer.saliency_map_factor], upsample=not low_res)
 
             predictions.append(x[:, np.newaxis, :, :])
 
@@ -326,18 +517,289 @@ class DeepGazeIIIMixture(torch.nn.Module):
 
         prediction = predictions.logsumexp(dim=(1), keepdim=True)
 
+        if low_res and upsample:
+            prediction = upsample_log_density(prediction, centerbias)
+
+        return prediction
+
+    def forward(self, x, centerbias, x_hist=None, y_hist=None, durations=None, upsample=True):
+        x = self.extract_features(x)
+        return self.readout(x, centerbias, x_hist=x_hist, y_hist=y_hist, durations=durations, upsample=upsample)
+
+    def fused(self):
+        """Returns an inference-only copy with all components packed into grouped convolutions"""
+        return FusedDeepGazeIIIMixture(self)
+
+    def subset(self, components):
+        """Returns a mixture of the first `components` readout components, sharing all modules with this one"""
+        return DeepGazeIIIMixture(
+            features=self.features,
+            saliency_networks=list(self.saliency_networks)[:components],
+            scanpath_networks=list(self.scanpath_networks)[:components],
+            fixation_selection_networks=list(self.fixation_selection_networks)[:components],
+            finalizers=list(self.finalizers)[:components],
+            downsample=self.downsample,
+            readout_factor=self.readout_factor,
+            saliency_map_factor=self.saliency_map_factor,
+            included_fixations=self.included_fixations,
+        )
+
+
+def _grouped_conv(convs, biases=None, groups=None):
+    """Stacks per-component 1x1 convolutions into one (grouped) convolution"""
+    weight = torch.cat([conv.weight.detach() for conv in convs], dim=0)
+    in_channels = weight.shape[1] * (groups or 1)
+    fused = nn.Conv2d(in_channels, weight.shape[0], (1, 1), bias=biases is not None, groups=groups or 1)
+    fused.weight.data.copy_(weight)
+    if biases is not None:
+        fused.bias.data.copy_(torch.cat([bias.detach() for bias in biases]))
+    return fused
+
+
+def _grouped_layernorm(layernorms):
+    """Turns per-component LayerNorms over (C, H, W) into one GroupNorm with a group per component"""
+    assert all(layernorm.center and layernorm.scale for layernorm in layernorms)
+    fused = nn.GroupNorm(len(layernorms), sum(layernorm.features for layernorm in layernorms), eps=layernorms[0].eps)
+    fused.weight.data.copy_(torch.cat([layernorm.weight.detach() for layernorm in layernorms]))
+    fused.bias.data.copy_(torch.cat([layernorm.bias.detach() for layernorm in layernorms]))
+    return fused
+
+
+class FusedDeepGazeIIIMixture(torch.nn.Module):
+    """Inference-only DeepGazeIIIMixture without the per-component Python loop
+
+    All components' saliency and fixation selection networks are packed into
+    one stack of grouped 1x1 convolutions (one group per component):
+
+     - the first LayerNorm normalizes the shared readout input, so it is computed
+       once and its affine parameters are folded into the first convolution
+     - every later LayerNorm normalizes one component's channels, i.e. it is a
+       GroupNorm with one group per component
+     - Bias layers become the convolution biases
+
+    The finalizers' gaussian blurs run as a single depthwise convolution with
+    per-component kernels. The output matches `DeepGazeIIIMixture.forward` up to
+    float rounding. The feature extractor is shared with the source model.
+    Models with scanpath networks are not supported.
+    """
+
+    def __init__(self, mixture):
+        super().__init__()
+
+        if any(scanpath_network is not None for scanpath_network in mixture.scanpath_networks):
+            raise NotImplementedError("Fusing mixtures with scanpath networks is not supported")
+
+        self.downsample = mixture.downsample
+        self.readout_factor = mixture.readout_factor
+        self.features = mixture.features
+        self.components = len(mixture.saliency_networks)
+
+        saliency_networks = list(mixture.saliency_networks)
+        fixation_selection_networks = list(mixture.fixation_selection_networks)
+        finalizers = list(mixture.finalizers)
+        K = self.components
+
+        # fold the affine part of the shared input LayerNorm into conv0:
+        # W (gamma * x_hat + beta) + b = (W gamma) x_hat + (W beta + b)
+        conv0_weights = []
+        conv0_biases = []
+        for network in saliency_networks:
+            layernorm, conv, bias = network.layernorm0, network.conv0, network.bias0
+            weight = conv.weight.detach()[:, :, 0, 0]
+            conv0_weights.append(weight * layernorm.weight.detach()[np.newaxis, :])
+            conv0_biases.append(weight @ layernorm.bias.detach() + bias.bias.detach())
+
+        input_channels = saliency_networks[0].layernorm0.features
+        conv0 = nn.Conv2d(input_channels, sum(len(b) for b in conv0_biases), (1, 1), bias=True)
+        conv0.weight.data.copy_(torch.cat(conv0_weights)[:, :, np.newaxis, np.newaxis])
+        conv0.bias.data.copy_(torch.cat(conv0_biases))
+
+        self.saliency_network = nn.Sequential(OrderedDict([
+            ('layernorm0', nn.GroupNorm(1, input_channels, eps=saliency_networks[0].layernorm0.eps, affine=False)),
+            ('conv0', conv0),
+            ('softplus0', nn.Softplus()),
+
+            ('layernorm1', _grouped_layernorm([n.layernorm1 for n in saliency_networks])),
+            ('conv1', _grouped_conv([n.conv1 for n in saliency_networks], [n.bias1.bias for n in saliency_networks], groups=K)),
+            ('softplus1', nn.Softplus()),
+
+            ('layernorm2', _grouped_layernorm([n.layernorm2 for n in saliency_networks])),
+            ('conv2', _grouped_conv([n.conv2 for n in saliency_networks], [n.bias2.bias for n in saliency_networks], groups=K)),
+            ('softplus2', nn.Softplus()),
+        ]))
+
+        self.fixation_selection_network = nn.Sequential(OrderedDict([
+            ('layernorm0', _grouped_layernorm([n.layernorm0.layernorm_part0 for n in fixation_selection_networks])),
+            ('conv0', _grouped_conv([n.conv0.conv_part0 for n in fixation_selection_networks], [n.bias0.bias for n in fixation_selection_networks], groups=K)),
+            ('softplus0', nn.Softplus()),
+
+            ('layernorm1', _grouped_layernorm([n.layernorm1 for n in fixation_selection_networks])),
+            ('conv1', _grouped_conv([n.conv1 for n in fixation_selection_networks], [n.bias1.bias for n in fixation_selection_networks], groups=K)),
+            ('softplus1', nn.Softplus()),
+
+            ('conv2', _grouped_conv([n.conv2 for n in fixation_selection_networks], groups=K)),
+        ]))
+
+        saliency_map_factors = {finalizer.saliency_map_factor for finalizer in finalizers}
+        if len(saliency_map_factors) != 1:
+            raise NotImplementedError("Fusing finalizers with different saliency map factors is not supported")
+        self.saliency_map_factor = saliency_map_factors.pop()
+
+        truncates = {finalizer.gauss.truncate for finalizer in finalizers}
+        assert len(truncates) == 1 and all(finalizer.gauss.kernel_size is None for finalizer in finalizers)
+        self.gauss = GaussianFilterBank2d(
+            [finalizer.gauss.sigma.detach() for finalizer in finalizers],
+            truncate=truncates.pop(),
+            padding_mode=finalizers[0].gauss.padding_mode,
+            padding_value=finalizers[0].gauss.padding_value,
+        )
+        self.register_buffer('center_bias_weights', torch.cat([finalizer.center_bias_weight.detach() for finalizer in finalizers]))
+
+        self.eval()
+
+    def extract_features(self, x):
+        """Computes the readout input (all tapped backbone features on the readout grid)"""
+        return compute_readout_input(self.features, x, self.downsample, self.readout_factor)
+
+    def readout(self, readout_input, centerbias, upsample=True):
+        """Computes the mixture log density from precomputed `extract_features` output
+
+        See `DeepGazeIIIMixture.readout` for `upsample`.
+        """
+        x = self.saliency_network(readout_input)
+        x = self.fixation_selection_network(x)
+
+        # finalize all components at once (see Finalizer.forward)
+        downscaled_centerbias = downscale_centerbias(centerbias, self.saliency_map_factor)[:, np.newaxis, :, :]
+
+        x = F.interpolate(x, size=[downscaled_centerbias.shape[2], downscaled_centerbias.shape[3]])
+        x = self.gauss(x)
+        x = x + self.center_bias_weights[np.newaxis, :, np.newaxis, np.newaxis] * downscaled_centerbias
+        x = normalize_low_res(x, centerbias.shape[1:])
+
+        predictions = x - np.log(self.components)
+        prediction = predictions.logsumexp(dim=(1), keepdim=True)
+
+        if upsample:
+            prediction = upsample_log_density(prediction, centerbias)
+
         return prediction
 
+    def forward(self, x, centerbias, upsample=True):
+        return self.readout(self.extract_features(x), centerbias, upsample=upsample)
+
+    def train(self, mode=True):
+        if mode:
+            raise NotImplementedError("FusedDeepGazeIIIMixture is inference-only")
+        return super().train(False)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _backbone_executor(workers):
+    """Thread pool shared by all MixtureModels running `workers` sub-models at once"""
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deepgaze-backbone")
+        return _executors[workers]
+
+
+def _in_caller_context(fn):
+    """Wraps `fn` to run with the calling thread's grad / inference mode and autocast state (all thread-local)"""
+    grad_enabled = torch.is_grad_enabled()
+    inference_mode = torch.is_inference_mode_enabled()
+    autocasts = [(device, torch.get_autocast_dtype(device)) for device in ('cpu', 'cuda') if torch.is_autocast_enabled(device)]
+
+    def run(*args):
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(torch.set_grad_enabled(grad_enabled))
+            if inference_mode:
+                stack.enter_context(torch.inference_mode())
+            for device, dtype in autocasts:
+                stack.enter_context(torch.autocast(device, dtype=dtype))
+            return fn(*args)
+    return run
+
 
 class MixtureModel(torch.nn.Module):
-    def __init__(self, models):
+    def __init__(self, models, parallel=0):
+        """
+        `parallel` > 1 runs the sub-models concurrently on that many threads (torch
+        ops release the GIL, so the backbones overlap); 0 or 1 runs them in turn.
+        """
         super().__init__()
         self.models = torch.nn.ModuleList(models)
+        self.parallel = parallel
+
+    def forward(self, x, centerbias, *args, **kwargs):
+        if self._low_res():
+            # combine the sub-models at their common smoothing resolution and upsample once
+            predictions = self._map(lambda model: model.forward(x, centerbias, *args, upsample=False, **kwargs), self.models)
+            return upsample_log_density(self._combine(predictions), centerbias)
+        predictions = self._map(lambda model: model.forward(x, centerbias, *args, **kwargs), self.models)
+        return self._combine(predictions)
+
+    def extract_features(self, x):
+        """Computes every sub-model's readout input, e.g. to cache and reuse with `readout`"""
+        return self._map(lambda model: model.extract_features(x), self.models)
+
+    def readout(self, features, centerbias, *args, **kwargs):
+        """Computes the mixture log density from `extract_features` output"""
+        if self._low_res():
+            predictions = self._map(lambda model, item: model.readout(item, centerbias, *args, upsample=False, **kwargs), self.models, features)
+            return upsample_log_density(self._combine(predictions), centerbias)
+        predictions = self._map(lambda model, item: model.readout(item, centerbias, *args, **kwargs), self.models, features)
+        return self._combine(predictions)
+
+    def _low_res(self):
+        # sub-models return low resolution log densities of the same size only if they
+        # are mixtures smoothing at one common saliency map factor
+        factors = set()
+        for model in self.models:
+            if isinstance(model, DeepGazeIIIMixture):
+                factors |= {finalizer.saliency_map_factor for finalizer in model.finalizers}
+            elif isinstance(model, FusedDeepGazeIIIMixture):
+                factors.add(model.saliency_map_factor)
+            else:
+                return False
+        return len(factors) == 1
+
+    def _map(self, fn, *iterables):
+        if self.parallel > 1 and len(self.models) > 1 and not torch.compiler.is_compiling():
+            return list(_backbone_executor(self.parallel).map(_in_caller_context(fn), *iterables))
+        return list(map(fn, *iterables))
 
-    def forward(self, *args, **kwargs):
-        predictions = [model.forward(*args, **kwargs) for model in self.models]
+    def _combine(self, predictions):
         predictions = torch.cat(predictions, dim=1)
         predictions -= np.log(len(self.models))
         prediction = predictions.logsumexp(dim=(1), keepdim=True)
 
         return prediction
+
+    def prune(self):
+        """Frees the backbone layers after the last tapped feature of every sub-model (see FeatureExtractor.prune)"""
+        for model in self.models:
+            model.features.prune()
+        return self
+
+    def subset(self, models=None, components=None):
+        """Returns a smaller ensemble sharing weights with this one
+
+        Keeps the sub-models at indices `models` (default: all) and cuts every
+        DeepGazeIIIMixture to its first `components` readout components (default: all).
+        """
+        selected = [self.models[k] for k in models] if models is not None else list(self.models)
+        if components is not None:
+            selected = [model.subset(components) if isinstance(model, DeepGazeIIIMixture) else model for model in selected]
+        subset = MixtureModel(selected, parallel=self.parallel)
+        subset.train(self.training)
+        return subset
+
+    def fused(self):
+        """Returns an inference-only copy with every DeepGazeIIIMixture replaced by its fused version"""
+        models = [model.fused() if isinstance(model, DeepGazeIIIMixture) else model for model in self.models]
+        fused = MixtureModel(models, parallel=self.parallel)
+        fused.eval()
+        return fused
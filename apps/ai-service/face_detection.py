@@ -0,0 +1,185 @@
+"""
+Face Detection Module
+Pluggable face detectors for the enhanced saliency mode.
+
+The enhanced model used to run the Haar cascade at scaleFactor=1.1 over the
+full-resolution screenshot, and again for every identical upload. Detectors
+here share one `FaceDetector.detect` front end that:
+
+- detects on a copy downscaled to at most `max_side` pixels and maps the boxes
+  back to full-resolution coordinates;
+- memoizes the boxes per image hash (LRU), so re-analysing the same
+  screenshot (variants, retries, batch duplicates) skips detection.
+
+Backends: `HaarFaceDetector` (bundled OpenCV cascade, no extra files) and
+`DnnFaceDetector` (OpenCV DNN with a local SSD face model, e.g. the res10
+caffe model or its ONNX export). Pick one with FACE_DETECTOR=haar|dnn.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def image_hash(gray):
+    """
+    SHA-1 of a grayscale image's pixels (and shape), used as the cache key.
+    """
+    digest = hashlib.sha1()
+    digest.update(str(gray.shape).encode())
+    digest.update(np.ascontiguousarray(gray).tobytes())
+    return digest.hexdigest()
+
+
+class FaceDetector:
+    name = "base"
+
+    def __init__(self, max_side=None, cache_entries=None):
+        """
+        Args:
+            max_side (int, optional): Detection runs on a copy whose longer side is at most
+                this many pixels; 0 disables downscaling (default: FACE_DETECT_MAX_SIDE env var or 1280).
+            cache_entries (int, optional): Images whose boxes are memoized; 0 disables the cache
+                (default: FACE_CACHE_ENTRIES env var or 256).
+        """
+        self.max_side = int(os.getenv("FACE_DETECT_MAX_SIDE", 1280)) if max_side is None else max_side
+        self.cache_entries = int(os.getenv("FACE_CACHE_ENTRIES", 256)) if cache_entries is None else cache_entries
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def detect(self, gray):
+        """
+        Detects faces in a uint8 (H, W) grayscale image.
+
+        Returns:
+            np.ndarray: (N, 4) int array of (x, y, w, h) boxes in `gray` coordinates.
+        """
+        key = image_hash(gray) if self.cache_entries > 0 else None
+        if key is not None:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key].copy()
+
+        h, w = gray.shape[:2]
+        scale = 1.0
+        if self.max_side > 0 and max(h, w) > self.max_side:
+            scale = self.max_side / max(h, w)
+            small = cv2.resize(gray, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        else:
+            small = gray
+
+        boxes = np.asarray(self._detect(small, scale), dtype=np.float64).reshape(-1, 4)
+        if scale != 1.0:
+            boxes = boxes / scale
+        boxes = np.round(boxes).astype(np.int32)
+
+        if key is not None:
+            with self._lock:
+                self._cache[key] = boxes
+                while len(self._cache) > self.cache_entries:
+                    self._cache.popitem(last=False)
+        return boxes.copy()
+
+    def _detect(self, gray, scale):
+        """
+        Backend hook: (x, y, w, h) boxes in `gray` coordinates. `scale` is the
+        downscale factor applied to the original image (for size thresholds).
+        """
+        raise NotImplementedError
+
+
+class HaarFaceDetector(FaceDetector):
+    name = "haar"
+
+    def __init__(self, cascade_path=None, scale_factor=1.1, min_neighbors=5, min_size=30, **kwargs):
+        """
+        Args:
+            cascade_path (str, optional): Cascade XML (default: OpenCV's frontal face cascade).
+            min_size (int): Smallest face in original-image pixels.
+        """
+        super().__init__(**kwargs)
+        cascade_path = cascade_path or cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load face cascade: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def _detect(self, gray, scale):
+        min_size = max(1, round(self.min_size * scale))
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                              minSize=(min_size, min_size))
+        return faces if len(faces) > 0 else np.zeros((0, 4))
+
+
+class DnnFaceDetector(FaceDetector):
+    name = "dnn"
+
+    def __init__(self, model_path, config_path=None, confidence=0.5, input_size=300, mean=(104.0, 177.0, 123.0), **kwargs):
+        """
+        Args:
+            model_path (str): SSD face model (`.caffemodel` or `.onnx`) with a (1, 1, N, 7) detection output.
+            config_path (str, optional): Caffe prototxt (not needed for ONNX).
+            confidence (float): Minimum detection score.
+            input_size (int): Network input side in pixels.
+            mean (tuple): BGR mean subtracted by `blobFromImage`.
+        """
+        super().__init__(**kwargs)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Face model not found: {model_path}")
+        self.net = cv2.dnn.readNet(model_path, config_path) if config_path else cv2.dnn.readNet(model_path)
+        self.confidence = confidence
+        self.input_size = input_size
+        self.mean = mean
+        # cv2.dnn.Net is not thread-safe
+        self._net_lock = threading.Lock()
+
+    def _detect(self, gray, scale):
+        h, w = gray.shape[:2]
+        bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        blob = cv2.dnn.blobFromImage(bgr, 1.0, (self.input_size, self.input_size), self.mean)
+        with self._net_lock:
+            self.net.setInput(blob)
+            detections = self.net.forward()
+
+        boxes = []
+        for detection in detections.reshape(-1, 7):
+            if detection[2] < self.confidence:
+                continue
+            x1, y1 = max(0.0, detection[3] * w), max(0.0, detection[4] * h)
+            x2, y2 = min(float(w), detection[5] * w), min(float(h), detection[6] * h)
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return np.array(boxes).reshape(-1, 4)
+
+
+def create_face_detector(backend=None, **kwargs):
+    """
+    Builds the configured face detector.
+
+    FACE_DETECTOR selects the backend ("haar" by default, or "dnn" with
+    FACE_DNN_MODEL / FACE_DNN_CONFIG / FACE_DNN_CONFIDENCE). A DNN model that
+    can't be loaded falls back to the Haar cascade.
+    """
+    backend = (backend or os.getenv("FACE_DETECTOR", "haar")).lower()
+    if backend == "dnn":
+        model_path = os.getenv("FACE_DNN_MODEL", "models/res10_300x300_ssd_iter_140000.caffemodel")
+        config_path = os.getenv("FACE_DNN_CONFIG", "models/deploy.prototxt")
+        try:
+            return DnnFaceDetector(
+                model_path,
+                config_path if os.path.exists(config_path) else None,
+                confidence=float(os.getenv("FACE_DNN_CONFIDENCE", 0.5)),
+                **kwargs,
+            )
+        except Exception as e:
+            print(f"Warning: DNN face detector unavailable ({e}). Falling back to Haar cascade.")
+    elif backend != "haar":
+        print(f"Warning: Unknown FACE_DETECTOR '{backend}'. Using Haar cascade.")
+    return HaarFaceDetector(**kwargs)
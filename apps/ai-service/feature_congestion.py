@@ -10,6 +10,8 @@ to estimate the difficulty of visual search (clutter).
 import cv2
 import numpy as np
 
+from analysis_context import as_context
+
 def compute_local_variance(image_channel, window_size=16):
     """
     Computes local variance using the E[X^2] - E[X]^2 trick with box filters.
@@ -78,6 +80,7 @@ def normalize_map(feature_map, mode="percentile"):
 def compute_feature_congestion(image_path, window_size=16):
     """
     Main function to compute Rosenholtz-style Feature Congestion.
+    `image_path` may also be an AnalysisContext.
     
     Returns:
         dict: {
@@ -88,13 +91,12 @@ def compute_feature_congestion(image_path, window_size=16):
             "grade": str (A/B/C/D)
         }
     """
-    img = cv2.imread(image_path)
-    if img is None:
-        raise ValueError(f"Could not load image: {image_path}")
+    # Raises ValueError if the image can't be loaded
+    ctx = as_context(image_path)
         
     # 1. Color Variance (CIELAB)
     # Convert to LAB to separate luminance (L) from color (a, b)
-    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    lab = ctx.lab
     l_channel, a_channel, b_channel = cv2.split(lab)
     
     var_a = compute_local_variance(a_channel, window_size)
@@ -0,0 +1,222 @@
+"""
+Incremental Saliency Module
+Re-predicts only the regions of a page that changed since a previous analysis.
+
+Designers re-upload versions of the same page that differ in a banner or a
+button. With `/analyze?reference_id=<analysis_id>` the new upload is diffed
+against the referenced one:
+
+1. `diff_regions` finds bounding boxes of changed pixels;
+2. `plan_patches` pads each box with context; only those crops are run
+   through the DeepGaze backbones and their features are pasted into the
+   cached features of the previous version
+   (`SaliencyEngine.log_density_incremental`);
+3. the readout runs once over the merged features, so the page-wide
+   normalizations of the readout see the whole page as in a full prediction;
+4. `attention_delta` compares the result with the stored log density of the
+   previous version, overall and per changed region.
+
+Raw log densities of finished analyses are kept by `LogDensityStore`.
+"""
+
+import glob
+import os
+import re
+import time
+
+import cv2
+import numpy as np
+
+# Max channel difference for a pixel to count as changed (ignores re-encoding noise)
+DIFF_THRESHOLD = int(os.getenv("INCREMENTAL_DIFF_THRESHOLD", 24))
+# Context added around each changed region before re-inference, in pixels
+CONTEXT_PADDING = int(os.getenv("INCREMENTAL_CONTEXT_PX", 256))
+# Above this fraction of re-inferred pixels a full prediction is cheaper
+MAX_REINFER_FRACTION = float(os.getenv("INCREMENTAL_MAX_FRACTION", 0.6))
+
+ANALYSIS_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class LogDensityStore:
+    def __init__(self, directory="cache/log_densities", max_entries=None):
+        """
+        Args:
+            directory (str): Where raw DeepGaze log densities are kept (float16 `.npy`).
+            max_entries (int, optional): Oldest densities are removed beyond this count
+                (default: INCREMENTAL_STORE_MAX_ENTRIES env var or 200).
+        """
+        self.directory = directory
+        self.max_entries = max_entries or int(os.getenv("INCREMENTAL_STORE_MAX_ENTRIES", 200))
+
+    def path(self, analysis_id):
+        if not ANALYSIS_ID_PATTERN.fullmatch(analysis_id or ""):
+            raise ValueError(f"Invalid analysis id: {analysis_id}")
+        return os.path.join(self.directory, f"{analysis_id}.npy")
+
+    def save(self, analysis_id, log_density):
+        # float16 keeps the density within ~0.4% and halves the footprint
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(analysis_id)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, log_density.astype(np.float16))
+        os.replace(tmp_path, path)
+        self._evict()
+        return path
+
+    def load(self, analysis_id):
+        """
+        Returns the stored float32 log density, or None.
+        """
+        path = self.path(analysis_id)
+        if not os.path.exists(path):
+            return None
+        return np.load(path).astype(np.float32)
+
+    def _evict(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.npy")), key=os.path.getmtime)
+        for path in paths[:max(0, len(paths) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def diff_regions(previous, current, threshold=DIFF_THRESHOLD, min_area=16, merge_gap=16):
+    """
+    Bounding boxes (x, y, w, h) of the regions that differ between two (H, W, 3) images.
+
+    Changed pixels are dilated by `merge_gap` so the glyphs of a reworded line
+    or the parts of a redesigned button form one region.
+    """
+    changed = (cv2.absdiff(previous, current).max(axis=2) > threshold).astype(np.uint8)
+    if not changed.any():
+        return []
+    if merge_gap > 0:
+        size = 2 * (merge_gap // 2) + 1
+        changed = cv2.dilate(changed, np.ones((size, size), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(changed, connectivity=8)
+    return [tuple(int(v) for v in stats[k, :4]) for k in range(1, count) if stats[k, cv2.CC_STAT_AREA] >= min_area]
+
+
+def pad_box(box, padding, shape):
+    """
+    Grows an (x, y, w, h) box by `padding` pixels on each side, clipped to `shape` (H, W).
+    """
+    x, y, w, h = box
+    x0, y0 = max(0, x - padding), max(0, y - padding)
+    x1, y1 = min(shape[1], x + w + padding), min(shape[0], y + h + padding)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+def plan_patches(regions, shape, padding=CONTEXT_PADDING):
+    """
+    Groups changed regions into (crop, zone) boxes for re-inference.
+
+    The zone (region + padding / 2) is where features are replaced: backbone
+    features near a change see it through their receptive field. The crop
+    (region + padding) adds context so the zone's features are not distorted
+    by the crop edges. Regions whose crops overlap are merged, so no pixel is
+    run through the backbones twice.
+    """
+    boxes = [list(box) for box in regions]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlaps(pad_box(boxes[i], padding, shape), pad_box(boxes[j], padding, shape)):
+                    boxes[i] = _union(boxes[i], boxes[j])
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return [(pad_box(box, padding, shape), pad_box(box, padding // 2, shape)) for box in boxes]
+
+
+def attention_delta(previous_log_density, log_density, regions=()):
+    """
+    Attention shift between two versions of a page (percent of total attention).
+
+    Returns:
+        dict: total_shift (total variation distance between the two densities)
+            and, per changed region, its previous / current share and the delta.
+    """
+    previous = np.exp(previous_log_density.astype(np.float64))
+    current = np.exp(log_density.astype(np.float64))
+    previous /= previous.sum()
+    current /= current.sum()
+
+    region_deltas = []
+    for (x, y, w, h) in regions:
+        before = float(previous[y:y + h, x:x + w].sum()) * 100
+        after = float(current[y:y + h, x:x + w].sum()) * 100
+        region_deltas.append({
+            "box": [int(x), int(y), int(w), int(h)],
+            "previous_share": round(before, 2),
+            "current_share": round(after, 2),
+            "delta": round(after - before, 2),
+        })
+
+    return {
+        "total_shift": round(float(np.abs(current - previous).sum()) * 50, 2),
+        "regions": region_deltas,
+    }
+
+
+def predict_incremental(engine, img_np, previous_img, previous_log_density, padding=CONTEXT_PADDING,
+                        max_fraction=MAX_REINFER_FRACTION, precision="fp32", tier="full"):
+    """
+    Log density of `img_np` reusing the backbone features of a previous version.
+
+    Falls back to a full prediction when the page size changed, when too much
+    of it would have to be re-inferred, or when the previous version's
+    features are no longer cached by the engine.
+
+    Returns:
+        (log_density, comparison): comparison describes the mode, the changed
+        regions, the re-inferred fraction, timing and the attention delta.
+    """
+    h, w = img_np.shape[:2]
+    start = time.perf_counter()
+    comparison = {"mode": "incremental"}
+
+    if previous_img.shape != img_np.shape or previous_log_density.shape != (h, w):
+        comparison.update(mode="full", reason="size changed")
+        log_density = engine.log_density(img_np, precision, tier)
+        comparison["seconds"] = round(time.perf_counter() - start, 4)
+        return log_density, comparison
+
+    regions = diff_regions(previous_img, img_np)
+    patches = plan_patches(regions, (h, w), padding)
+    reinfer_fraction = sum(cw * ch for (_, _, cw, ch), _ in patches) / float(h * w)
+    comparison.update(
+        changed_regions=[list(region) for region in regions],
+        changed_fraction=round(sum(rw * rh for (_, _, rw, rh) in regions) / float(h * w), 4),
+        reinferred_fraction=round(reinfer_fraction, 4),
+    )
+
+    log_density = None
+    if reinfer_fraction > max_fraction:
+        comparison.update(mode="full", reason="large change")
+    else:
+        print(f"Incremental inference: {len(patches)} region(s), {reinfer_fraction:.1%} of the page")
+        log_density = engine.log_density_incremental(img_np, previous_img, patches, precision, tier)
+        if log_density is None:
+            comparison.update(mode="full", reason="reference features not cached")
+    if log_density is None:
+        log_density = engine.log_density(img_np, precision, tier)
+
+    comparison["seconds"] = round(time.perf_counter() - start, 4)
+    comparison["attention_delta"] = attention_delta(previous_log_density, log_density, regions)
+    return log_density, comparison
+
+
+def _overlaps(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _union(a, b):
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return [x0, y0, x1 - x0, y1 - y0]
@@ -0,0 +1,164 @@
+"""
+Job Queue Module
+Runs analyses off the event loop on a bounded worker pool.
+
+POST handlers submit a job and return its id immediately; workers run the
+blocking saliency / report / Selenium pipeline and record progress events that
+clients poll (GET /jobs/{id}) or stream over SSE (GET /jobs/{id}/events).
+
+- Concurrency: JOB_WORKERS worker threads (default 2). Workers share the
+  process-wide DeepGaze engine, so the weights are loaded once.
+- Backpressure: submit() raises QueueFullError once JOB_QUEUE_MAX_DEPTH jobs
+  (default 32) are waiting; the API turns that into a 429.
+- Priority lanes: jobs are dequeued by plan ("plus" before "base" before
+  "free"), first-in first-out within a lane.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+
+# Lower value = dequeued first; unknown plans wait in the free lane
+PLAN_PRIORITY = {"plus": 0, "base": 1, "free": 2}
+
+class QueueFullError(Exception):
+    pass
+
+class JobQueue:
+    def __init__(self, handlers, workers=None, max_depth=None, retention_seconds=None):
+        """
+        Args:
+            handlers (dict): Job kind -> callable(payload, progress) returning the job result.
+                `progress(stage)` records a progress event for the job.
+            workers (int, optional): Worker pool size (default: JOB_WORKERS env var or 2).
+            max_depth (int, optional): Max queued (not yet running) jobs
+                (default: JOB_QUEUE_MAX_DEPTH env var or 32).
+            retention_seconds (int, optional): How long finished jobs stay queryable
+                (default: JOB_RETENTION_SECONDS env var or 3600).
+        """
+        self.handlers = handlers
+        self.workers = workers or int(os.getenv("JOB_WORKERS", 2))
+        self.max_depth = max_depth or int(os.getenv("JOB_QUEUE_MAX_DEPTH", 32))
+        self.retention_seconds = retention_seconds or int(os.getenv("JOB_RETENTION_SECONDS", 3600))
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """
+        Starts the worker threads (idempotent).
+        """
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        print(f"Job queue started with {self.workers} worker(s).")
+
+    def submit(self, kind, payload, plan="free"):
+        """
+        Queues a job and returns its id. Raises QueueFullError when the queue is full.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "plan": plan,
+            "payload": payload,
+            "status": "queued",
+            "stage": "queued",
+            "result": None,
+            "error": None,
+            "created": now,
+            "started": None,
+            "finished": None,
+            "events": [{"stage": "queued", "time": now}],
+        }
+
+        with self._lock:
+            self._prune()
+            queued = sum(1 for other in self._jobs.values() if other["status"] == "queued")
+            if queued >= self.max_depth:
+                raise QueueFullError(f"Job queue is full ({queued} jobs waiting). Try again later.")
+            self._jobs[job_id] = job
+
+        self._queue.put((PLAN_PRIORITY.get(plan, PLAN_PRIORITY["free"]), next(self._sequence), job_id))
+        return job_id
+
+    def get(self, job_id):
+        """
+        Returns a snapshot of the job (without its payload and event log), or None if unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {key: value for key, value in job.items() if key not in ("events", "payload")}
+            if job["status"] == "queued":
+                # number of queued jobs that will run before this one
+                snapshot["position"] = self._position(job)
+            return snapshot
+
+    def events_since(self, job_id, index):
+        """
+        Returns (events recorded after `index`, finished flag) for a job.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return [], True
+            return list(job["events"][index:]), job["status"] in ("done", "failed")
+
+    def _position(self, job):
+        priority = PLAN_PRIORITY.get(job["plan"], PLAN_PRIORITY["free"])
+        ahead = 0
+        for other in self._jobs.values():
+            if other["status"] != "queued" or other is job:
+                continue
+            other_priority = PLAN_PRIORITY.get(other["plan"], PLAN_PRIORITY["free"])
+            if other_priority < priority or (other_priority == priority and other["created"] <= job["created"]):
+                ahead += 1
+        return ahead
+
+    def _record(self, job_id, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            event = {"stage": job["stage"], "time": time.time()}
+            if job["status"] in ("done", "failed"):
+                event["status"] = job["status"]
+            job["events"].append(event)
+
+    def _worker(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is None:
+                continue
+
+            self._record(job_id, status="running", stage="started", started=time.time())
+            try:
+                result = self.handlers[job["kind"]](job["payload"], lambda stage: self._record(job_id, stage=stage))
+                self._record(job_id, status="done", stage="done", result=result, finished=time.time())
+            except Exception as e:
+                print(f"Job {job_id} failed: {e}")
+                self._record(job_id, status="failed", stage="failed", error=str(e), finished=time.time())
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job["finished"] and job["finished"] < cutoff]:
+            del self._jobs[job_id]
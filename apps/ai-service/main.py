@@ -1,9 +1,11 @@
 import os
 import json
-import shutil
+import asyncio
+import threading
 import uuid
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
@@ -17,6 +19,11 @@ load_dotenv()
 from saliency_model import SaliencyModel as OriginalModel
 from saliency_model_enhanced import SaliencyModel as EnhancedModel
 from report_generator import generate_report
+from result_cache import ResultCache
+from job_queue import JobQueue, QueueFullError
+from analysis_context import density_sidecar_path
+from incremental import LogDensityStore, predict_incremental
+from upload_ingest import RequestSizeLimit, RequestTooLarge, UploadTooLarge, decode_image, ingest_upload
 
 app = FastAPI(title="UVolution AI API")
 
@@ -32,6 +39,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Caps request bodies as they arrive (each file is also capped while it is read)
+app.add_middleware(RequestSizeLimit)
+
+@app.exception_handler(RequestTooLarge)
+async def request_too_large(request, exc):
+    return JSONResponse(status_code=413, content={"success": False, "error": exc.detail})
+
 # Create directories for uploads, outputs, and reports
 os.makedirs("uploads", exist_ok=True)
 os.makedirs("outputs", exist_ok=True)
@@ -46,93 +60,462 @@ app.mount("/reports", StaticFiles(directory="reports"), name="reports")
 # === MODEL SELECTION ===
 USE_ENHANCED = True
 
-# Initialize model
+# Both variants post-process the density of one shared DeepGaze IIE engine,
+# so the 4-backbone weights are loaded once and an image analysed in both
+# variants only runs through the backbones once.
 if USE_ENHANCED:
     print("=" * 60)
     print("UVOLUTION AI - ENHANCED MODE (API)")
     print("=" * 60)
-    model = EnhancedModel(enhanced_mode=True)
 else:
     print("=" * 60)
     print("UVOLUTION AI - STANDARD MODE (API)")
     print("=" * 60)
-    model = OriginalModel()
+
+saliency_models = {
+    "enhanced": EnhancedModel(enhanced_mode=True),
+    "standard": OriginalModel(),
+}
+DEFAULT_VARIANT = "enhanced" if USE_ENHANCED else "standard"
+model = saliency_models[DEFAULT_VARIANT]
+
+def predict_variants(file_location, variant=None, log_density=None, precision="fp32", tier="full", image=None):
+    """
+    Runs the requested saliency variant ("enhanced", "standard" or "compare").
+    "compare" renders the default variant for the report plus every other
+    variant under outputs/saliency_<variant>_<file> for A/B comparison.
+    A precomputed DeepGaze `log_density` is post-processed instead of running inference;
+    `precision` and `tier` are the inference precision and latency tier (see `SaliencyEngine.plan_settings`).
+    `image` is the already decoded upload (the file is read otherwise).
+
+    Returns (predict_result of the reported variant, {variant: saliency_map_path}).
+    """
+    variant = variant or DEFAULT_VARIANT
+    if variant == "compare":
+        result = model.predict_result(file_location, log_density=log_density, precision=precision, tier=tier, image=image)
+        variants = {DEFAULT_VARIANT: result["overlay_path"]}
+        for name, variant_model in saliency_models.items():
+            if name != DEFAULT_VARIANT:
+                variants[name] = variant_model.predict(file_location, output_prefix=f"saliency_{name}_", log_density=result["log_density"], precision=precision, tier=tier,
+                                                       image=image)
+        return result, variants
+
+    if variant not in saliency_models:
+        raise ValueError(f"Unknown saliency variant: {variant}")
+    result = saliency_models[variant].predict_result(file_location, log_density=log_density, precision=precision, tier=tier, image=image)
+    return result, {variant: result["overlay_path"]}
+
+# Raw DeepGaze log densities of finished analyses, for incremental re-analysis
+density_store = LogDensityStore()
+
+def analysis_id_for(file_location):
+    """
+    Analysis id of an upload (its UUID file stem); pass it as `reference_id` to compare versions.
+    """
+    return os.path.splitext(os.path.basename(file_location))[0]
+
+def store_log_density(file_location, log_density):
+    try:
+        density_store.save(analysis_id_for(file_location), log_density)
+    except Exception as e:
+        print(f"Could not store log density: {e}")
+
+def store_cached_log_density(file_location, cached):
+    """
+    Lets an upload served from the result cache serve as a reference for later versions too.
+    """
+    previous_log_density = density_store.load(cached["analysis_id"]) if cached.get("analysis_id") else None
+    if previous_log_density is not None:
+        store_log_density(file_location, previous_log_density)
+
+def reference_log_density(file_location, reference_id, precision="fp32", tier="full", image=None):
+    """
+    Predicts an upload incrementally against a previous analysis (see incremental.py).
+    Returns (log_density, comparison); log_density is None if the reference is unavailable.
+    """
+    import glob
+
+    try:
+        previous_log_density = density_store.load(reference_id)
+    except ValueError:
+        previous_log_density = None
+    previous_paths = sorted(glob.glob(f"uploads/{reference_id}.*")) if previous_log_density is not None else []
+    if not previous_paths:
+        print(f"Reference analysis {reference_id} not found. Running full analysis.")
+        return None, {"reference_id": reference_id, "mode": "full", "reason": "reference not found"}
+
+    previous_img = decode_image(previous_paths[0])
+    img_np = image if image is not None else decode_image(file_location)
+    log_density, comparison = predict_incremental(model.engine, img_np, previous_img, previous_log_density, precision=precision, tier=tier)
+    comparison["reference_id"] = reference_id
+    return log_density, comparison
+
+# Simulated DeepGaze III scanpaths feed the report's gaze path efficiency (one extra
+# DenseNet-201 pass per analysis, so opt-in)
+SCANPATH_REPORTS = os.getenv("SCANPATH_REPORTS", "0") == "1"
+SCANPATH_MAX_COUNT = int(os.getenv("SCANPATH_MAX_COUNT", 50))
+SCANPATH_MAX_FIXATIONS = int(os.getenv("SCANPATH_MAX_FIXATIONS", 30))
+
+def simulate_scanpaths(file_location, scanpaths=10, fixations=8, seed=None, image=None):
+    """
+    DeepGaze III scanpaths on an image (see scanpath_engine.py), sharing the
+    center bias of the DeepGaze IIE engine. `image` is the already decoded upload.
+    """
+    from scanpath_engine import get_scanpath_engine
+
+    img_np = image if image is not None else decode_image(file_location)
+    return get_scanpath_engine(model.engine.centerbias).simulate(img_np, scanpaths=scanpaths, fixations=fixations, seed=seed)
+
+# Finished analyses keyed by image content + model version + plan + variant + model tier + precision
+result_cache = ResultCache()
+
+def cache_key_for(file_location, plan, variant=None, tier="full", image=None, precision="fp32"):
+    """
+    Builds the result cache key of an image (None if it can't be decoded).
+    `image` is the already decoded upload; the file is decoded otherwise.
+    """
+    if image is None:
+        try:
+            image = decode_image(file_location)
+        except Exception as e:
+            print(f"Could not hash image for result cache: {e}")
+            return None
+    return result_cache.make_key(image, plan=plan, variant=variant or DEFAULT_VARIANT, tier=tier, precision=precision)
+
+def cache_analysis(cache_key, saliency_map_path, report_result, variants=None, analysis_id=None):
+    """
+    Stores a finished analysis so repeat uploads of the same image can skip the pipeline.
+    """
+    if cache_key is None:
+        return
+    variants = variants or {}
+    files = [saliency_map_path, report_result[0], *variants.values()]
+    result_cache.put(cache_key, {
+        "saliency_map_path": saliency_map_path,
+        "report_result": list(report_result),
+        "variants": variants,
+        "analysis_id": analysis_id,
+    }, files=files)
+
+def run_analysis(file_location, plan="free", variant=None, timestamp=None, progress=None, reference_id=None, tier=None, upload=None):
+    """
+    Saliency prediction + report for one image, served from the result cache when possible.
+    `progress(stage)` is called as the pipeline advances (used by the job queue).
+    With `reference_id` (a previous analysis id) only the changed regions are
+    re-predicted and the attention delta is reported as metrics.comparison.
+    `tier` ("fast", "balanced" or "full") overrides the plan's model tier.
+    `upload` (the `upload_ingest.Upload` of `file_location`) supplies the decoded image;
+    its write to disk is only waited for before the report, whose Gemini stages read the file.
+
+    Returns (saliency_map_path, report_result, variants, cached).
+    """
+    progress = progress or (lambda stage: None)
+    precision, tier = model.engine.plan_settings(plan, tier)
+    image = upload.image if upload is not None else None
+    cache_key = cache_key_for(file_location, plan, variant, tier, image=image, precision=precision)
+    # Comparisons are approximate and carry a delta, so they bypass the cache
+    cached = result_cache.get(cache_key) if cache_key and not reference_id else None
+    if cached is not None:
+        print("Serving cached analysis.")
+        store_cached_log_density(file_location, cached)
+        return cached["saliency_map_path"], tuple(cached["report_result"]), cached["variants"], True
+
+    progress("saliency")
+    log_density, comparison = reference_log_density(file_location, reference_id, precision, tier, image=image) if reference_id else (None, None)
+    saliency_result, variants = predict_variants(file_location, variant, log_density=log_density, precision=precision, tier=tier, image=image)
+    saliency_map_path = saliency_result["overlay_path"]
+    store_log_density(file_location, saliency_result["log_density"])
+
+    scanpaths = None
+    if SCANPATH_REPORTS:
+        progress("scanpaths")
+        try:
+            scanpaths = simulate_scanpaths(file_location, image=image)["scanpaths"]
+        except Exception as e:
+            print(f"Scanpath simulation failed, using hotspot order for the gaze path: {e}")
+
+    # Generate report from the float saliency map (the overlay is for display only)
+    progress("report")
+    if upload is not None:
+        upload.wait()
+    report_result = generate_report(file_location, saliency_map_path, timestamp=timestamp, plan=plan, saliency=saliency_result["saliency"],
+                                    scanpaths=scanpaths, image=image)
+    report_result[4].setdefault("timings", {}).update({f"saliency_{name}": seconds for name, seconds in saliency_result["timings"].items()})
+    # Working resolution scale / tiling / precision / tier used for the DeepGaze pass
+    report_result[4]["inference"] = saliency_result["info"]
+    if comparison is not None:
+        report_result[4]["comparison"] = comparison
+        if "seconds" in comparison:
+            report_result[4]["timings"]["saliency_incremental"] = comparison["seconds"]
+        return saliency_map_path, report_result, variants, False
+
+    cache_analysis(cache_key, saliency_map_path, report_result, variants, analysis_id=analysis_id_for(file_location))
+    return saliency_map_path, report_result, variants, False
 
 @app.get("/")
 async def health_check():
     return {"status": "healthy", "service": "UVolution AI API"}
 
-@app.post("/analyze")
-async def analyze_image(plan: str = "free", file: UploadFile = File(...)):
-    try:
-        # Save uploaded file
-        os.makedirs("uploads", exist_ok=True)
-        
-        # Generate unique filename using UUID
-        file_extension = os.path.splitext(file.filename)[1]
-        if not file_extension:
-            file_extension = ".png"
-            
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_location = f"uploads/{unique_filename}"
-        
-        # Generate timestamp for report filename
+@app.on_event("startup")
+def start_warm_up():
+    # Warm up in the background so the server accepts connections (and "/" answers) right away
+    threading.Thread(target=model.engine.warm_up, daemon=True).start()
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 until the DeepGaze warm-up pass has finished.
+    """
+    if not model.engine.ready.is_set():
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True}
+
+def upload_too_large_response(error):
+    return JSONResponse(status_code=413, content={"success": False, "error": str(error)})
+
+def build_analysis_response(file_location, saliency_map_path, report_result, variants=None, cached=False):
+    """
+    Builds the JSON payload returned for a finished analysis.
+    """
+    report_path, ia_structure, redesign_suggestion, marketing_consultation, report_metrics = report_result
+    
+    # Return absolute URLs or relative paths that the frontend can construct
+    # Use environment variable for base URL (Railway will provide the deployed URL)
+    base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
+    
+    response = {
+        "success": True,
+        "analysis_id": analysis_id_for(file_location),
+        "original_image": f"{base_url}/{file_location.replace(os.sep, '/')}",
+        "saliency_map": f"{base_url}/{saliency_map_path.replace(os.sep, '/')}",
+        "report": f"{base_url}/{report_path.replace(os.sep, '/')}",
+        "ia_structure": ia_structure,
+        "redesign_suggestion": redesign_suggestion,
+        "marketing_consultation": marketing_consultation,
+        "metrics": report_metrics
+    }
+    if variants and len(variants) > 1:
+        response["saliency_variants"] = {name: f"{base_url}/{path.replace(os.sep, '/')}" for name, path in variants.items()}
+    if cached:
+        response["cached"] = True
+    return response
+
+def analyze_job(payload, progress):
+    """
+    Job handler: saliency + report for an uploaded image.
+    """
+    # Popped so the decoded image isn't retained with the job
+    upload = payload.pop("upload")
+    file_location = upload.path
+    plan = payload["plan"]
+
+    # Generate timestamp for report filename
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Process image
+    print(f"Processing file: {file_location} (Plan: {plan})")
+
+    saliency_map_path, report_result, variants, cached = run_analysis(file_location, plan=plan, variant=payload.get("variant"), timestamp=timestamp, progress=progress,
+                                                                      reference_id=payload.get("reference_id"), tier=payload.get("tier"), upload=upload)
+    upload.wait()
+
+    return build_analysis_response(file_location, saliency_map_path, report_result, variants, cached=cached)
+
+def analyze_url_job(payload, progress):
+    """
+    Job handler: screenshot of a URL, then saliency + report.
+    """
+    from screenshot_utils import capture_screenshot
+
+    url = payload["url"]
+    plan = payload["plan"]
+
+    if not url.startswith("http"):
+        url = "https://" + url
+
+    # Generate unique filename
+    unique_filename = f"{uuid.uuid4()}.png"
+    file_location = f"uploads/{unique_filename}"
+
+    # Capture screenshot
+    progress("screenshot")
+    print(f"Capturing screenshot for: {url}")
+    success = capture_screenshot(url, file_location)
+
+    if not success:
+        raise RuntimeError("Failed to capture screenshot")
+
+    # Generate timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Process image using existing pipeline
+    print(f"Processing screenshot: {file_location} (Plan: {plan})")
+    saliency_map_path, report_result, variants, cached = run_analysis(file_location, plan=plan, timestamp=timestamp, progress=progress)
+
+    return build_analysis_response(file_location, saliency_map_path, report_result, variants, cached=cached)
+
+def analyze_batch_job(payload, progress):
+    """
+    Job handler: saliency + reports for several uploads, with one batched DeepGaze
+    pass per shape bucket instead of one per image.
+    """
+    uploads = payload.pop("uploads")
+    plan = payload["plan"]
+    file_locations = [upload.path for upload in uploads]
+    images = [upload.image for upload in uploads]
+    print(f"Processing batch of {len(file_locations)} file(s) (Plan: {plan})")
+
+    precision, tier = model.engine.plan_settings(plan, payload.get("tier"))
+    cache_keys = [cache_key_for(file_location, plan, tier=tier, image=image, precision=precision) for file_location, image in zip(file_locations, images)]
+    cached_results = [result_cache.get(cache_key) if cache_key else None for cache_key in cache_keys]
+    pending = [k for k, cached in enumerate(cached_results) if cached is None]
+
+    progress("saliency")
+    if not pending:
+        pending_results = []
+    elif hasattr(model, "predict_batch_results"):
+        pending_results = model.predict_batch_results([file_locations[k] for k in pending], precision=precision, tier=tier, images=[images[k] for k in pending])
+    else:
+        pending_results = [model.predict_result(file_locations[k], precision=precision, tier=tier, image=images[k]) for k in pending]
+    # Every item can serve as a `reference_id` for later versions, as in run_analysis
+    for k, saliency_result in zip(pending, pending_results):
+        store_log_density(file_locations[k], saliency_result["log_density"])
+    pending_results = iter(pending_results)
+
+    progress("report")
+    for upload in uploads:
+        upload.wait()
+
+    results = []
+    for k, (file_location, image, cache_key, cached) in enumerate(zip(file_locations, images, cache_keys, cached_results)):
+        if cached is not None:
+            store_cached_log_density(file_location, cached)
+            results.append(build_analysis_response(file_location, cached["saliency_map_path"], tuple(cached["report_result"]), cached=True))
+            continue
+
+        saliency_result = next(pending_results)
+        saliency_map_path = saliency_result["overlay_path"]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Convert to PNG to ensure compatibility with OpenCV (handles animated WebP, etc.)
         try:
-            from PIL import Image
-            img = Image.open(file_location)
-            img = img.convert('RGB') # Convert to RGB (removes alpha/animation)
-            
-            # Create new PNG filename
-            png_filename = os.path.splitext(unique_filename)[0] + ".png"
-            png_location = f"uploads/{png_filename}"
-            
-            # Save as PNG
-            img.save(png_location, "PNG")
-            
-            # Update file_location to point to the PNG
-            file_location = png_location
-            print(f"Converted to PNG: {file_location}")
-            
+            # Reports are named by timestamp, so keep them unique within the batch
+            report_result = generate_report(file_location, saliency_map_path, timestamp=timestamp, plan=plan, report_suffix=f"_{k}",
+                                            saliency=saliency_result["saliency"], image=image)
+            cache_analysis(cache_key, saliency_map_path, report_result, analysis_id=analysis_id_for(file_location))
+            results.append(build_analysis_response(file_location, saliency_map_path, report_result))
         except Exception as e:
-            print(f"Error converting image: {e}")
-            # Continue with original file if conversion fails (might fail later in OpenCV)
+            print(f"Error generating report for {file_location}: {str(e)}")
+            results.append({"success": False, "error": str(e)})
 
-        # Process image
-        print(f"Processing file: {file_location} (Plan: {plan})")
-        if os.path.exists(file_location):
-             print(f"File size: {os.path.getsize(file_location)} bytes")
-        else:
-             print("File does not exist!")
+    return {"success": True, "results": results}
 
-        saliency_map_path = model.predict(file_location)
-        
-        # Generate report
-        report_path, ia_structure, redesign_suggestion, marketing_consultation, report_metrics = generate_report(file_location, saliency_map_path, timestamp=timestamp, plan=plan)
-        
-        # Return absolute URLs or relative paths that the frontend can construct
-        # Use environment variable for base URL (Railway will provide the deployed URL)
-        base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
-        
-        return {
-            "success": True,
-            "original_image": f"{base_url}/{file_location.replace(os.sep, '/')}",
-            "saliency_map": f"{base_url}/{saliency_map_path.replace(os.sep, '/')}",
-            "report": f"{base_url}/{report_path.replace(os.sep, '/')}",
-            "ia_structure": ia_structure,
-            "redesign_suggestion": redesign_suggestion,
-            "marketing_consultation": marketing_consultation,
-            "metrics": report_metrics
-        }
+def scanpath_job(payload, progress):
+    """
+    Job handler: DeepGaze III scanpath simulation for an uploaded image.
+    """
+    upload = payload.pop("upload")
+    file_location = upload.path
+    progress("scanpaths")
+    result = simulate_scanpaths(file_location, scanpaths=payload["scanpaths"], fixations=payload["fixations"], seed=payload.get("seed"), image=upload.image)
+    upload.wait()
+
+    base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
+    return {
+        "success": True,
+        "original_image": f"{base_url}/{file_location.replace(os.sep, '/')}",
+        # one list of fixations per scanpath, first fixation = start (image center)
+        "scanpaths": [[{"x": round(float(x), 1), "y": round(float(y), 1)} for x, y in path] for path in result["scanpaths"]],
+        "working_size": result["working_size"],
+        "timings": result["timings"],
+    }
+
+# Blocking pipelines run on a bounded worker pool instead of the event loop.
+# Workers are threads so they share the single DeepGaze engine loaded above.
+job_queue = JobQueue({"analyze": analyze_job, "analyze-url": analyze_url_job, "analyze-batch": analyze_batch_job, "scanpath": scanpath_job})
+
+def submit_job(kind, payload, plan):
+    """
+    Queues a job. Returns (job_id, None), or (None, 429 response) when the queue is full.
+    """
+    try:
+        return job_queue.submit(kind, payload, plan=plan), None
+    except QueueFullError as e:
+        return None, JSONResponse(status_code=429, content={"success": False, "error": str(e)})
+
+def job_accepted_response(job_id):
+    return {
+        "success": True,
+        "job_id": job_id,
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events",
+    }
+
+async def wait_for_job(job_id, poll_interval=0.2):
+    """
+    Waits (without blocking the event loop) for a job and returns its response payload.
+    """
+    while True:
+        job = job_queue.get(job_id)
+        if job["status"] == "done":
+            return job["result"]
+        if job["status"] == "failed":
+            return {"success": False, "error": job["error"]}
+        await asyncio.sleep(poll_interval)
+
+@app.post("/analyze")
+async def analyze_image(plan: str = "free", variant: str = None, reference_id: str = None, tier: str = None, file: UploadFile = File(...)):
+    """
+    Analyses an upload. Pass the `analysis_id` of a previous version as
+    `reference_id` to re-predict only the changed regions and get the attention delta.
+    `tier` ("fast", "balanced" or "full") trades accuracy for latency.
+    """
+    try:
+        upload = await ingest_upload(file)
+        job_id, rejected = submit_job("analyze", {"upload": upload, "plan": plan, "variant": variant, "reference_id": reference_id, "tier": tier}, plan)
+        if rejected:
+            return rejected
+        return await wait_for_job(job_id)
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
     except Exception as e:
         print(f"Error processing image: {str(e)}")
         return {"success": False, "error": str(e)}
 
+@app.post("/scanpath")
+async def scanpath(plan: str = "free", scanpaths: int = 10, fixations: int = 8, seed: int = None, file: UploadFile = File(...)):
+    """
+    Simulates `scanpaths` viewing sequences of `fixations` fixations each with DeepGaze III.
+    """
+    if not (1 <= scanpaths <= SCANPATH_MAX_COUNT and 2 <= fixations <= SCANPATH_MAX_FIXATIONS):
+        return JSONResponse(status_code=400, content={
+            "success": False,
+            "error": f"scanpaths must be in [1, {SCANPATH_MAX_COUNT}] and fixations in [2, {SCANPATH_MAX_FIXATIONS}]",
+        })
+    try:
+        upload = await ingest_upload(file)
+        job_id, rejected = submit_job("scanpath", {"upload": upload, "scanpaths": scanpaths, "fixations": fixations, "seed": seed}, plan)
+        if rejected:
+            return rejected
+        return await wait_for_job(job_id)
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    except Exception as e:
+        print(f"Error simulating scanpaths: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+@app.post("/analyze-batch")
+async def analyze_batch(plan: str = "free", tier: str = None, files: list[UploadFile] = File(...)):
+    try:
+        uploads = [await ingest_upload(file) for file in files]
+        job_id, rejected = submit_job("analyze-batch", {"uploads": uploads, "plan": plan, "tier": tier}, plan)
+        if rejected:
+            return rejected
+        return await wait_for_job(job_id)
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    except Exception as e:
+        print(f"Error processing batch: {str(e)}")
+        return {"success": False, "error": str(e)}
+
 class UrlRequest(pydantic.BaseModel):
     url: str
     plan: str = "free"
@@ -140,51 +523,61 @@ class UrlRequest(pydantic.BaseModel):
 @app.post("/analyze-url")
 async def analyze_url(request: UrlRequest):
     try:
-        from screenshot_utils import capture_screenshot
-        
-        url = request.url
-        plan = request.plan
-        
-        if not url.startswith("http"):
-            url = "https://" + url
-            
-        # Generate unique filename
-        unique_filename = f"{uuid.uuid4()}.png"
-        file_location = f"uploads/{unique_filename}"
-        
-        # Capture screenshot
-        print(f"Capturing screenshot for: {url}")
-        success = capture_screenshot(url, file_location)
-        
-        if not success:
-             return {"success": False, "error": "Failed to capture screenshot"}
-             
-        # Generate timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Process image using existing pipeline
-        print(f"Processing screenshot: {file_location} (Plan: {plan})")
-        saliency_map_path = model.predict(file_location)
-        
-        # Generate report
-        report_path, ia_structure, redesign_suggestion, marketing_consultation, report_metrics = generate_report(file_location, saliency_map_path, timestamp=timestamp, plan=plan)
-        
-        base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
-        
-        return {
-            "success": True,
-            "original_image": f"{base_url}/{file_location.replace(os.sep, '/')}",
-            "saliency_map": f"{base_url}/{saliency_map_path.replace(os.sep, '/')}",
-            "report": f"{base_url}/{report_path.replace(os.sep, '/')}",
-            "ia_structure": ia_structure,
-            "redesign_suggestion": redesign_suggestion,
-            "marketing_consultation": marketing_consultation,
-            "metrics": report_metrics
-        }
+        job_id, rejected = submit_job("analyze-url", {"url": request.url, "plan": request.plan}, request.plan)
+        if rejected:
+            return rejected
+        return await wait_for_job(job_id)
     except Exception as e:
         print(f"Error processing URL: {str(e)}")
         return {"success": False, "error": str(e)}
 
+@app.post("/jobs/analyze")
+async def submit_analyze_job(plan: str = "free", variant: str = None, reference_id: str = None, tier: str = None, file: UploadFile = File(...)):
+    try:
+        upload = await ingest_upload(file)
+        job_id, rejected = submit_job("analyze", {"upload": upload, "plan": plan, "variant": variant, "reference_id": reference_id, "tier": tier}, plan)
+        return rejected or job_accepted_response(job_id)
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    except Exception as e:
+        print(f"Error queueing image: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+@app.post("/jobs/analyze-url")
+async def submit_analyze_url_job(request: UrlRequest):
+    job_id, rejected = submit_job("analyze-url", {"url": request.url, "plan": request.plan}, request.plan)
+    return rejected or job_accepted_response(job_id)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Job not found"})
+    return {"success": True, "job": job}
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-sent events: one `progress` event per pipeline stage, then a final
+    `result` event carrying the job snapshot (including the analysis result).
+    """
+    if job_queue.get(job_id) is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Job not found"})
+
+    async def event_stream():
+        index = 0
+        while True:
+            events, finished = job_queue.events_since(job_id, index)
+            index += len(events)
+            for event in events:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                yield f"event: result\ndata: {json.dumps(job_queue.get(job_id), default=str)}\n\n"
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.delete("/reports/{filename}")
 async def delete_report(filename: str):
     try:
@@ -246,6 +639,11 @@ async def delete_files(request: DeleteRequest):
                 os.remove(safe_path)
                 deleted.append(file_path)
                 print(f"Deleted: {safe_path}")
+
+                # Saliency overlays carry a float density sidecar
+                sidecar_path = density_sidecar_path(safe_path)
+                if safe_path.startswith("outputs") and os.path.exists(sidecar_path):
+                    os.remove(sidecar_path)
             except Exception as e:
                 errors.append(f"Failed to delete {file_path}: {str(e)}")
         else:
@@ -0,0 +1,83 @@
+"""
+Memory-mapped DeepGaze IIE weights.
+
+`DeepGazeIIE(pretrained=True)` downloads the DeepGaze IIE checkpoint on
+first run and unpickles it into private memory, so every uvicorn worker
+holds its own copy. `convert_weights` writes the state dict once to a flat
+file that `load_deepgaze` memory-maps (`torch.load(mmap=True)`) and assigns
+to the parameters without copying. Worker processes on the host share the
+same read-only page cache, and pages are read lazily, on the warm-up pass
+(see `SaliencyEngine.warm_up`).
+
+Convert once (at image build time, see the Dockerfile):
+
+    python model_weights.py --output models/deepgaze_iie.pth
+"""
+
+import os
+import time
+
+import torch
+
+import deepgaze_pytorch
+
+DEFAULT_WEIGHTS_PATH = "models/deepgaze_iie.pth"
+
+
+def convert_weights(path=DEFAULT_WEIGHTS_PATH):
+    """
+    Downloads the pretrained DeepGaze IIE and saves its state dict to `path` for `load_deepgaze`.
+    """
+    model = deepgaze_pytorch.DeepGazeIIE(pretrained=True)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_deepgaze(path=None):
+    """
+    Builds DeepGaze IIE with its weights memory-mapped from `path` (default:
+    SALIENCY_WEIGHTS env var or models/deepgaze_iie.pth), without any download.
+
+    Returns:
+        The model, or None (with a hint) if the converted weights are missing.
+    """
+    path = path or os.getenv("SALIENCY_WEIGHTS", DEFAULT_WEIGHTS_PATH)
+    if not os.path.exists(path):
+        print(f"No converted weights at {path} (run `python model_weights.py`). Downloading the checkpoint instead.")
+        return None
+
+    start = time.perf_counter()
+    # Build on the meta device: no memory is allocated or randomly initialized for weights
+    # that are replaced right away
+    with torch.device("meta"):
+        model = deepgaze_pytorch.DeepGazeIIE(pretrained=False, pretrained_backbones=False)
+    state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    # assign=True makes the parameters views of the mapped file instead of copying into fresh tensors
+    model.load_state_dict(state_dict, assign=True)
+    _materialize_constant_buffers(model)
+    print(f"Memory-mapped DeepGaze IIE weights from {path} in {time.perf_counter() - start:.2f}s")
+    return model
+
+
+def _materialize_constant_buffers(model):
+    # Non-persistent buffers (the backbones' Normalizer mean / std) aren't in the state dict.
+    # They are constants set in __init__, so take them from a fresh CPU instance.
+    for module in model.modules():
+        names = [name for name, buffer in module.named_buffers(recurse=False) if buffer.is_meta]
+        if names:
+            fresh = type(module)()
+            for name in names:
+                setattr(module, name, getattr(fresh, name))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert the DeepGaze IIE weights to a memory-mappable file")
+    parser.add_argument("--output", default=DEFAULT_WEIGHTS_PATH)
+    args = parser.parse_args()
+
+    print(f"Wrote {convert_weights(args.output)}")
@@ -0,0 +1,184 @@
+"""
+ONNX Runtime backend for DeepGaze IIE.
+
+The eager model runs Python loops over backbones and readout components, and
+FeatureExtractor collects the tapped activations from forward hooks. This
+module exports the model once to two ONNX graphs with dynamic batch / height /
+width axes:
+
+- `features.onnx`: image -> readout input of every backbone
+  (`MixtureModel.extract_features`)
+- `readout.onnx`: readout inputs + center bias -> log density
+  (`MixtureModel.readout`)
+
+Keeping the split lets `SaliencyEngine` cache features and re-run only the
+readout, exactly as with the torch model. `OnnxDeepGaze` wraps the two
+sessions behind the same interface, so the engine selects it with
+SALIENCY_BACKEND=onnx (see `load_onnx_model`).
+
+Export (needs torch, onnx and onnxscript; only onnxruntime at serve time):
+
+    python onnx_backend.py --output models/deepgaze_iie_onnx
+"""
+
+import json
+import os
+
+import numpy as np
+import torch
+
+DEFAULT_ONNX_DIR = "models/deepgaze_iie_onnx"
+
+# Largest side supported by the exported dynamic axes
+MAX_EXPORT_SIDE = 8192
+
+
+class _FeaturesGraph(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        return tuple(self.model.extract_features(image))
+
+
+class _ReadoutGraph(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, features, centerbias):
+        return self.model.readout(list(features), centerbias)
+
+
+def export_onnx(model, output_dir=DEFAULT_ONNX_DIR, sample_size=(768, 1024), opset=18):
+    """
+    Exports a (fused) DeepGaze `MixtureModel` to `output_dir`/features.onnx and readout.onnx.
+
+    Args:
+        model: Inference model as used by SaliencyEngine (e.g. `DeepGazeIIE().fused()`).
+        sample_size (tuple): (height, width) of the example input used for tracing.
+
+    Returns:
+        str: output_dir.
+    """
+    model.eval()
+    os.makedirs(output_dir, exist_ok=True)
+    h, w = sample_size
+    image = torch.randint(0, 255, (1, 3, h, w)).float()
+    centerbias = torch.zeros(1, h, w)
+
+    batch = torch.export.Dim("batch", min=1, max=64)
+    height = torch.export.Dim("height", min=64, max=MAX_EXPORT_SIDE)
+    width = torch.export.Dim("width", min=64, max=MAX_EXPORT_SIDE)
+    grid_h = torch.export.Dim("grid_h", min=1, max=MAX_EXPORT_SIDE)
+    grid_w = torch.export.Dim("grid_w", min=1, max=MAX_EXPORT_SIDE)
+
+    with torch.no_grad():
+        features = model.extract_features(image)
+        count = len(features)
+
+        torch.onnx.export(
+            _FeaturesGraph(model).eval(), (image,), os.path.join(output_dir, "features.onnx"),
+            dynamo=True, opset_version=opset,
+            input_names=["image"], output_names=[f"features_{k}" for k in range(count)],
+            dynamic_shapes=({0: batch, 2: height, 3: width},),
+        )
+        torch.onnx.export(
+            _ReadoutGraph(model).eval(), (tuple(features), centerbias), os.path.join(output_dir, "readout.onnx"),
+            dynamo=True, opset_version=opset,
+            input_names=[f"features_{k}" for k in range(count)] + ["centerbias"], output_names=["log_density"],
+            dynamic_shapes=(tuple({0: batch, 2: grid_h, 3: grid_w} for _ in range(count)), {0: batch, 1: height, 2: width}),
+        )
+
+    backbone = model.models[0]
+    with open(os.path.join(output_dir, "config.json"), "w") as f:
+        json.dump({"backbones": count, "downsample": backbone.downsample, "readout_factor": backbone.readout_factor}, f)
+    return output_dir
+
+
+class OnnxDeepGaze:
+    def __init__(self, model_dir=DEFAULT_ONNX_DIR, intra_op_threads=None, inter_op_threads=None, features_file="features.onnx"):
+        """
+        DeepGaze IIE exported by `export_onnx`, run under ONNX Runtime (CPU).
+
+        Args:
+            model_dir (str): Directory with features.onnx, readout.onnx and config.json.
+            features_file (str): Feature graph to load (e.g. the int8 one from quantization.py).
+            intra_op_threads (int, optional): Threads per operator (default:
+                SALIENCY_ORT_THREADS env var or all cores).
+            inter_op_threads (int, optional): Operators run in parallel (default:
+                SALIENCY_ORT_INTER_THREADS env var or 1; the graphs are mostly sequential).
+        """
+        import onnxruntime as ort
+
+        with open(os.path.join(model_dir, "config.json")) as f:
+            config = json.load(f)
+        self.downsample = config["downsample"]
+        self.readout_factor = config["readout_factor"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads or int(os.getenv("SALIENCY_ORT_THREADS", os.cpu_count() or 1))
+        options.inter_op_num_threads = inter_op_threads or int(os.getenv("SALIENCY_ORT_INTER_THREADS", 1))
+
+        providers = ["CPUExecutionProvider"]
+        self.features_session = ort.InferenceSession(os.path.join(model_dir, features_file), options, providers=providers)
+        self.readout_session = ort.InferenceSession(os.path.join(model_dir, "readout.onnx"), options, providers=providers)
+        self.feature_names = [item.name for item in self.readout_session.get_inputs()][:-1]
+
+    def extract_features(self, x):
+        """
+        (N, 3, H, W) image tensor (0-255) -> list of readout inputs, one per backbone.
+        """
+        outputs = self.features_session.run(None, {"image": _numpy(x)})
+        return [torch.from_numpy(output) for output in outputs]
+
+    def readout(self, features, centerbias):
+        inputs = {name: _numpy(item) for name, item in zip(self.feature_names, features)}
+        inputs["centerbias"] = _numpy(centerbias)
+        return torch.from_numpy(self.readout_session.run(None, inputs)[0])
+
+    def __call__(self, x, centerbias):
+        return self.readout(self.extract_features(x), centerbias)
+
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+
+def _numpy(tensor):
+    return np.ascontiguousarray(tensor.detach().cpu().numpy(), dtype=np.float32)
+
+
+def load_onnx_model(model_dir=None):
+    """
+    Loads the ONNX Runtime backend, or returns None (with a warning) if
+    onnxruntime or the exported graphs are missing.
+    """
+    model_dir = model_dir or os.getenv("SALIENCY_ONNX_DIR", DEFAULT_ONNX_DIR)
+    try:
+        return OnnxDeepGaze(model_dir)
+    except ImportError:
+        print("Warning: onnxruntime is not installed. Using the PyTorch backend.")
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not load ONNX model from {model_dir} ({e}). Using the PyTorch backend.")
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import deepgaze_pytorch
+
+    parser = argparse.ArgumentParser(description="Export DeepGaze IIE to ONNX for the onnx saliency backend")
+    parser.add_argument("--output", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--width", type=int, default=1024)
+    args = parser.parse_args()
+
+    deepgaze = deepgaze_pytorch.DeepGazeIIE(pretrained=True).fused()
+    print(f"Exported to {export_onnx(deepgaze, args.output, sample_size=(args.height, args.width))}")
@@ -0,0 +1,238 @@
+"""
+Reduced-precision DeepGaze inference.
+
+The four DeepGaze IIE backbones dominate inference time and run in fp32.
+Two cheaper precisions can be served next to fp32, per plan:
+
+- "bf16": the backbones (feature extraction) run under torch CPU autocast in
+  bfloat16; the readout stays fp32. Only fast on CPUs with native bf16
+  (AVX512-BF16 / AMX), so it falls back to fp32 elsewhere.
+- "int8": the ONNX feature graph (see onnx_backend.py) quantized with ONNX
+  Runtime post-training static quantization (QDQ, per-channel int8
+  weights), calibrated on a local folder of UI screenshots. The readout
+  graph stays fp32 (it holds the page-wide normalizations).
+
+SALIENCY_PLAN_PRECISION maps plans to precisions, e.g. "free:int8" (default:
+empty, every plan runs fp32; reduced precision is opt-in). A precision that
+isn't available falls back to fp32.
+
+Calibrate and measure the accuracy delta (LL / NSS / AUC from
+deepgaze_pytorch/metrics.py against fixations sampled from the fp32
+prediction):
+
+    python quantization.py calibrate --images datasets/calibration
+    python quantization.py evaluate --images datasets/calibration --precision int8
+"""
+
+import glob
+import os
+
+import numpy as np
+import torch
+from PIL import Image
+
+from onnx_backend import DEFAULT_ONNX_DIR, OnnxDeepGaze
+
+PRECISIONS = ("fp32", "bf16", "int8")
+INT8_FEATURES_FILE = "features_int8.onnx"
+
+# Calibration / evaluation images are resized to this (height, width)
+CALIBRATION_SIZE = (768, 1024)
+
+
+def plan_precisions(spec=None):
+    """
+    Parses SALIENCY_PLAN_PRECISION ("plan:precision,...") into a dict.
+    """
+    spec = os.getenv("SALIENCY_PLAN_PRECISION", "") if spec is None else spec
+    mapping = {}
+    for item in spec.split(","):
+        if ":" not in item:
+            continue
+        plan, precision = (part.strip().lower() for part in item.split(":", 1))
+        if precision not in PRECISIONS:
+            print(f"Warning: Unknown precision '{precision}' for plan '{plan}'. Using fp32.")
+            precision = "fp32"
+        mapping[plan] = precision
+    return mapping
+
+
+def bf16_supported():
+    """
+    Whether this CPU runs bfloat16 convolutions natively (oneDNN AVX512-BF16 / AMX).
+    """
+    check = getattr(torch.ops.mkldnn, "_is_mkldnn_bf16_supported", None)
+    return bool(check and check())
+
+
+class Bf16Backbones:
+    def __init__(self, model, device_type="cpu"):
+        """
+        Runs `model`'s feature extraction under bfloat16 autocast; the readout stays fp32.
+        """
+        self.model = model
+        self.device_type = device_type
+        if hasattr(model, "models"):
+            self.models = model.models
+
+    def extract_features(self, x):
+        with torch.autocast(self.device_type, dtype=torch.bfloat16):
+            features = self.model.extract_features(x)
+        return [item.float() for item in features]
+
+    def readout(self, features, centerbias):
+        return self.model.readout(features, centerbias)
+
+    def __call__(self, x, centerbias):
+        return self.readout(self.extract_features(x), centerbias)
+
+
+def load_precision_model(precision, model, device, onnx_dir=None):
+    """
+    Builds the `precision` variant of the engine's fp32 `model`, or returns None
+    (with a warning) if it isn't available here.
+    """
+    if precision == "bf16":
+        if isinstance(model, OnnxDeepGaze):
+            print("Warning: bf16 needs the PyTorch backend. Using fp32.")
+            return None
+        if device.type == "cpu" and not bf16_supported():
+            print("Warning: This CPU has no native bf16 support. Using fp32.")
+            return None
+        return Bf16Backbones(model, device.type)
+
+    if precision == "int8":
+        onnx_dir = onnx_dir or os.getenv("SALIENCY_ONNX_DIR", DEFAULT_ONNX_DIR)
+        if not os.path.exists(os.path.join(onnx_dir, INT8_FEATURES_FILE)):
+            print(f"Warning: No int8 model in {onnx_dir} (run `python quantization.py calibrate`). Using fp32.")
+            return None
+        try:
+            return OnnxDeepGaze(onnx_dir, features_file=INT8_FEATURES_FILE)
+        except ImportError:
+            print("Warning: onnxruntime is not installed. Using fp32.")
+            return None
+
+    return model
+
+
+def load_images(image_dir, size=CALIBRATION_SIZE, max_images=None):
+    """
+    Loads the screenshots in `image_dir` as (H, W, 3) uint8 RGB arrays resized to `size`.
+    """
+    paths = sorted(path for ext in ("png", "jpg", "jpeg", "webp") for path in glob.glob(os.path.join(image_dir, f"*.{ext}")))
+    if max_images:
+        paths = paths[:max_images]
+    if not paths:
+        raise ValueError(f"No images found in {image_dir}")
+    h, w = size
+    return [np.array(Image.open(path).convert('RGB').resize((w, h), Image.BILINEAR)) for path in paths]
+
+
+def calibrate_int8(image_dir, onnx_dir=DEFAULT_ONNX_DIR, max_images=32):
+    """
+    Quantizes `onnx_dir`/features.onnx to int8 (static, QDQ, per-channel
+    weights) using screenshots from `image_dir` for activation ranges.
+
+    Returns:
+        str: Path of the quantized feature graph.
+    """
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    images = load_images(image_dir, max_images=max_images)
+
+    class ScreenshotReader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = iter([{"image": img.transpose(2, 0, 1)[np.newaxis].astype(np.float32)} for img in images])
+
+        def get_next(self):
+            return next(self.batches, None)
+
+    source = os.path.join(onnx_dir, "features.onnx")
+    prepared = os.path.join(onnx_dir, "features_prepared.onnx")
+    output = os.path.join(onnx_dir, INT8_FEATURES_FILE)
+
+    print(f"Calibrating int8 feature graph on {len(images)} screenshot(s)...")
+    # The exporter keeps weights in features.onnx.data; load them so pre-processing sees one model
+    quant_pre_process(onnx.load(source), prepared, skip_optimization=True, skip_symbolic_shape=True)
+    quantize_static(prepared, output, ScreenshotReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    os.remove(prepared)
+    return output
+
+
+def score_predictions(images, predictors, reference, fixations_per_image=200, seed=0):
+    """
+    Scores log density predictors against fixations sampled from a reference predictor.
+
+    No human fixations exist for our screenshots, so fixations are sampled
+    from the `reference` prediction and every prediction is scored on them
+    with deepgaze_pytorch.metrics (LL in bit/fix, NSS, AUC).
+
+    Args:
+        predictors (dict): name -> function mapping an (H, W, 3) image to its log density.
+        reference (str): Name of the predictor fixations are sampled from.
+
+    Returns:
+        dict: {name: {"ll", "nss", "auc"}} of mean metrics.
+    """
+    from deepgaze_pytorch import metrics
+
+    rng = np.random.RandomState(seed)
+    scores = {name: [] for name in predictors}
+    for img_np in images:
+        predictions = {name: predict(img_np) for name, predict in predictors.items()}
+
+        density = np.exp(predictions[reference].astype(np.float64)).ravel()
+        indices = rng.choice(density.size, size=fixations_per_image, p=density / density.sum())
+        mask = np.zeros(density.size, dtype=np.float32)
+        np.add.at(mask, indices, 1)
+        mask = torch.from_numpy(mask.reshape(predictions[reference].shape))[np.newaxis]
+        weights = torch.ones(1)
+
+        for name, log_density in predictions.items():
+            log_density = torch.from_numpy(np.asarray(log_density, dtype=np.float64))[np.newaxis]
+            scores[name].append([
+                float(metrics.log_likelihood(log_density, mask, weights)),
+                float(metrics.nss(log_density, mask, weights)),
+                float(metrics.auc(log_density, mask > 0, weights)),
+            ])
+
+    return {name: dict(zip(("ll", "nss", "auc"), np.mean(values, axis=0).round(4).tolist())) for name, values in scores.items()}
+
+
+def evaluate_precision(engine, images, precision, fixations_per_image=200, seed=0):
+    """
+    Accuracy delta of a precision against fp32 on `images` (see `score_predictions`).
+
+    Returns:
+        dict: {"fp32": {...}, precision: {...}, "delta": {...}} of mean metrics.
+    """
+    report = score_predictions(images, {
+        "fp32": lambda img_np: engine.log_density(img_np, precision="fp32"),
+        precision: lambda img_np: engine.log_density(img_np, precision=precision),
+    }, reference="fp32", fixations_per_image=fixations_per_image, seed=seed)
+    report["delta"] = {metric: round(report[precision][metric] - report["fp32"][metric], 4) for metric in ("ll", "nss", "auc")}
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Calibrate / evaluate reduced-precision DeepGaze inference")
+    parser.add_argument("command", choices=["calibrate", "evaluate"])
+    parser.add_argument("--images", required=True, help="Folder of UI screenshots")
+    parser.add_argument("--onnx-dir", default=DEFAULT_ONNX_DIR)
+    parser.add_argument("--precision", default="int8", choices=["bf16", "int8"])
+    parser.add_argument("--max-images", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        print(f"Wrote {calibrate_int8(args.images, args.onnx_dir, args.max_images)}")
+    else:
+        from saliency_engine import SaliencyEngine
+        engine = SaliencyEngine(cache_mb=0)
+        report = evaluate_precision(engine, load_images(args.images, max_images=args.max_images), args.precision)
+        print(json.dumps(report, indent=2))
@@ -5,6 +5,7 @@ from jinja2 import Template
 from scipy.stats import entropy
 from datetime import datetime
 import time
+from concurrent.futures import ThreadPoolExecutor
 from content_engine import (
     get_executive_summary_text,
     get_visual_attention_deep_dive,
@@ -19,6 +20,8 @@ from content_engine import (
     generate_color_industry_text,
     generate_color_summary_text
 )
+from stage_graph import Stage, run_stages
+from analysis_context import AnalysisContext, as_context
 
 # Color Report Revamp:
 # Increased detail, added scientific metrics, cultural variants, 
@@ -27,10 +30,12 @@ from content_engine import (
 def calculate_metrics(saliency_map_path, original_image_path):
     """
     Calculates quantitative UX metrics using advanced algorithms.
+    Either argument may be an AnalysisContext instead of a path.
     """
     # Load images
-    saliency = cv2.imread(saliency_map_path, cv2.IMREAD_GRAYSCALE)
-    original = cv2.imread(original_image_path)
+    ctx = as_context(original_image_path, saliency_map_path)
+    saliency = ctx.saliency
+    original = ctx.bgr
     
     # --- 1. Advanced Visual Clutter (Edge Density + Color Entropy) ---
     # A. Edge Density (Structural Clutter)
@@ -38,7 +43,7 @@ def calculate_metrics(saliency_map_path, original_image_path):
     edge_density = np.count_nonzero(edges) / edges.size
     
     # B. Color Clutter (Color Entropy)
-    hsv = cv2.cvtColor(original, cv2.COLOR_BGR2HSV)
+    hsv = ctx.hsv
     h_hist = cv2.calcHist([hsv], [0], None, [50], [0, 180])
     h_hist_norm = h_hist / (np.sum(h_hist) + 1e-8)
     color_entropy = entropy(h_hist_norm.flatten())
@@ -72,7 +77,7 @@ def calculate_advanced_metrics(saliency_map_path, original_image_path, basic_met
     """
     Calculates advanced marketing-focused metrics: ACS, VCI, CLE.
     """
-    saliency = cv2.imread(saliency_map_path, cv2.IMREAD_GRAYSCALE)
+    saliency = as_context(original_image_path, saliency_map_path).saliency
     
     # 1. Attention Capture Score (ACS)
     max_sal = np.max(saliency) / 255.0
@@ -96,14 +101,14 @@ def analyze_dominant_colors(image_path):
     """
     Extract dominant colors from UI and provide psychology-based recommendations.
     Updated to use structured Science/Marketing data.
+    `image_path` may also be an AnalysisContext.
     """
     from color_psychology import analyze_color_psychology, recommend_cta_color, calculate_contrast_ratio, get_wcag_level
     import cv2
     from sklearn.cluster import KMeans
     
     # Load image
-    img = cv2.imread(image_path)
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img_rgb = as_context(image_path).rgb
     
     # Reshape for K-means
     pixels = img_rgb.reshape(-1, 3)
@@ -193,16 +198,52 @@ def analyze_dominant_colors(image_path):
         "palette_summary": palette_summary
     }
 
-def generate_report(original_image_path, saliency_map_path, timestamp=None, plan="free"):
+# Shared executors for report stages: CPU lane (OpenCV / KMeans release the GIL)
+# and an I/O lane for the Gemini round-trips
+_cpu_pool = ThreadPoolExecutor(max_workers=int(os.getenv("REPORT_CPU_WORKERS", os.cpu_count() or 2)), thread_name_prefix="report-cpu")
+_io_pool = ThreadPoolExecutor(max_workers=int(os.getenv("REPORT_IO_WORKERS", 8)), thread_name_prefix="report-io")
+
+def _cognitive_marketing_stage(ctx):
+    from cognitive_marketing import generate_cognitive_marketing_analysis
+    return generate_cognitive_marketing_analysis(ctx)
+
+def _ux_heuristics_stage(metrics, adv_metrics, cognitive_data, color_data):
+    from content_engine import build_ux_heuristics_details
+    return build_ux_heuristics_details(metrics, adv_metrics, cognitive_data, color_data)
+
+def _gaze_path_stage(ctx):
+    from content_engine import build_gaze_path_efficiency
+    return build_gaze_path_efficiency(ctx)
+
+def _ia_structure_stage(original_image_path):
+    from generative_ui import analyze_ia_structure
+    return analyze_ia_structure(original_image_path)
+
+def _redesign_stage(original_image_path, saliency_map_path, metrics):
+    from generative_ui import generate_redesigned_ui
+    # Create a summary for the redesign prompt
+    visual_text = get_visual_attention_deep_dive(metrics['hotspot_count'], metrics['focus_ratio'])
+    analysis_summary = f"Focus Ratio: {metrics['focus_ratio']}%, Visual Clutter: {metrics['clutter_score']}, Hotspots: {metrics['hotspot_count']}. Key issue: {visual_text.get('focus_analysis', 'Attention dispersed')}."
+    return generate_redesigned_ui(original_image_path, saliency_map_path, analysis_summary)
+
+def _marketing_consultation_stage(original_image_path, saliency_map_path):
+    from consultant import generate_marketing_consultation
+    return generate_marketing_consultation(original_image_path, saliency_map_path)
+
+def generate_report(original_image_path, saliency_map_path, timestamp=None, plan="free", report_suffix="", saliency=None, scanpaths=None, image=None):
     """
     Generates a comprehensive 5+ page HTML report with deep-dive analysis.
+
+    `report_suffix` is appended to the timestamped report filename so reports
+    generated within the same second (e.g. batch analysis) don't overwrite each other.
+    `saliency` is the model's float [0, 1] saliency map; when omitted the metrics
+    read the density sidecar stored next to `saliency_map_path`.
+    `scanpaths` are simulated DeepGaze III scanpaths for the gaze path efficiency.
+    `image` is the (H, W, 3) RGB array the saliency map was predicted on; when
+    omitted the metrics decode `original_image_path`.
     """
     report_dir = "reports"
     
-    # Initialize AI variables to None (prevent NameError if API key is missing)
-    ia_structure = None
-    redesign_suggestion = None
-    marketing_consultation = None
     os.makedirs(report_dir, exist_ok=True)
     
     # Extract filename from path
@@ -212,32 +253,54 @@ def generate_report(original_image_path, saliency_map_path, timestamp=None, plan
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
     # Use pure timestamp filename to avoid encoding issues
-    report_path = os.path.join(report_dir, f"report_{timestamp}.html")
-    
-    # Calculate Basic Metrics
-    metrics = calculate_metrics(saliency_map_path, original_image_path)
-    
-    # Analyze Colors
-    try:
-        color_data = analyze_dominant_colors(original_image_path)
-        print(f"Color analysis successful: {len(color_data['dominant_colors'])} colors detected")
-    except Exception as e:
-        print(f"Color analysis failed: {e}")
-        import traceback
-        traceback.print_exc()
-        color_data = None
-    
-    # Cognitive Marketing Analysis
-    try:
-        from cognitive_marketing import generate_cognitive_marketing_analysis
-        cognitive_data = generate_cognitive_marketing_analysis(original_image_path, saliency_map_path)
-    except Exception as e:
-        print(f"Cognitive marketing analysis failed: {e}")
-        cognitive_data = None
-        
-    # Calculate Advanced Metrics (ACS, VCI, CLE)
-    adv_metrics = calculate_advanced_metrics(saliency_map_path, original_image_path, metrics, cognitive_data)
+    report_path = os.path.join(report_dir, f"report_{timestamp}{report_suffix}.html")
     
+    # Decode the image and saliency map once for every analysis stage
+    ctx = AnalysisContext(original_image_path, saliency_map_path, saliency_density=saliency, scanpaths=scanpaths, rgb=image)
+
+    # Independent stages run concurrently: CPU work on the CPU lane, Gemini calls on the I/O lane
+    stages = [
+        Stage("metrics", lambda: calculate_metrics(ctx, ctx)),
+        Stage("color_data", lambda: analyze_dominant_colors(ctx), fallback=None),
+        Stage("cognitive_data", lambda: _cognitive_marketing_stage(ctx), fallback=None),
+        # Calculate Advanced Metrics (ACS, VCI, CLE)
+        Stage("adv_metrics", lambda metrics, cognitive_data: calculate_advanced_metrics(ctx, ctx, metrics, cognitive_data),
+              deps=("metrics", "cognitive_data")),
+        # UX Heuristics Extension: Add detailed Nielsen heuristics analysis
+        Stage("ux_heuristics_details", _ux_heuristics_stage, deps=("metrics", "adv_metrics", "cognitive_data", "color_data"), fallback=[]),
+        # Added Gaze Path Efficiency (minimal addition, no rewrites)
+        Stage("gaze_path_data", lambda: _gaze_path_stage(ctx),
+              fallback={"score": 50, "insight": "Analysis unavailable.", "recommendation": "N/A"}),
+    ]
+
+    # --- AI ENHANCEMENTS (IA & Generative UI) ---
+    # Only run for paid plans
+    if plan in ["base", "plus"]:
+        print(f"Starting AI Analysis (Plan: {plan})...")
+        stages += [
+            Stage("ia_structure", lambda: _ia_structure_stage(original_image_path), lane="io", fallback=None),
+            Stage("redesign_suggestion", lambda metrics: _redesign_stage(original_image_path, saliency_map_path, metrics),
+                  deps=("metrics",), lane="io", fallback=None),
+            # --- MARKETING CONSULTATION (RAG) ---
+            Stage("marketing_consultation", lambda: _marketing_consultation_stage(original_image_path, saliency_map_path),
+                  lane="io", fallback=None),
+        ]
+    else:
+        print(f"Skipping AI Analysis for plan: {plan}")
+
+    results, timings = run_stages(stages, {"cpu": _cpu_pool, "io": _io_pool})
+    print(f"Report stage timings (s): {timings}")
+
+    metrics = results["metrics"]
+    color_data = results["color_data"]
+    cognitive_data = results["cognitive_data"]
+    adv_metrics = results["adv_metrics"]
+    ux_heuristics_details = results["ux_heuristics_details"]
+    gaze_path_data = results["gaze_path_data"]
+    ia_structure = results.get("ia_structure")
+    redesign_suggestion = results.get("redesign_suggestion")
+    marketing_consultation = results.get("marketing_consultation")
+
     # --- CONTENT ENGINE GENERATION ---
     exec_summary = get_executive_summary_text(adv_metrics['acs'], adv_metrics['cle'], metrics['hotspot_count'])
     visual_text = get_visual_attention_deep_dive(metrics['hotspot_count'], metrics['focus_ratio'])
@@ -245,53 +308,7 @@ def generate_report(original_image_path, saliency_map_path, timestamp=None, plan
     
     ux_text = get_ux_heuristics_text(cognitive_data['visual_complexity'] if cognitive_data else {'grade': 'B'}, metrics['hotspot_count'])
     
-    # UX Heuristics Extension: Add detailed Nielsen heuristics analysis
-    try:
-        from content_engine import build_ux_heuristics_details
-        ux_heuristics_details = build_ux_heuristics_details(metrics, adv_metrics, cognitive_data, color_data)
-    except Exception as e:
-        print(f"Extended UX heuristics failed: {e}")
-        ux_heuristics_details = []
-    
-    # Added Gaze Path Efficiency (minimal addition, no rewrites)
-    try:
-        from content_engine import build_gaze_path_efficiency
-        gaze_path_data = build_gaze_path_efficiency(saliency_map_path)
-    except Exception as e:
-        print(f"Gaze path efficiency failed: {e}")
-        gaze_path_data = {"score": 50, "insight": "Analysis unavailable.", "recommendation": "N/A"}
-    
     action_plan = get_strategic_action_plan(metrics, adv_metrics, cognitive_data)
-    
-    # --- AI ENHANCEMENTS (IA & Generative UI) ---
-    # Only run for paid plans
-    if plan in ["base", "plus"]:
-        try:
-            from generative_ui import analyze_ia_structure, generate_redesigned_ui
-            print(f"Starting AI Analysis (Plan: {plan})...")
-            ia_structure = analyze_ia_structure(original_image_path)
-            
-            # Create a summary for the redesign prompt
-            analysis_summary = f"Focus Ratio: {metrics['focus_ratio']}%, Visual Clutter: {metrics['clutter_score']}, Hotspots: {metrics['hotspot_count']}. Key issue: {visual_text.get('focus_analysis', 'Attention dispersed')}."
-            
-            redesign_suggestion = generate_redesigned_ui(original_image_path, saliency_map_path, analysis_summary)
-            print("AI Analysis complete.")
-        except Exception as e:
-            print(f"AI Analysis failed: {e}")
-            ia_structure = None
-            redesign_suggestion = None
-
-        # --- MARKETING CONSULTATION (RAG) ---
-        try:
-            from consultant import generate_marketing_consultation
-            print(f"Starting Marketing Consultation (Plan: {plan})...")
-            marketing_consultation = generate_marketing_consultation(original_image_path, saliency_map_path)
-            print("Marketing Consultation complete.")
-        except Exception as e:
-            print(f"Marketing Consultation failed: {e}")
-            marketing_consultation = None
-    else:
-        print(f"Skipping AI Analysis for plan: {plan}")
 
     # COMPREHENSIVE 5+ PAGE HTML TEMPLATE
     template_str = """
@@ -1276,5 +1293,6 @@ def generate_report(original_image_path, saliency_map_path, timestamp=None, plan
         
     return report_path, ia_structure, redesign_suggestion, marketing_consultation, {
         "basic": metrics,
-        "advanced": adv_metrics
+        "advanced": adv_metrics,
+        "timings": timings
     }
@@ -0,0 +1,164 @@
+"""
+Result Cache Module
+Content-addressed cache for finished analyses.
+
+Customers re-upload the same screenshots, so a finished analysis (saliency map,
+report and metrics) is stored under a hash of the decoded RGB pixels plus the
+model version, plan and saliency variant. A repeat upload returns the stored
+result instead of rerunning DeepGaze, the report pipeline and the Gemini calls.
+
+Entries are evicted when they exceed the maximum age or when the cache holds
+more than the maximum number of entries (least recently used first). The index
+is a small JSON file so hits survive restarts; the cached artifacts themselves
+are the files already written to outputs/ and reports/.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# Bump when DeepGaze weights, enhancements or the report change so stale results are ignored
+MODEL_VERSION = os.getenv("MODEL_VERSION", "deepgaze2e-v1.0.0")
+
+
+def perceptual_hash(img_rgb, hash_size=8):
+    """
+    Difference hash (dHash) of an RGB image as a 64-bit hex string.
+    Robust to re-encoding and small resizes, unlike the byte hash.
+    """
+    gray = Image.fromarray(img_rgb).convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):0{hash_size * hash_size // 4}x}"
+
+
+def byte_hash(img_rgb):
+    """
+    SHA-256 of the decoded pixel data (independent of the upload's file format).
+    """
+    digest = hashlib.sha256()
+    digest.update(str(img_rgb.shape).encode())
+    digest.update(np.ascontiguousarray(img_rgb).tobytes())
+    return digest.hexdigest()
+
+
+def hamming_distance(hash_a, hash_b):
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+class ResultCache:
+    def __init__(self, index_path=None, max_entries=None, max_age_hours=None, max_phash_distance=None):
+        """
+        Args:
+            index_path (str, optional): JSON index file (default: cache/result_cache.json).
+            max_entries (int, optional): Size limit (default: RESULT_CACHE_MAX_ENTRIES env var or 1000).
+            max_age_hours (float, optional): Age limit (default: RESULT_CACHE_MAX_AGE_HOURS env var or 168).
+            max_phash_distance (int, optional): Also serve entries whose perceptual hash is within
+                this Hamming distance; 0 only serves pixel-identical images
+                (default: RESULT_CACHE_PHASH_DISTANCE env var or 0).
+        """
+        self.index_path = index_path or os.path.join("cache", "result_cache.json")
+        self.max_entries = max_entries or int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 1000))
+        self.max_age = 3600 * (max_age_hours or float(os.getenv("RESULT_CACHE_MAX_AGE_HOURS", 168)))
+        if max_phash_distance is None:
+            max_phash_distance = int(os.getenv("RESULT_CACHE_PHASH_DISTANCE", 0))
+        self.max_phash_distance = max_phash_distance
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._load()
+
+    def make_key(self, img_rgb, plan="free", variant=None, tier="full", precision="fp32"):
+        """
+        Builds the cache key of a decoded (H, W, 3) RGB image for the given plan, variant,
+        model tier and inference precision (as resolved by `SaliencyEngine.plan_settings`).
+        """
+        return {
+            "byte_hash": byte_hash(img_rgb),
+            "phash": perceptual_hash(img_rgb),
+            "scope": f"{MODEL_VERSION}|{plan}|{variant or 'default'}" + (f"|{tier}" if tier != "full" else "")
+                     + (f"|{precision}" if precision != "fp32" else ""),
+        }
+
+    def get(self, key):
+        """
+        Returns the stored result for `key`, or None on a miss.
+        """
+        with self._lock:
+            self._evict()
+            entry_id = self._find(key)
+            if entry_id is None:
+                return None
+
+            entry = self._entries[entry_id]
+            if not all(os.path.exists(path) for path in entry["files"]):
+                # artifacts were deleted (e.g. via /delete-files): drop the stale entry
+                del self._entries[entry_id]
+                self._save()
+                return None
+
+            self._entries.move_to_end(entry_id)
+            return entry["result"]
+
+    def put(self, key, result, files):
+        """
+        Stores a finished analysis. `files` are the artifacts the result points to;
+        the entry is only served while all of them still exist.
+        """
+        entry_id = f"{key['scope']}|{key['byte_hash']}"
+        with self._lock:
+            self._entries[entry_id] = {
+                "phash": key["phash"],
+                "scope": key["scope"],
+                "created": time.time(),
+                "files": list(files),
+                "result": result,
+            }
+            self._entries.move_to_end(entry_id)
+            self._evict()
+            self._save()
+
+    def _find(self, key):
+        entry_id = f"{key['scope']}|{key['byte_hash']}"
+        if entry_id in self._entries:
+            return entry_id
+        if self.max_phash_distance <= 0:
+            return None
+        for candidate_id, entry in reversed(self._entries.items()):
+            if entry["scope"] == key["scope"] and hamming_distance(entry["phash"], key["phash"]) <= self.max_phash_distance:
+                return candidate_id
+        return None
+
+    def _evict(self):
+        cutoff = time.time() - self.max_age
+        for entry_id in [entry_id for entry_id, entry in self._entries.items() if entry["created"] < cutoff]:
+            del self._entries[entry_id]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f))
+            self._evict()
+        except Exception as e:
+            print(f"Could not load result cache index: {e}")
+            self._entries = OrderedDict()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception as e:
+            print(f"Could not save result cache index: {e}")
@@ -0,0 +1,615 @@
+"""
+Shared DeepGaze IIE engine.
+
+Loads the 4-backbone DeepGaze IIE mixture once per process and computes the
+raw log-density for an image. Both the standard (`saliency_model.py`) and the
+enhanced (`saliency_model_enhanced.py`) variants post-process this density, so
+they share one engine instead of each holding the full model in RAM, and an
+image analysed in both variants only runs through the backbones once.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import torch
+from scipy.special import logsumexp
+
+import deepgaze_pytorch
+from centerbias import CenterBiasProvider
+from model_weights import load_deepgaze
+from quantization import load_precision_model, plan_precisions
+
+# Log center bias assigned to padded pixels in batched inference (effectively zero mass)
+PAD_LOG_DENSITY = -1000.0
+
+# Tiles are never made shorter than this to fit the memory budget
+MIN_TILE_HEIGHT = 256
+
+# Latency tiers: (indices into deepgaze2e.BACKBONES, readout components kept per backbone).
+# Sub-ensembles share the weights of the full model; the two ResNet-50 style
+# backbones are the cheapest (EfficientNet-B5 / DenseNet-201 are the slowest on CPU).
+MODEL_TIERS = {
+    "fast": ([0], 10),          # ShapeNet ResNet-50, one instance (10 folds)
+    "balanced": ([0, 3], None), # ShapeNet ResNet-50 + ResNeXt-50, all 30 components
+    "full": (None, None),       # all 4 backbones x 30 components
+}
+
+
+def image_key(img_np):
+    """
+    Content hash of a decoded image array (shape + pixel bytes).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(img_np.shape).encode())
+    digest.update(np.ascontiguousarray(img_np).tobytes())
+    return digest.hexdigest()
+
+
+class SaliencyEngine:
+    def __init__(self, fused=None, cache_mb=None, tile_height=None, tile_overlap=None, tile_min_height=None, memory_budget_mb=None,
+                 max_working_width=None, backend=None, parallel_backbones=None):
+        """
+        Args:
+            fused (bool, optional): Use the fused grouped-convolution readout
+                (default: SALIENCY_FUSED_READOUT env var, enabled).
+            cache_mb (int, optional): Memory budget for cached backbone features and
+                log-densities (default: SALIENCY_ENGINE_CACHE_MB env var or 512).
+            tile_height (int, optional): Viewport height of the tiles used for tall
+                images (default: SALIENCY_TILE_HEIGHT env var or 1080).
+            tile_overlap (int, optional): Rows shared by neighbouring tiles and
+                feathered together (default: SALIENCY_TILE_OVERLAP env var or 256).
+            tile_min_height (int, optional): Images taller than this are tiled; 0 disables
+                tiling (default: SALIENCY_TILE_MIN_HEIGHT env var or 2160).
+            memory_budget_mb (int, optional): Peak inference memory budget used to size
+                tiles and tile batches (default: SALIENCY_MEMORY_BUDGET_MB env var or 1536).
+                Peak memory is estimated as SALIENCY_BYTES_PER_PIXEL (default 400)
+                bytes per input pixel; calibrate it for the deployed hardware.
+            max_working_width (int, optional): Wider images (e.g. retina / 4K screenshots)
+                are downscaled to this width for inference and the density is upsampled
+                back; 0 disables (default: SALIENCY_MAX_WORKING_WIDTH env var or 1920).
+            backend (str, optional): "torch" (eager PyTorch) or "onnx" (ONNX Runtime on CPU,
+                graphs exported with `onnx_backend.py`; falls back to torch if unavailable)
+                (default: SALIENCY_BACKEND env var or "torch").
+                Latency tiers other than "full" need the torch backend.
+            parallel_backbones (int, optional): Backbones run concurrently (torch backend),
+                each with cores / parallel_backbones intra-op threads; 0 or 1 runs them in
+                turn with all cores (default: SALIENCY_PARALLEL_BACKBONES env var or 0).
+        """
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+        if fused is None:
+            fused = os.getenv("SALIENCY_FUSED_READOUT", "1") == "1"
+        if cache_mb is None:
+            cache_mb = int(os.getenv("SALIENCY_ENGINE_CACHE_MB", 512))
+        if tile_min_height is None:
+            tile_min_height = int(os.getenv("SALIENCY_TILE_MIN_HEIGHT", 2160))
+        self.tile_height = tile_height or int(os.getenv("SALIENCY_TILE_HEIGHT", 1080))
+        self.tile_overlap = tile_overlap if tile_overlap is not None else int(os.getenv("SALIENCY_TILE_OVERLAP", 256))
+        self.tile_min_height = tile_min_height
+        self.memory_budget = (memory_budget_mb or int(os.getenv("SALIENCY_MEMORY_BUDGET_MB", 1536))) * 1024 * 1024
+        self.bytes_per_pixel = int(os.getenv("SALIENCY_BYTES_PER_PIXEL", 400))
+        if max_working_width is None:
+            max_working_width = int(os.getenv("SALIENCY_MAX_WORKING_WIDTH", 1920))
+        self.max_working_width = max_working_width
+        if parallel_backbones is None:
+            parallel_backbones = int(os.getenv("SALIENCY_PARALLEL_BACKBONES", 0))
+
+        self.model = None
+        self._source_model = None
+        self.fused = fused
+        self.backend = (backend or os.getenv("SALIENCY_BACKEND", "torch")).lower()
+        if self.backend == "onnx":
+            from onnx_backend import load_onnx_model
+            self.model = load_onnx_model()
+            if self.model is not None:
+                self.device = torch.device("cpu")
+                print("Loaded DeepGaze IIE ONNX Runtime backend.")
+            else:
+                self.backend = "torch"
+
+        if self.model is None:
+            print(f"Loading DeepGaze IIE Model on {self.device}...")
+
+            # Load DeepGaze IIE, memory-mapped from the converted weights (see model_weights.py)
+            # or downloaded on first run
+            self.model = load_deepgaze()
+            if self.model is None:
+                self.model = deepgaze_pytorch.DeepGazeIIE(pretrained=True)
+            self.model = self.model.to(self.device)
+            self.model.eval()
+
+            # Drop the backbone layers after the last tapped feature (never run, see FeatureExtractor)
+            if os.getenv("SALIENCY_PRUNE_BACKBONES", "1") == "1":
+                self.model.prune()
+
+            # Run the backbones concurrently, splitting the cores between them
+            if parallel_backbones > 1:
+                self.model.parallel = parallel_backbones
+                torch.set_num_threads(max(1, (os.cpu_count() or 1) // parallel_backbones))
+                print(f"Running {parallel_backbones} backbones in parallel with {torch.get_num_threads()} thread(s) each.")
+
+            # Unfused ensemble the latency tiers are cut from (shares all weights)
+            self._source_model = self.model
+
+            # Pack the 30 readout heads per backbone into grouped convolutions (inference only)
+            if fused:
+                self.model = self.model.fused()
+                print("Fused readout heads enabled.")
+
+        # Reduced-precision variants (see quantization.py) and latency tiers served per
+        # plan / request, keyed by (tier, precision) and loaded on first use
+        self.plan_precision = plan_precisions()
+        self.plan_tier = plan_tiers()
+        self._variants = {("full", "fp32"): self.model}
+        self._variant_lock = threading.RLock()
+
+        # Load Center Bias (memoized per image size; common viewports are prepared up front)
+        self.centerbias = CenterBiasProvider()
+        if os.getenv("CENTERBIAS_PRECOMPUTE", "1") == "1":
+            self.centerbias.precompute(device=self.device)
+
+        # Set by `warm_up` (readiness probe)
+        self.ready = threading.Event()
+
+        # Forward passes of the job workers may overlap: the models keep no per-call state
+        # (FeatureExtractor collects its taps per thread), so only the caches are locked
+        self.cache_bytes = cache_mb * 1024 * 1024
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_size = 0
+
+    def prepare_centerbias(self, h, w):
+        """
+        Returns the center bias template rescaled to (h, w) and renormalized as a
+        log density (memoized; read-only).
+        """
+        return self.centerbias.log_centerbias(h, w)
+
+    def warm_up(self, size=None):
+        """
+        Runs one forward pass at (height, width) `size` (default: SALIENCY_WARMUP_SIZE env var
+        or "1080x1920"; "0" skips it), then marks the engine ready. This reads the memory-mapped
+        weights into the page cache and initializes the kernels before the first request.
+        """
+        size = size or os.getenv("SALIENCY_WARMUP_SIZE", "1080x1920")
+        if size != "0":
+            h, w = (int(value) for value in size.lower().split("x")) if isinstance(size, str) else size
+            start = time.perf_counter()
+            image = torch.full((1, 3, h, w), 128.0, device=self.device)
+            with torch.no_grad():
+                self.model(image, self.centerbias.tensor(h, w, self.device))
+            print(f"DeepGaze warm-up at {w}x{h} took {time.perf_counter() - start:.2f}s")
+        self.ready.set()
+
+    def model_for(self, precision="fp32", tier="full"):
+        """
+        Returns the model for a precision ("fp32", "bf16", "int8") and latency tier
+        ("fast", "balanced", "full"); see `resolve` for the fallbacks.
+        """
+        if precision == "fp32" and tier == "full":
+            return self.model
+        precision, tier = self.resolve(precision, tier)
+        return self._variant(tier, precision)
+
+    def resolve(self, precision="fp32", tier="full"):
+        """
+        (precision, tier) actually served for a requested pair: a precision that is
+        unavailable for the tier falls back to fp32, an unavailable tier to the full model.
+        """
+        if tier not in MODEL_TIERS:
+            raise ValueError(f"Unknown model tier: {tier}")
+        for candidate in ((tier, precision), (tier, "fp32"), ("full", precision)):
+            if self._variant(*candidate) is not None:
+                return candidate[1], candidate[0]
+        return "fp32", "full"
+
+    def plan_settings(self, plan, tier=None):
+        """
+        (precision, tier) an analysis on `plan` runs with (SALIENCY_PLAN_PRECISION /
+        SALIENCY_PLAN_TIER); a requested `tier` overrides the plan's default.
+        """
+        return self.resolve(self.plan_precision.get(plan, "fp32"), tier or self.plan_tier.get(plan, "full"))
+
+    def _variant(self, tier, precision):
+        key = (tier, precision)
+        if key not in self._variants:
+            with self._variant_lock:
+                if key not in self._variants:
+                    self._variants[key] = self._load_variant(tier, precision)
+        return self._variants[key]
+
+    def _load_variant(self, tier, precision):
+        if precision == "fp32":
+            return self._tier_model(tier)
+        model = self._variant(tier, "fp32")
+        if model is None:
+            return None
+        if precision == "int8" and tier != "full":
+            # the int8 graph is exported from the full ensemble
+            print(f"Warning: int8 is only available for the full model. Using fp32 for tier '{tier}'.")
+            return None
+        return load_precision_model(precision, model, self.device)
+
+    def _tier_model(self, tier):
+        backbones, components = MODEL_TIERS[tier]
+        if self._source_model is None:
+            print(f"Warning: Model tier '{tier}' needs the PyTorch backend. Using the full model.")
+            return None
+        if backbones is not None and max(backbones) >= len(self._source_model.models):
+            print(f"Warning: Model tier '{tier}' needs backbones {backbones}. Using the full model.")
+            return None
+        print(f"Building '{tier}' model tier...")
+        model = self._source_model.subset(backbones, components)
+        return model.fused() if self.fused else model
+
+    def log_density(self, img_np, precision="fp32", tier="full"):
+        """
+        Returns the DeepGaze IIE log density of an (H, W, 3) RGB image.
+
+        Backbone features and the log density are cached by image content, so
+        the same image is only run through the backbones once. Images wider than
+        the max working width are predicted at reduced resolution (see
+        `working_size`), and images taller than the tiling threshold go through
+        `log_density_tiled`. `precision` and `tier` select a reduced-precision
+        model or a smaller ensemble (see `model_for`); each has its own cache entries.
+        """
+        key = _cache_key(img_np, precision, tier)
+        entry = self._cache_get(key)
+        if entry is not None and "log_density" in entry:
+            print("Reusing cached DeepGaze density.")
+            return entry["log_density"]
+
+        h, w = img_np.shape[:2]
+        working_h, working_w = self.working_size(h, w)
+        if (working_h, working_w) != (h, w):
+            print(f"Predicting at working resolution {working_w}x{working_h} (scale {working_w / w:.3f})")
+            working_img = cv2.resize(img_np, (working_w, working_h), interpolation=cv2.INTER_AREA)
+            log_density = upsample_log_density(self.log_density(working_img, precision, tier), (h, w))
+            self._cache_put(key, {"log_density": log_density})
+            return log_density
+
+        if self.needs_tiling(*img_np.shape[:2]):
+            log_density = self.log_density_tiled(img_np, precision, tier)
+            self._cache_put(key, {"log_density": log_density})
+            return log_density
+
+        h, w = img_np.shape[:2]
+        centerbias_tensor = self.centerbias.tensor(h, w, self.device)
+        model = self.model_for(precision, tier)
+
+        with torch.no_grad():
+            if entry is not None and "features" in entry:
+                features = entry["features"]
+            else:
+                image_tensor = torch.tensor(np.array([img_np.transpose(2, 0, 1)])).to(self.device)
+                features = model.extract_features(image_tensor)
+            log_density = model.readout(features, centerbias_tensor).cpu().numpy()[0, 0]
+
+        self._cache_put(key, {"features": features, "log_density": log_density})
+        return log_density
+
+    def working_size(self, h, w):
+        """
+        (height, width) an image of size (h, w) is run through DeepGaze at.
+
+        DeepGaze downsamples its input by 2 and reads out on a coarse grid, so the
+        full resolution of retina / 4K screenshots adds backbone FLOPs (which grow
+        with the pixel count) without adding detail to the smooth density.
+        """
+        if self.max_working_width <= 0 or w <= self.max_working_width:
+            return h, w
+        scale = self.max_working_width / w
+        return max(1, round(h * scale)), self.max_working_width
+
+    def inference_info(self, h, w):
+        """
+        Describes how an image of size (h, w) is predicted (reported by the API).
+        """
+        working_h, working_w = self.working_size(h, w)
+        return {
+            "scale": round(working_w / w, 4),
+            "working_size": [working_w, working_h],
+            "tiled": self.needs_tiling(working_h, working_w),
+        }
+
+    def batchable(self, h, w):
+        """
+        Whether an image of size (h, w) can go through the padded `log_densities` batch path.
+        """
+        return self.working_size(h, w) == (h, w) and not self.needs_tiling(h, w)
+
+    def needs_tiling(self, h, w):
+        """
+        Whether an image of size (h, w) is run as overlapping viewport tiles.
+        """
+        return self.tile_min_height > 0 and h > self.tile_min_height
+
+    def tile_layout(self, h, w):
+        """
+        Returns (tile_height, tile start rows) covering an image of size (h, w).
+
+        Tiles are shortened if a single tile would exceed the memory budget; the
+        last tile is aligned to the bottom edge so every tile has the same shape.
+        """
+        budget_rows = self.memory_budget // (w * self.bytes_per_pixel)
+        tile_h = min(h, self.tile_height, max(MIN_TILE_HEIGHT, budget_rows))
+        overlap = min(self.tile_overlap, tile_h // 2)
+        step = tile_h - overlap
+        starts = list(range(0, h - tile_h, step)) + [h - tile_h]
+        return tile_h, starts
+
+    def log_density_tiled(self, img_np, precision="fp32", tier="full"):
+        """
+        DeepGaze IIE log density of a tall (H, W, 3) image computed tile by tile.
+
+        The image is split into viewport-sized tiles that overlap by
+        `tile_overlap` rows. Tiles are run as batches sized to the memory budget,
+        each with a viewport center bias. Their log densities are feathered
+        together with linear ramps across the overlaps and renormalized over the
+        whole page, so peak memory depends on the tile size, not the page height.
+        """
+        h, w = img_np.shape[:2]
+        tile_h, starts = self.tile_layout(h, w)
+        tiles_per_batch = max(1, self.memory_budget // (tile_h * w * self.bytes_per_pixel))
+        print(f"Tiled inference: {len(starts)} tile(s) of {w}x{tile_h}, {tiles_per_batch} per batch")
+
+        centerbias = self.centerbias.tensor(tile_h, w, self.device)
+        model = self.model_for(precision, tier)
+        accumulated = np.zeros((h, w), dtype=np.float32)
+        weights = np.zeros((h, 1), dtype=np.float32)
+
+        # Rows each tile shares with its upper / lower neighbour
+        overlaps = [(starts[k - 1] + tile_h - y if k > 0 else 0,
+                     y + tile_h - starts[k + 1] if k + 1 < len(starts) else 0)
+                    for k, y in enumerate(starts)]
+
+        for i in range(0, len(starts), tiles_per_batch):
+            chunk = range(i, min(i + tiles_per_batch, len(starts)))
+            image_tensor = torch.tensor(np.stack([img_np[starts[k]:starts[k] + tile_h].transpose(2, 0, 1) for k in chunk])).to(self.device)
+            centerbias_tensor = centerbias.expand(len(chunk), -1, -1)
+
+            with torch.no_grad():
+                tile_log_densities = model(image_tensor, centerbias_tensor).cpu().numpy()[:, 0]
+
+            for k, tile_log_density in zip(chunk, tile_log_densities):
+                y = starts[k]
+                feather = _feather_weights(tile_h, *overlaps[k])
+                accumulated[y:y + tile_h] += feather[:, np.newaxis] * tile_log_density
+                weights[y:y + tile_h] += feather[:, np.newaxis]
+
+        log_density = accumulated / weights
+        log_density -= logsumexp(log_density)
+        return log_density
+
+    def log_density_incremental(self, img_np, previous_img, patches, precision="fp32", tier="full"):
+        """
+        Log density of an edited page, reusing the cached backbone features of
+        its previous version (`previous_img`, same size).
+
+        Only the `patches` ((crop, zone) pixel boxes, see incremental.py) are
+        run through the backbones; each crop's features over its zone replace
+        the previous features on the readout grid. The readout then runs over
+        the whole merged grid, so its page-wide normalizations match a full
+        prediction and only the backbone work shrinks.
+
+        Returns None if the previous features are not cached (evicted, or the
+        page was tiled).
+        """
+        h, w = img_np.shape[:2]
+        working_h, working_w = self.working_size(h, w)
+        if self.needs_tiling(working_h, working_w):
+            return None
+        scale = working_w / w
+        if scale != 1.0:
+            img_np = cv2.resize(img_np, (working_w, working_h), interpolation=cv2.INTER_AREA)
+            previous_img = cv2.resize(previous_img, (working_w, working_h), interpolation=cv2.INTER_AREA)
+
+        entry = self._cache_get(_cache_key(previous_img, precision, tier))
+        if entry is None or "features" not in entry:
+            return None
+        model = self.model_for(precision, tier)
+
+        cell = self.readout_cell()
+        grid_h, grid_w = entry["features"][0].shape[2:]
+        features = [item.clone() for item in entry["features"]]
+
+        with torch.no_grad():
+            for crop, zone in patches:
+                # Snap both boxes to readout cells at the working resolution
+                cy0, cy1, cx0, cx1 = _cells(crop, scale, cell, grid_h, grid_w)
+                zy0, zy1, zx0, zx1 = _cells(zone, scale, cell, grid_h, grid_w)
+                crop_img = img_np[cy0 * cell:min(cy1 * cell, working_h), cx0 * cell:min(cx1 * cell, working_w)]
+                image_tensor = torch.tensor(np.array([crop_img.transpose(2, 0, 1)])).to(self.device)
+                for item, crop_item in zip(features, model.extract_features(image_tensor)):
+                    item[:, :, zy0:zy1, zx0:zx1] = crop_item[:, :, zy0 - cy0:zy1 - cy0, zx0 - cx0:zx1 - cx0]
+
+            centerbias_tensor = self.centerbias.tensor(working_h, working_w, self.device)
+            log_density = model.readout(features, centerbias_tensor).cpu().numpy()[0, 0]
+
+        self._cache_put(_cache_key(img_np, precision, tier), {"features": features, "log_density": log_density})
+        if scale != 1.0:
+            log_density = upsample_log_density(log_density, (h, w))
+        return log_density
+
+    def readout_cell(self):
+        """
+        Input pixels per readout grid cell (DeepGaze downsampling x readout factor).
+        """
+        model = self.model.models[0] if hasattr(self.model, "models") else self.model
+        return model.downsample * model.readout_factor
+
+    def features(self, img_np, precision="fp32", tier="full"):
+        """
+        Returns the (cached) readout input of every backbone for an (H, W, 3) RGB image.
+        """
+        key = _cache_key(img_np, precision, tier)
+        entry = self._cache_get(key)
+        if entry is not None and "features" in entry:
+            return entry["features"]
+
+        model = self.model_for(precision, tier)
+        with torch.no_grad():
+            image_tensor = torch.tensor(np.array([img_np.transpose(2, 0, 1)])).to(self.device)
+            features = model.extract_features(image_tensor)
+
+        self._cache_put(key, {"features": features})
+        return features
+
+    def log_densities(self, images, shape, precision="fp32", tier="full"):
+        """
+        Runs DeepGaze IIE on a list of images as a single tensor batch.
+
+        Every image is padded (edge replicate) to `shape`. The padded area gets a
+        vanishing center bias so almost no probability mass lands there; the
+        prediction is then cropped back to the image and renormalized.
+        """
+        batch_h, batch_w = shape
+        image_batch = []
+        centerbias_batch = []
+        for img_np in images:
+            h, w = img_np.shape[:2]
+            pad = ((0, batch_h - h), (0, batch_w - w))
+            image_batch.append(np.pad(img_np, pad + ((0, 0),), mode='edge').transpose(2, 0, 1))
+            centerbias_batch.append(np.pad(self.prepare_centerbias(h, w), pad, mode='constant', constant_values=PAD_LOG_DENSITY))
+
+        image_tensor = torch.tensor(np.stack(image_batch)).to(self.device)
+        centerbias_tensor = torch.tensor(np.stack(centerbias_batch)).to(self.device)
+
+        model = self.model_for(precision, tier)
+        with torch.no_grad():
+            features = model.extract_features(image_tensor)
+            log_density_prediction = model.readout(features, centerbias_tensor).cpu().numpy()
+
+        log_densities = []
+        for k, (img_np, log_density) in enumerate(zip(images, log_density_prediction[:, 0])):
+            h, w = img_np.shape[:2]
+            if (h, w) != (batch_h, batch_w):
+                log_density = log_density[:h, :w]
+                log_density = log_density - logsumexp(log_density)
+            else:
+                # only unpadded predictions are valid for lookups (the features let a
+                # batch item serve as the reference of `log_density_incremental`)
+                self._cache_put(_cache_key(img_np, precision, tier), {
+                    "features": [item[k:k + 1].clone() for item in features],
+                    "log_density": log_density,
+                })
+            log_densities.append(log_density)
+
+        return log_densities
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+
+    def _cache_put(self, key, entry):
+        if "features" not in entry:
+            # a log density alone can't serve `features` lookups; keep any cached features
+            old = self._cache_get(key)
+            if old is not None and "features" in old:
+                entry = dict(old, **entry)
+        size = _entry_nbytes(entry)
+        if size > self.cache_bytes:
+            return
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache_size -= _entry_nbytes(self._cache.pop(key))
+            self._cache[key] = entry
+            self._cache_size += size
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= _entry_nbytes(evicted)
+
+
+def plan_tiers(spec=None):
+    """
+    Parses SALIENCY_PLAN_TIER ("plan:tier,...", default: every plan runs the full model) into a dict.
+    """
+    spec = os.getenv("SALIENCY_PLAN_TIER", "") if spec is None else spec
+    mapping = {}
+    for item in spec.split(","):
+        if ":" not in item:
+            continue
+        plan, tier = (part.strip().lower() for part in item.split(":", 1))
+        if tier not in MODEL_TIERS:
+            print(f"Warning: Unknown model tier '{tier}' for plan '{plan}'. Using full.")
+            tier = "full"
+        mapping[plan] = tier
+    return mapping
+
+
+def _cache_key(img_np, precision="fp32", tier="full"):
+    key = image_key(img_np)
+    if tier != "full":
+        key = f"{tier}:{key}"
+    return key if precision == "fp32" else f"{precision}:{key}"
+
+
+def upsample_log_density(log_density, shape):
+    """
+    Resizes a log density to `shape` (H, W) and renormalizes it.
+
+    The log density is interpolated bilinearly (DeepGaze densities are smooth
+    at the working resolution), then shifted so the density sums to 1 over the
+    new pixel grid.
+    """
+    h, w = shape
+    upsampled = cv2.resize(log_density.astype(np.float32), (w, h), interpolation=cv2.INTER_LINEAR)
+    return upsampled - logsumexp(upsampled)
+
+
+def _cells(box, scale, cell, grid_h, grid_w):
+    """
+    Readout grid rows / columns (y0, y1, x0, x1) covering an (x, y, w, h) pixel
+    box given at full resolution, for a page predicted at `scale`.
+    """
+    x, y, w, h = box
+    return (
+        int(y * scale) // cell, min(grid_h, -(-int(np.ceil((y + h) * scale)) // cell)),
+        int(x * scale) // cell, min(grid_w, -(-int(np.ceil((x + w) * scale)) // cell)),
+    )
+
+
+def _feather_weights(height, top, bottom):
+    """
+    Per-row blend weights of a tile: 1 inside, linear ramps across the rows
+    shared with the tiles above (`top`) and below (`bottom`).
+    """
+    feather = np.ones(height, dtype=np.float32)
+    if top > 0:
+        feather[:top] = np.arange(1, top + 1, dtype=np.float32) / (top + 1)
+    if bottom > 0:
+        feather[height - bottom:] = np.minimum(feather[height - bottom:], np.arange(bottom, 0, -1, dtype=np.float32) / (bottom + 1))
+    return feather
+
+
+def _entry_nbytes(entry):
+    size = 0
+    for value in entry.values():
+        if isinstance(value, list):
+            size += sum(item.element_size() * item.nelement() for item in value)
+        else:
+            size += value.nbytes
+    return size
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the process-wide SaliencyEngine, creating it on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = SaliencyEngine()
+        return _engine
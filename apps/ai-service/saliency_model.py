@@ -1,77 +1,93 @@
-import torch
 import numpy as np
 import cv2
 import os
+import time
 from PIL import Image
-from scipy.ndimage import zoom
-from scipy.special import logsumexp
-import deepgaze_pytorch
+from saliency_engine import get_engine
+from analysis_context import save_density_sidecar
 
 class SaliencyModel:
-    def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"Loading DeepGaze IIE Model on {self.device}...")
-        
-        # Load DeepGaze IIE
-        # This will download weights automatically on first run
-        self.model = deepgaze_pytorch.DeepGazeIIE(pretrained=True).to(self.device)
-        self.model.eval()
-        
-        # Load Center Bias
-        if os.path.exists("centerbias_mit1003.npy"):
-            self.centerbias_template = np.load("centerbias_mit1003.npy")
-        else:
-            print("Warning: Center bias file not found. Using uniform bias.")
-            self.centerbias_template = np.zeros((1024, 1024))
+    def __init__(self, engine=None):
+        """
+        Standard (plain DeepGaze IIE) saliency model.
+
+        Args:
+            engine (SaliencyEngine, optional): DeepGaze engine to use
+                (default: the process-wide engine shared with the enhanced model).
+        """
+        # The engine holds the DeepGaze IIE weights; it is created (and the
+        # weights downloaded) on first use and shared by every model variant.
+        self.engine = engine or get_engine()
+        self.save_density = os.getenv("SALIENCY_SAVE_DENSITY", "1") == "1"
 
-    def predict(self, image_path):
+    def predict(self, image_path, output_prefix="saliency_", log_density=None, precision="fp32", tier="full", image=None):
         """
         Predicts saliency map using DeepGaze IIE.
+        Returns the overlay path; see `predict_result` for the float saliency map.
+        """
+        return self.predict_result(image_path, output_prefix, log_density, precision, tier, image)["overlay_path"]
+
+    def predict_result(self, image_path, output_prefix="saliency_", log_density=None, precision="fp32", tier="full", image=None):
+        """
+        Predicts saliency using DeepGaze IIE.
+        A precomputed DeepGaze `log_density` (e.g. from incremental.py) skips inference;
+        `precision` and `tier` select the inference precision (see quantization.py)
+        and the latency tier (see saliency_engine.MODEL_TIERS). An already decoded
+        (H, W, 3) RGB `image` (see upload_ingest.py) is used instead of reading `image_path`.
+
+        Returns:
+            dict: overlay_path, density_path, saliency (float32 [0, 1] map),
+                log_density, timings and info, as in the enhanced model.
         """
         output_dir = "outputs"
         os.makedirs(output_dir, exist_ok=True)
-        filename = os.path.basename(image_path)
-        output_path = os.path.join(output_dir, f"saliency_{filename}")
+        # Overlays are PNG whatever the upload's format
+        filename = os.path.splitext(os.path.basename(image_path))[0] + ".png"
+        output_path = os.path.join(output_dir, f"{output_prefix}{filename}")
 
         # Load image
-        try:
-            # DeepGaze expects numpy array (H, W, 3) in RGB
-            pil_img = Image.open(image_path).convert('RGB')
-            img_np = np.array(pil_img)
-        except Exception as e:
-            raise ValueError(f"Could not process image: {e}")
+        img_np = image
+        if img_np is None:
+            try:
+                # DeepGaze expects numpy array (H, W, 3) in RGB
+                pil_img = Image.open(image_path).convert('RGB')
+                img_np = np.array(pil_img)
+            except Exception as e:
+                raise ValueError(f"Could not process image: {e}")
+
+        # Inference (log density, cached per image by the shared engine)
+        timings = {}
+        log_density_prediction = log_density
+        if log_density_prediction is None:
+            start = time.perf_counter()
+            log_density_prediction = self.engine.log_density(img_np, precision, tier)
+            timings["inference"] = round(time.perf_counter() - start, 4)
+
+        # Convert log density to probability distribution
+        density = np.exp(log_density_prediction)
 
-        # Prepare Center Bias
-        # Rescale to match image size
-        h, w = img_np.shape[:2]
-        centerbias = zoom(self.centerbias_template, (h/self.centerbias_template.shape[0], w/self.centerbias_template.shape[1]), order=0, mode='nearest')
-        # Renormalize log density
-        centerbias -= logsumexp(centerbias)
-        
-        # Prepare Tensors
-        # Image: (1, 3, H, W)
-        image_tensor = torch.tensor([img_np.transpose(2, 0, 1)]).to(self.device)
-        centerbias_tensor = torch.tensor([centerbias]).to(self.device)
+        # Normalize to [0, 1]; the overlay below is for display only
+        start = time.perf_counter()
+        saliency = ((density - density.min()) / (density.max() - density.min() + 1e-8)).astype(np.float32)
+        saliency_uint8 = (saliency * 255).astype(np.uint8)
 
-        # Inference
-        with torch.no_grad():
-            # Output is log density
-            log_density_prediction = self.model(image_tensor, centerbias_tensor)
-            
-            # Convert log density to probability distribution
-            density = np.exp(log_density_prediction.cpu().numpy()[0, 0])
-            
-        # Normalize to 0-255 for visualization
-        saliency = (density - density.min()) / (density.max() - density.min() + 1e-8)
-        saliency = (saliency * 255).astype(np.uint8)
-        
         # Apply heatmap
-        heatmap = cv2.applyColorMap(saliency, cv2.COLORMAP_JET)
-        
+        heatmap = cv2.applyColorMap(saliency_uint8, cv2.COLORMAP_JET)
+
         # Overlay
         # Convert RGB to BGR for OpenCV
         cv_img = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
         result = cv2.addWeighted(cv_img, 0.6, heatmap, 0.4, 0)
-        
+
         cv2.imwrite(output_path, result)
-        return output_path
+        density_path = save_density_sidecar(output_path, saliency) if self.save_density else None
+        timings["render"] = round(time.perf_counter() - start, 4)
+
+        return {
+            "overlay_path": output_path,
+            "density_path": density_path,
+            "saliency": saliency,
+            "log_density": log_density_prediction,
+            "timings": timings,
+            "info": {**self.engine.inference_info(*img_np.shape[:2]), "precision": precision, "tier": tier},
+        }
@@ -1,163 +1,142 @@
-import torch
 import numpy as np
 import cv2
 import os
+import time
 from PIL import Image
-from scipy.ndimage import zoom, gaussian_filter
-from scipy.special import logsumexp
-import deepgaze_pytorch
+from saliency_engine import get_engine
+from analysis_context import save_density_sidecar
+from ui_enhancement import UIEnhancer
+from face_detection import create_face_detector
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 
 class SaliencyModel:
-    def __init__(self, enhanced_mode=True):
+    def __init__(self, enhanced_mode=True, batch_size=None, pad_multiple=None, engine=None):
         """
         Enhanced Saliency Model with UI/UX-specific improvements.
         
         Args:
             enhanced_mode (bool): If True, applies UI-specific enhancements.
+            engine (SaliencyEngine, optional): DeepGaze engine to post-process
+                (default: the process-wide engine shared with the standard model).
+            batch_size (int, optional): Max images per forward pass in `predict_batch`
+                (default: SALIENCY_BATCH_SIZE env var or 4).
+            pad_multiple (int, optional): Images are padded up to a multiple of this many
+                pixels so near-identical sizes share a batch. Padding shifts the readout
+                grid slightly, so the default of 1 only batches identical sizes
+                (default: SALIENCY_BATCH_PAD_MULTIPLE env var or 1).
+
+        The float saliency map is persisted next to each overlay as a float16
+        `.npy` sidecar unless SALIENCY_SAVE_DENSITY=0.
         """
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.engine = engine or get_engine()
         self.enhanced_mode = enhanced_mode
+        self.batch_size = batch_size or int(os.getenv("SALIENCY_BATCH_SIZE", 4))
+        self.pad_multiple = pad_multiple or int(os.getenv("SALIENCY_BATCH_PAD_MULTIPLE", 1))
+        self.save_density = os.getenv("SALIENCY_SAVE_DENSITY", "1") == "1"
         
-        print(f"Loading DeepGaze IIE Model on {self.device}...")
         print(f"Enhanced Mode: {'ENABLED' if enhanced_mode else 'DISABLED'}")
         
-        # Load DeepGaze IIE
-        self.model = deepgaze_pytorch.DeepGazeIIE(pretrained=True).to(self.device)
-        self.model.eval()
-        
-        # Load Center Bias
-        if os.path.exists("centerbias_mit1003.npy"):
-            self.centerbias_template = np.load("centerbias_mit1003.npy")
-        else:
-            print("Warning: Center bias file not found. Using uniform bias.")
-            self.centerbias_template = np.zeros((1024, 1024))
-        
-        # Load Face Detector (OpenCV Haar Cascade)
+        self.enhancer = UIEnhancer()
+
+        # Load Face Detector (FACE_DETECTOR=haar|dnn, see face_detection.py)
         if enhanced_mode:
-            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-            self.face_cascade = cv2.CascadeClassifier(cascade_path)
-            print("Face detector loaded.")
+            self.face_detector = create_face_detector()
+            print(f"Face detector loaded ({self.face_detector.name}).")
+
+    def _face_boxes(self, gray):
+        """
+        Face boxes (x, y, w, h) detected in a uint8 grayscale image.
+        """
+        return self.face_detector.detect(gray)
 
     def detect_faces(self, img_np):
         """
         Detect faces in the image and return a face salience map.
         """
         gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
-        faces = self.face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-        
-        h, w = img_np.shape[:2]
-        face_map = np.zeros((h, w), dtype=np.float32)
-        
-        for (x, y, fw, fh) in faces:
-            # Create elliptical mask for each face
-            center = (x + fw//2, y + fh//2)
-            axes = (fw//2, fh//2)
-            cv2.ellipse(face_map, center, axes, 0, 0, 360, 1.0, -1)
-        
-        # Smooth the face map
-        if face_map.max() > 0:
-            face_map = gaussian_filter(face_map, sigma=fw//4 if len(faces) > 0 else 20)
-        
-        return face_map, len(faces)
+        faces = self._face_boxes(gray)
+        return self.enhancer.face_map(img_np.shape[:2], faces), len(faces)
 
     def detect_text_regions(self, img_np):
         """
         Detect likely text regions using edge density and gradients.
         """
-        gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
-        
-        # Text typically has high gradient variance
-        sobelx = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
-        sobely = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
-        gradient_magnitude = np.sqrt(sobelx**2 + sobely**2)
-        
-        # Normalize
-        text_map = (gradient_magnitude - gradient_magnitude.min()) / (gradient_magnitude.max() - gradient_magnitude.min() + 1e-8)
-        
-        # Apply threshold to focus on high-gradient areas (text)
-        text_map = np.where(text_map > 0.3, text_map, 0)
-        
-        # Smooth
-        text_map = gaussian_filter(text_map, sigma=5)
-        
-        return text_map
+        return self.enhancer.text_map(cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY))
 
     def apply_f_pattern_bias(self, h, w):
         """
         Apply F-Pattern reading bias (common in web pages).
         Higher saliency at top-left, decreasing towards bottom-right.
         """
-        y_coords, x_coords = np.ogrid[:h, :w]
-        
-        # Top-left quadrant gets highest bias
-        # Linear decay from top-left to bottom-right
-        x_bias = 1.0 - (x_coords / w) * 0.5  # Decay 50% left to right
-        y_bias = 1.0 - (y_coords / h) * 0.6  # Decay 60% top to bottom
-        
-        f_pattern = x_bias * y_bias
-        
-        # Smooth the bias
-        f_pattern = gaussian_filter(f_pattern, sigma=min(h, w) // 10)
-        
-        return f_pattern
+        return self.enhancer.f_pattern(h, w)
 
-    def predict(self, image_path):
+    def _load_image(self, image_path):
         """
-        Predicts saliency map using DeepGaze IIE + UI/UX enhancements.
+        Loads an image from disk as an (H, W, 3) RGB array.
         """
-        output_dir = "outputs"
-        os.makedirs(output_dir, exist_ok=True)
-        filename = os.path.basename(image_path)
-        output_path = os.path.join(output_dir, f"saliency_{filename}")
-
-        # Load image
         try:
             pil_img = Image.open(image_path).convert('RGB')
-            img_np = np.array(pil_img)
+            return np.array(pil_img)
         except Exception as e:
             raise ValueError(f"Could not process image: {e}")
 
-        h, w = img_np.shape[:2]
-        
-        # === STEP 1: DeepGaze IIE Prediction ===
-        centerbias = zoom(self.centerbias_template, (h/self.centerbias_template.shape[0], w/self.centerbias_template.shape[1]), order=0, mode='nearest')
-        centerbias -= logsumexp(centerbias)
-        
-        image_tensor = torch.tensor([img_np.transpose(2, 0, 1)]).to(self.device)
-        centerbias_tensor = torch.tensor([centerbias]).to(self.device)
-
-        with torch.no_grad():
-            log_density_prediction = self.model(image_tensor, centerbias_tensor)
-            density = np.exp(log_density_prediction.cpu().numpy()[0, 0])
-        
-        # Normalize to [0, 1]
-        saliency = (density - density.min()) / (density.max() - density.min() + 1e-8)
+    def _enhance(self, img_np, log_density, timings=None):
+        """
+        Applies the UI/UX enhancements to a DeepGaze log density.
+        Returns the float32 saliency map normalized to [0, 1]; face detection
+        time is recorded in `timings` if given.
+        """
+        # Normalize to [0, 1] (shifting by the max keeps float32 exp in range)
+        saliency = np.exp((log_density - log_density.max()).astype(np.float32))
+        saliency -= saliency.min()
+        saliency *= 1.0 / (saliency.max() + 1e-8)
         
         # === STEP 2: UI/UX Enhancements ===
         if self.enhanced_mode:
             print("Applying UI/UX enhancements...")
+            gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
             
             # 1. Face Detection Boost
-            face_map, num_faces = self.detect_faces(img_np)
-            if num_faces > 0:
-                print(f"  - Detected {num_faces} face(s). Boosting face regions.")
-                face_map_norm = face_map / (face_map.max() + 1e-8)
-                saliency = saliency + face_map_norm * 0.3  # 30% boost for faces
+            start = time.perf_counter()
+            faces = self._face_boxes(gray)
+            if timings is not None:
+                timings["face_detection"] = round(time.perf_counter() - start, 4)
+            if len(faces) > 0:
+                print(f"  - Detected {len(faces)} face(s). Boosting face regions.")
             
             # 2. Text Region Boost
-            text_map = self.detect_text_regions(img_np)
             print(f"  - Boosting text regions.")
-            saliency = saliency + text_map * 0.15  # 15% boost for text
             
             # 3. F-Pattern Bias (for web/UI layouts)
-            f_bias = self.apply_f_pattern_bias(h, w)
             print(f"  - Applying F-pattern reading bias.")
-            saliency = saliency * (0.7 + f_bias * 0.3)  # Blend with 30% F-pattern weight
             
-            # Re-normalize after enhancements
-            saliency = (saliency - saliency.min()) / (saliency.max() - saliency.min() + 1e-8)
+            # One fused float32 pass (see ui_enhancement.py)
+            saliency = self.enhancer.enhance(saliency, gray, faces)
+
+        return saliency
+
+    def _render_saliency(self, image_path, img_np, log_density, output_prefix="saliency_", timings=None):
+        """
+        Enhances a DeepGaze log density, writes the display overlay (and density
+        sidecar) and returns the `predict_result` dict.
+        """
+        output_dir = "outputs"
+        os.makedirs(output_dir, exist_ok=True)
+        # Overlays are PNG whatever the upload's format
+        filename = os.path.splitext(os.path.basename(image_path))[0] + ".png"
+        output_path = os.path.join(output_dir, f"{output_prefix}{filename}")
+        timings = dict(timings or {})
+
+        start = time.perf_counter()
+        saliency = self._enhance(img_np, log_density, timings)
+        timings["enhancement"] = round(time.perf_counter() - start, 4)
         
-        # === STEP 3: Visualization ===
+        # === STEP 3: Visualization (display only; metrics use `saliency`) ===
+        start = time.perf_counter()
         saliency_uint8 = (saliency * 255).astype(np.uint8)
         heatmap = cv2.applyColorMap(saliency_uint8, cv2.COLORMAP_JET)
         
@@ -165,5 +144,103 @@ class SaliencyModel:
         result = cv2.addWeighted(cv_img, 0.6, heatmap, 0.4, 0)
         
         cv2.imwrite(output_path, result)
+        density_path = save_density_sidecar(output_path, saliency) if self.save_density else None
+        timings["render"] = round(time.perf_counter() - start, 4)
         print(f"Saliency map saved to: {output_path}")
-        return output_path
+
+        return {
+            "overlay_path": output_path,
+            "density_path": density_path,
+            "saliency": saliency,
+            "log_density": log_density,
+            "timings": timings,
+        }
+
+    def predict_result(self, image_path, output_prefix="saliency_", log_density=None, precision="fp32", tier="full", image=None):
+        """
+        Predicts saliency using DeepGaze IIE + UI/UX enhancements.
+        A precomputed DeepGaze `log_density` (e.g. from incremental.py) skips inference;
+        `precision` and `tier` select the inference precision (see quantization.py)
+        and the latency tier (see saliency_engine.MODEL_TIERS). An already decoded
+        (H, W, 3) RGB `image` (see upload_ingest.py) is used instead of reading `image_path`.
+
+        Returns:
+            dict: overlay_path (display PNG), density_path (float16 sidecar or None),
+                saliency (float32 [0, 1] map), log_density (raw DeepGaze output),
+                timings (seconds per step) and info (working resolution scale, tiling).
+        """
+        img_np = image if image is not None else self._load_image(image_path)
+
+        # === STEP 1: DeepGaze IIE Prediction (shared engine) ===
+        timings = {}
+        if log_density is None:
+            start = time.perf_counter()
+            log_density = self.engine.log_density(img_np, precision, tier)
+            timings["inference"] = round(time.perf_counter() - start, 4)
+
+        result = self._render_saliency(image_path, img_np, log_density, output_prefix, timings=timings)
+        result["info"] = {**self.engine.inference_info(*img_np.shape[:2]), "precision": precision, "tier": tier}
+        return result
+
+    def predict(self, image_path, output_prefix="saliency_", log_density=None, precision="fp32", tier="full", image=None):
+        """
+        Predicts saliency map using DeepGaze IIE + UI/UX enhancements.
+        Returns the overlay path; see `predict_result` for the float saliency map.
+        """
+        return self.predict_result(image_path, output_prefix, log_density, precision, tier, image)["overlay_path"]
+
+    def predict_batch(self, image_paths, batch_size=None, precision="fp32", tier="full", images=None):
+        """
+        Predicts saliency maps for several images, batching forward passes.
+        Returns the saliency map paths; see `predict_batch_results` for the float saliency maps.
+        """
+        return [result["overlay_path"] for result in self.predict_batch_results(image_paths, batch_size, precision, tier, images)]
+
+    def predict_batch_results(self, image_paths, batch_size=None, precision="fp32", tier="full", images=None):
+        """
+        Predicts saliency for several images, batching forward passes.
+
+        Images are bucketed by shape (rounded up to `pad_multiple` pixels, like
+        `ImageDatasetSampler` buckets by exact shape) so each bucket runs through
+        the backbones as one tensor batch instead of one forward pass per image.
+        `precision` and `tier` select the inference precision (see quantization.py)
+        and the latency tier (see saliency_engine.MODEL_TIERS). Already decoded
+        `images` (one per path) are used instead of reading `image_paths`.
+
+        Returns:
+            list: `predict_result` dicts in the same order as `image_paths`.
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+
+        if images is None:
+            images = [self._load_image(path) for path in image_paths]
+
+        results = [None] * len(image_paths)
+        buckets = {}
+        for k, img_np in enumerate(images):
+            if not self.engine.batchable(*img_np.shape[:2]):
+                # Full-page / oversized screenshots are tiled or downscaled by the engine
+                results[k] = self._render_saliency(image_paths[k], img_np, self.engine.log_density(img_np, precision, tier))
+                continue
+            buckets.setdefault(self._bucket_shape(*img_np.shape[:2]), []).append(k)
+
+        for shape in sorted(buckets):
+            for chunk in chunked(buckets[shape], size=batch_size):
+                print(f"Running batch of {len(chunk)} image(s) at {shape[1]}x{shape[0]}")
+                log_densities = self.engine.log_densities([images[k] for k in chunk], shape, precision, tier)
+                for k, log_density in zip(chunk, log_densities):
+                    results[k] = self._render_saliency(image_paths[k], images[k], log_density)
+
+        for result, img_np in zip(results, images):
+            result["info"] = {**self.engine.inference_info(*img_np.shape[:2]), "precision": precision, "tier": tier}
+        return results
+
+    def _bucket_shape(self, h, w):
+        """
+        Returns the padded (H, W) of the batch bucket an image of size (h, w) falls into.
+        """
+        m = self.pad_multiple
+        if m <= 1:
+            return (h, w)
+        return (-(-h // m) * m, -(-w // m) * m)
@@ -0,0 +1,212 @@
+"""
+DeepGaze III scanpath simulation.
+
+DeepGaze III predicts where the next fixation lands given the image and the
+last four fixations. Sequences are sampled autoregressively: fixation k + 1
+is drawn from the density conditioned on fixations 1..k. The backbone
+(DenseNet-201) and the saliency networks don't depend on the fixation
+history, so they run once per image (and are cached). Every step only reruns
+the scanpath and fixation selection networks and the finalizers on the
+readout grid, for all sampled scanpaths at once.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import torch
+
+import deepgaze_pytorch
+from centerbias import CenterBiasProvider
+from deepgaze_pytorch.modules import nearest_log_counts, nearest_source_index
+from saliency_engine import image_key
+
+
+def history(xs, ys, included_fixations):
+    """
+    (x_hist, y_hist) model input from the (N, k) fixations sampled so far, e.g.
+    `included_fixations` [-1, -2, -3, -4] picks the last four (NaN where a scanpath
+    has fewer fixations).
+    """
+    count, length = xs.shape
+    x_hist = torch.full((count, len(included_fixations)), float("nan"), dtype=xs.dtype, device=xs.device)
+    y_hist = torch.full_like(x_hist, float("nan"))
+    for k, index in enumerate(included_fixations):
+        if -index <= length:
+            x_hist[:, k] = xs[:, index]
+            y_hist[:, k] = ys[:, index]
+    return x_hist, y_hist
+
+
+def sample_fixations(log_density, size, generator=None):
+    """
+    Draws one fixation per (N, 1, h, w) log density, as pixel coordinates at `size`.
+
+    `log_density` may be at a lower resolution than `size` (see
+    `DeepGazeIIIMixture.readout(upsample=False)`): a cell is drawn with the mass its
+    nearest-upsampled pixels have, then one of those pixels uniformly, which is
+    the same as sampling the upsampled density.
+    """
+    count, _, h, w = log_density.shape
+    weights = log_density[:, 0] + nearest_log_counts((h, w), size, device=log_density.device, dtype=log_density.dtype)
+    cells = torch.multinomial(torch.softmax(weights.reshape(count, -1), dim=1), 1, generator=generator)[:, 0]
+
+    coordinates = []
+    for cell, low, full in ((cells // w, h, size[0]), (cells % w, w, size[1])):
+        # full resolution pixels of each cell: a contiguous run, since nearest upsampling is monotonic
+        source = nearest_source_index(low, full, device=log_density.device)
+        first = torch.searchsorted(source, cell)
+        repeats = torch.searchsorted(source, cell, right=True) - first
+        offset = (torch.rand(count, generator=generator, device=log_density.device) * repeats).long()
+        coordinates.append((first + offset).to(log_density.dtype))
+    ys, xs = coordinates
+    return xs, ys
+
+
+def sample_scanpaths(model, saliency, centerbias, count, fixations, start, generator=None):
+    """
+    Samples `count` scanpaths of `fixations` fixations each, starting at `start` (x, y).
+
+    Args:
+        model: DeepGazeIIIMixture (with scanpath networks).
+        saliency: `model.saliency_readout` output for one image (batch size 1).
+        centerbias: (1, H, W) log center bias tensor.
+
+    Returns:
+        (xs, ys): (count, fixations) tensors of pixel coordinates.
+    """
+    size = tuple(centerbias.shape[1:])
+    saliency = [item.expand(count, -1, -1, -1) for item in saliency]
+    centerbias = centerbias.expand(count, -1, -1)
+
+    xs = torch.full((count, 1), float(start[0]), device=centerbias.device)
+    ys = torch.full((count, 1), float(start[1]), device=centerbias.device)
+    for _ in range(fixations - 1):
+        x_hist, y_hist = history(xs, ys, model.included_fixations)
+        log_density = model.readout(None, centerbias, x_hist=x_hist, y_hist=y_hist, upsample=False, saliency=saliency)
+        next_xs, next_ys = sample_fixations(log_density, size, generator=generator)
+        xs = torch.cat([xs, next_xs[:, np.newaxis]], dim=1)
+        ys = torch.cat([ys, next_ys[:, np.newaxis]], dim=1)
+    return xs, ys
+
+
+class ScanpathEngine:
+    def __init__(self, model=None, centerbias=None, cache_images=None, max_working_width=None):
+        """
+        Args:
+            model (optional): DeepGazeIIIMixture to sample from (default: pretrained DeepGaze III).
+            centerbias (CenterBiasProvider, optional): Shared center bias provider.
+            cache_images (int, optional): Images whose static readout is kept
+                (default: SCANPATH_CACHE_IMAGES env var or 8).
+            max_working_width (int, optional): Wider images are simulated at this width and
+                the fixations scaled back; 0 disables (default: SCANPATH_MAX_WORKING_WIDTH
+                env var or 1024, about the width of the DeepGaze III training images).
+        """
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if model is None:
+            print(f"Loading DeepGaze III Model on {self.device}...")
+            model = deepgaze_pytorch.DeepGazeIII(pretrained=True)
+        self.model = model.to(self.device)
+        self.model.eval()
+
+        self.centerbias = centerbias or CenterBiasProvider()
+        self.cache_images = cache_images if cache_images is not None else int(os.getenv("SCANPATH_CACHE_IMAGES", 8))
+        if max_working_width is None:
+            max_working_width = int(os.getenv("SCANPATH_MAX_WORKING_WIDTH", 1024))
+        self.max_working_width = max_working_width
+
+        # Only the cache is locked; forward passes may overlap (see SaliencyEngine)
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def saliency(self, img_np):
+        """
+        The history-independent readout (`DeepGazeIIIMixture.saliency_readout`) of an
+        (H, W, 3) RGB image, cached by image content.
+        """
+        key = image_key(img_np)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        with torch.no_grad():
+            image_tensor = torch.tensor(np.array([img_np.transpose(2, 0, 1)])).to(self.device)
+            saliency = self.model.saliency_readout(self.model.extract_features(image_tensor))
+
+        if self.cache_images > 0:
+            with self._cache_lock:
+                self._cache[key] = saliency
+                while len(self._cache) > self.cache_images:
+                    self._cache.popitem(last=False)
+        return saliency
+
+    def simulate(self, img_np, scanpaths=10, fixations=8, start=None, seed=None):
+        """
+        Samples scanpaths on an (H, W, 3) RGB image.
+
+        Args:
+            scanpaths (int): Number of scanpaths, sampled in one batch.
+            fixations (int): Fixations per scanpath, including the start fixation.
+            start (tuple, optional): (x, y) pixel of the first fixation (default: image center,
+                like the central fixation cross before free viewing).
+            seed (int, optional): Seed for reproducible sampling.
+
+        Returns:
+            dict: "scanpaths" as (scanpaths, fixations, 2) float array of (x, y) pixel
+            coordinates of the original image, and the timings in seconds.
+        """
+        h, w = img_np.shape[:2]
+        scale = 1.0
+        if 0 < self.max_working_width < w:
+            scale = self.max_working_width / w
+            img_np = cv2.resize(img_np, (self.max_working_width, max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        working_h, working_w = img_np.shape[:2]
+        if start is None:
+            start = ((w - 1) / 2, (h - 1) / 2)
+        # pixel centers to the working resolution and back (below)
+        start = tuple(min(max((value + 0.5) * scale - 0.5, 0), limit - 1) for value, limit in zip(start, (working_w, working_h)))
+
+        started = time.perf_counter()
+        saliency = self.saliency(img_np)
+        static_seconds = time.perf_counter() - started
+
+        generator = torch.Generator(device=self.device)
+        if seed is not None:
+            generator.manual_seed(seed)
+        else:
+            generator.seed()
+
+        started = time.perf_counter()
+        centerbias = self.centerbias.tensor(working_h, working_w, self.device)
+        with torch.no_grad():
+            xs, ys = sample_scanpaths(self.model, saliency, centerbias, scanpaths, fixations, start, generator=generator)
+        sampling_seconds = time.perf_counter() - started
+
+        paths = np.stack([xs.cpu().numpy(), ys.cpu().numpy()], axis=-1)
+        paths = (paths + 0.5) / scale - 0.5
+        return {
+            "scanpaths": paths,
+            "working_size": [working_w, working_h],
+            "timings": {"static": static_seconds, "sampling": sampling_seconds},
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_scanpath_engine(centerbias=None):
+    """
+    Process-wide ScanpathEngine, loaded on first use (DeepGaze III isn't needed for
+    plain analyses, so it stays out of the startup path).
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ScanpathEngine(centerbias=centerbias)
+    return _engine
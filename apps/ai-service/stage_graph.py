@@ -0,0 +1,80 @@
+"""
+Stage Graph Module
+Runs a small dependency graph of pipeline stages concurrently.
+
+Each stage names the stages it depends on and the executor "lane" it runs on
+(e.g. a CPU lane for OpenCV / KMeans work and an I/O lane for Gemini calls).
+A stage is submitted as soon as all of its dependencies have finished, so
+independent stages overlap instead of running back to back.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+# Marker for stages whose failure should abort the whole graph
+REQUIRED = object()
+
+class Stage:
+    def __init__(self, name, func, deps=(), lane="cpu", fallback=REQUIRED):
+        """
+        Args:
+            name (str): Unique stage name; also the key of its result.
+            func (callable): Called with the results of `deps` as positional arguments.
+            deps (tuple): Names of the stages this stage needs.
+            lane (str): Executor lane the stage runs on.
+            fallback: Result used (after logging the error) if the stage raises.
+                Stages without a fallback abort the graph and re-raise.
+        """
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.lane = lane
+        self.fallback = fallback
+
+def run_stages(stages, executors):
+    """
+    Executes `stages` on `executors` (lane name -> concurrent.futures executor).
+
+    Returns (results, timings): stage name -> result and stage name -> seconds.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {missing}")
+
+    results = {}
+    timings = {}
+    pending = dict(by_name)
+    running = {}
+
+    def timed(stage, args):
+        start = time.perf_counter()
+        try:
+            return stage.func(*args)
+        finally:
+            timings[stage.name] = round(time.perf_counter() - start, 4)
+
+    while pending or running:
+        for name in [name for name, stage in pending.items() if all(dep in results for dep in stage.deps)]:
+            stage = pending.pop(name)
+            args = [results[dep] for dep in stage.deps]
+            running[executors[stage.lane].submit(timed, stage, args)] = stage
+
+        if not running:
+            raise ValueError(f"Stage graph has a dependency cycle: {sorted(pending)}")
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            stage = running.pop(future)
+            try:
+                results[stage.name] = future.result()
+            except Exception as e:
+                if stage.fallback is REQUIRED:
+                    for other in running:
+                        other.cancel()
+                    raise
+                print(f"Stage '{stage.name}' failed: {e}")
+                results[stage.name] = stage.fallback
+
+    return results, timings
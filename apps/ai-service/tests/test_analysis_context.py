@@ -0,0 +1,64 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+import analysis_context
+from analysis_context import AnalysisContext, as_context, save_density_sidecar
+from cognitive_marketing import generate_cognitive_marketing_analysis
+
+def test_analysis_context_decodes_once():
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, 255, size=(120, 160, 3)).astype(np.uint8)
+    saliency = cv2.GaussianBlur(rng.randint(0, 255, size=(120, 160)).astype(np.uint8), (15, 15), 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, "page.png")
+        saliency_path = os.path.join(tmp, "saliency.png")
+        cv2.imwrite(image_path, img)
+        cv2.imwrite(saliency_path, saliency)
+
+        reads = []
+        imread = cv2.imread
+        def counting_imread(*args):
+            reads.append(args[0])
+            return imread(*args)
+
+        analysis_context.cv2.imread = counting_imread
+        try:
+            ctx = AnalysisContext(image_path, saliency_path)
+            from_context = generate_cognitive_marketing_analysis(ctx)
+            assert sorted(reads) == sorted([image_path, saliency_path])
+        finally:
+            analysis_context.cv2.imread = imread
+
+        # Path-based wrappers give the same result
+        assert generate_cognitive_marketing_analysis(image_path, saliency_path) == from_context
+
+        assert np.array_equal(ctx.hsv, cv2.cvtColor(img, cv2.COLOR_BGR2HSV))
+        assert np.array_equal(ctx.lab, cv2.cvtColor(img, cv2.COLOR_BGR2LAB))
+        assert as_context(image_path, ctx) is ctx
+    print("[PASS] Analysis context decodes once")
+
+def test_analysis_context_prefers_density_sidecar():
+    density = np.linspace(0, 1, 80 * 60, dtype=np.float32).reshape(60, 80)
+    overlay = np.zeros((60, 80, 3), dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        overlay_path = os.path.join(tmp, "saliency_page.png")
+        cv2.imwrite(overlay_path, overlay)
+        assert np.array_equal(AnalysisContext(saliency_map_path=overlay_path).saliency, np.zeros((60, 80), dtype=np.uint8))
+
+        # The float map, not the JET overlay, feeds the metrics
+        save_density_sidecar(overlay_path, density)
+        from_sidecar = AnalysisContext(saliency_map_path=overlay_path).saliency
+        from_memory = AnalysisContext(saliency_density=density).saliency
+        assert np.abs(from_sidecar.astype(int) - (density * 255).astype(int)).max() <= 1
+        assert np.array_equal(from_memory, (density * 255).astype(np.uint8))
+    print("[PASS] Analysis context uses density sidecar")
+
+if __name__ == "__main__":
+    test_analysis_context_decodes_once()
+    test_analysis_context_prefers_density_sidecar()
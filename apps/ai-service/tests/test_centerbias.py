@@ -0,0 +1,39 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from scipy.ndimage import zoom
+from scipy.special import logsumexp
+from centerbias import CenterBiasProvider
+
+def test_centerbias_provider():
+    template = np.random.RandomState(0).randn(64, 64)
+    provider = CenterBiasProvider(template=template, cache_mb=1)
+
+    centerbias = provider.log_centerbias(90, 160)
+    expected = zoom(template, (90 / 64, 160 / 64), order=0, mode='nearest')
+    expected -= logsumexp(expected)
+    assert np.array_equal(centerbias, expected)
+    assert not centerbias.flags.writeable
+
+    # Memoized per size, also as a tensor
+    assert provider.log_centerbias(90, 160) is centerbias
+    tensor = provider.tensor(90, 160)
+    assert tensor.shape == (1, 90, 160)
+    assert provider.tensor(90, 160) is tensor
+    assert torch.equal(tensor[0], torch.from_numpy(expected))
+
+    # Byte budget: a 1 MB cache can't hold two 300x300 float64 biases
+    provider.log_centerbias(300, 300)
+    provider.log_centerbias(301, 300)
+    assert provider._cache_size <= provider.cache_bytes
+    assert ("numpy", 300, 300) not in provider._cache
+
+    provider.precompute(sizes=[(10, 20)])
+    assert ("numpy", 10, 20) in provider._cache
+    print("[PASS] Center bias provider")
+
+if __name__ == "__main__":
+    test_centerbias_provider()
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from face_detection import FaceDetector, create_face_detector
+
+class RecordingDetector(FaceDetector):
+    name = "recording"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def _detect(self, gray, scale):
+        self.calls.append((gray.shape, scale))
+        # One face covering the central quarter of whatever it was given
+        h, w = gray.shape
+        return [(w // 4, h // 4, w // 2, h // 2)]
+
+def test_downscaled_detection_maps_back():
+    gray = np.random.RandomState(0).randint(0, 255, size=(2000, 800)).astype(np.uint8)
+    detector = RecordingDetector(max_side=500, cache_entries=4)
+
+    boxes = detector.detect(gray)
+    assert detector.calls == [((500, 200), 0.25)]
+    assert boxes.tolist() == [[200, 500, 400, 1000]]
+
+    # Same pixels: served from the cache
+    assert detector.detect(gray.copy()).tolist() == boxes.tolist()
+    assert len(detector.calls) == 1
+    print("[PASS] Downscaled face detection")
+
+def test_haar_backend_and_fallback():
+    detector = create_face_detector("dnn", max_side=640)
+    assert detector.name == "haar"
+    assert detector.detect(np.zeros((100, 100), dtype=np.uint8)).shape == (0, 4)
+    print("[PASS] Haar backend fallback")
+
+if __name__ == "__main__":
+    test_downscaled_detection_maps_back()
+    test_haar_backend_and_fallback()
@@ -0,0 +1,91 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+import torch.nn as nn
+
+from deepgaze_pytorch.modules import FeatureExtractor
+
+def build_backbone():
+    torch.manual_seed(0)
+    return nn.Sequential(OrderedDict([
+        ('conv1', nn.Conv2d(3, 6, 3, stride=2, padding=1)),
+        ('norm1', nn.BatchNorm2d(6)),
+        ('relu1', nn.ReLU(inplace=True)),  # overwrites the tapped norm1 output
+        ('conv2', nn.Conv2d(6, 8, 3, stride=2, padding=1)),
+        ('conv3', nn.Conv2d(8, 8, 3, padding=1)),
+        ('pool', nn.AdaptiveAvgPool2d(1)),
+        ('flatten', nn.Flatten()),
+        ('fc', nn.Linear(8, 10)),
+    ])).eval()
+
+def test_truncated_extractor_matches_full_pass():
+    targets = ['norm1', 'conv2']
+    backbone = build_backbone()
+    image = torch.rand(2, 3, 64, 80)
+
+    with torch.no_grad():
+        norm1 = backbone.norm1(backbone.conv1(image))
+        expected = [norm1, backbone.conv2(torch.relu(norm1))]
+
+        extractor = FeatureExtractor(copy.deepcopy(backbone), targets)
+        for _ in range(2):
+            outputs = extractor(image)
+            for output, reference in zip(outputs, expected):
+                assert torch.equal(output, reference)
+
+    # only the output modified in place by relu1 is cloned, and nothing is kept on the module
+    assert extractor.inplace_targets == {'norm1'}
+    assert not extractor.outputs
+    print("[PASS] Truncated feature extraction")
+
+def test_prune_drops_unused_layers():
+    extractor = FeatureExtractor(build_backbone(), ['norm1', 'conv2'])
+    image = torch.rand(1, 3, 64, 64)
+    with torch.no_grad():
+        expected = extractor(image)
+        pruned = extractor.prune()
+        outputs = extractor(image)
+
+    assert pruned == ['conv3', 'fc']
+    assert isinstance(extractor.features.fc, nn.Identity)
+    for output, reference in zip(outputs, expected):
+        assert torch.equal(output, reference)
+    print("[PASS] Backbone pruning")
+
+class Yield(nn.Module):
+    def forward(self, x):
+        time.sleep(0.001)  # let other threads run between the two tapped layers
+        return x
+
+def test_concurrent_forward_passes_keep_their_outputs():
+    torch.manual_seed(0)
+    backbone = nn.Sequential(OrderedDict([
+        ('conv1', nn.Conv2d(3, 6, 3, stride=2, padding=1)),
+        ('yield', Yield()),
+        ('conv2', nn.Conv2d(6, 8, 3, stride=2, padding=1)),
+    ])).eval()
+    extractor = FeatureExtractor(backbone, ['conv1', 'conv2'])
+    images = [torch.rand(1, 3, 48 + 16 * k, 64) for k in range(4)]
+    with torch.no_grad():
+        expected = [extractor(image) for image in images]
+
+    def run(k):
+        with torch.no_grad():
+            return all(torch.equal(output, reference)
+                       for _ in range(20) for output, reference in zip(extractor(images[k]), expected[k]))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert all(pool.map(run, range(4)))
+    print("[PASS] Concurrent feature extraction")
+
+if __name__ == "__main__":
+    test_truncated_extractor_matches_full_pass()
+    test_prune_drops_unused_layers()
+    test_concurrent_forward_passes_keep_their_outputs()
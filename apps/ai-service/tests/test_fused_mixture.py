@@ -0,0 +1,199 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from deepgaze_pytorch.deepgaze2e import build_saliency_network, build_fixation_selection_network
+from deepgaze_pytorch.layers import GaussianFilterBank2d
+from deepgaze_pytorch.modules import (
+    FeatureExtractor, Finalizer, DeepGazeIIIMixture, MixtureModel, encode_scanpath_features, encode_scanpath_readout_features,
+)
+
+
+class TinyBackbone(nn.Sequential):
+    """Small stand-in for the pretrained backbones (downsamples by 16)"""
+    def __init__(self):
+        super().__init__(OrderedDict([
+            ('conv1', nn.Conv2d(3, 6, 3, stride=4, padding=1)),
+            ('relu1', nn.ReLU(inplace=True)),
+            ('conv2', nn.Conv2d(6, 10, 3, stride=4, padding=1)),
+            ('relu2', nn.ReLU(inplace=True)),
+            ('conv3', nn.Conv2d(10, 12, 3, padding=1)),
+        ]))
+
+    def forward(self, x):
+        return super().forward(x.float() / 255.0)
+
+
+def build_tiny_mixture(components=5, seed=0):
+    saliency_networks = [build_saliency_network(22) for _ in range(components)]
+    fixation_selection_networks = [build_fixation_selection_network() for _ in range(components)]
+    finalizers = [Finalizer(sigma=8.0, learn_sigma=True, saliency_map_factor=2) for _ in range(components)]
+
+    mixture = DeepGazeIIIMixture(
+        features=FeatureExtractor(TinyBackbone(), ['conv2', 'conv3']),
+        saliency_networks=saliency_networks,
+        scanpath_networks=[None] * components,
+        fixation_selection_networks=fixation_selection_networks,
+        finalizers=finalizers,
+        downsample=2,
+        readout_factor=16,
+        saliency_map_factor=2,
+        included_fixations=[],
+    )
+
+    # random parameters so that every component (and every sigma) differs
+    generator = torch.Generator().manual_seed(seed)
+    with torch.no_grad():
+        for name, parameter in mixture.named_parameters():
+            if name.endswith('sigma'):
+                parameter.copy_(1 + 4 * torch.rand(parameter.shape, generator=generator))
+            else:
+                parameter.add_(0.5 * torch.randn(parameter.shape, generator=generator))
+
+    mixture.eval()
+    return mixture
+
+
+def random_inputs(batch_size, height, width):
+    image = torch.randint(0, 255, (batch_size, 3, height, width), dtype=torch.uint8)
+    centerbias = torch.randn(batch_size, height, width, dtype=torch.float64)
+    centerbias = centerbias - centerbias.logsumexp(dim=(1, 2), keepdim=True)
+    return image, centerbias
+
+
+def test_fused_mixture_matches_eager():
+    model = MixtureModel([build_tiny_mixture(seed=0), build_tiny_mixture(seed=1)])
+    model.eval()
+    fused = model.fused()
+
+    for shape in [(2, 200, 300), (1, 123, 457)]:
+        image, centerbias = random_inputs(*shape)
+        with torch.no_grad():
+            expected = model(image, centerbias)
+            actual = fused(image, centerbias)
+
+        assert actual.shape == expected.shape
+        assert torch.allclose(actual, expected, atol=1e-4), (actual - expected).abs().max()
+
+
+def test_fused_mixture_shares_features():
+    mixture = build_tiny_mixture()
+    fused = mixture.fused()
+
+    assert fused.features is mixture.features
+    assert not fused.training
+
+
+def test_subset_shares_weights():
+    model = MixtureModel([build_tiny_mixture(seed=0), build_tiny_mixture(seed=1)])
+    model.eval()
+    image, centerbias = random_inputs(1, 200, 300)
+
+    # the full subset is the model itself
+    with torch.no_grad():
+        assert torch.allclose(model.subset()(image, centerbias), model(image, centerbias))
+
+    lite = model.subset(models=[1], components=3)
+    assert len(lite.models) == 1 and len(lite.models[0].saliency_networks) == 3
+    assert lite.models[0].features is model.models[1].features
+    assert lite.models[0].saliency_networks[2] is model.models[1].saliency_networks[2]
+
+    with torch.no_grad():
+        expected = lite(image, centerbias)
+        actual = lite.fused()(image, centerbias)
+    assert torch.allclose(actual, expected, atol=1e-4), (actual - expected).abs().max()
+
+
+def test_parallel_mixture_matches_sequential():
+    model = MixtureModel([build_tiny_mixture(seed=k) for k in range(3)]).fused()
+    parallel = model.subset()
+    parallel.parallel = 3
+    image, centerbias = random_inputs(2, 160, 224)
+
+    with torch.no_grad():
+        expected = model(image, centerbias)
+        actual = parallel(image, centerbias)
+        features = parallel.extract_features(image)
+        from_features = parallel.readout(features, centerbias)
+
+    assert torch.allclose(actual, expected, atol=1e-6)
+    assert torch.allclose(from_features, expected, atol=1e-6)
+    # the caller's no_grad carries over to the worker threads
+    assert not actual.requires_grad and not any(item.requires_grad for item in features)
+
+
+def test_low_res_mixture_matches_full_resolution():
+    mixture = build_tiny_mixture()
+    # odd sizes: the nearest upsampling repeats low resolution pixels unevenly
+    image, centerbias = random_inputs(2, 203, 301)
+
+    with torch.no_grad():
+        readout_input = mixture.extract_features(image)
+        components = []
+        for saliency_network, fixation_selection_network, finalizer in zip(
+            mixture.saliency_networks, mixture.fixation_selection_networks, mixture.finalizers
+        ):
+            x = fixation_selection_network((saliency_network(readout_input), None))
+            components.append(finalizer(x, centerbias))
+        expected = (torch.stack(components, dim=1) - np.log(len(components))).logsumexp(dim=1, keepdim=True)
+
+        actual = mixture(image, centerbias)
+        fused = mixture.fused()(image, centerbias)
+        ensemble = MixtureModel([mixture, mixture.fused()])(image, centerbias)
+
+    assert actual.shape == expected.shape == (2, 1, 203, 301)
+    assert torch.allclose(actual, expected, atol=1e-5), (actual - expected).abs().max()
+    assert torch.allclose(fused, expected, atol=1e-4)
+    assert torch.allclose(ensemble, expected, atol=1e-4)
+
+
+def test_frozen_gaussian_kernels_match_training_path():
+    finalizers = [Finalizer(sigma=sigma, learn_sigma=True, saliency_map_factor=2) for sigma in (1.0, 2.5, 1.0, 4.0)]
+    readout = torch.rand(2, len(finalizers), 40, 56)
+
+    # learnable sigma with gradients enabled builds the kernel on every call
+    expected = torch.cat([finalizer.gauss(readout[:, [k]]) for k, finalizer in enumerate(finalizers)], dim=1).detach()
+    with torch.no_grad():
+        frozen = torch.cat([finalizer.gauss(readout[:, [k]]) for k, finalizer in enumerate(finalizers)], dim=1)
+        bank = GaussianFilterBank2d([finalizer.gauss.sigma for finalizer in finalizers], truncate=3)
+        grouped = bank(readout)
+
+    assert torch.allclose(frozen, expected, atol=1e-6)
+    assert torch.allclose(grouped, expected, atol=1e-6)
+
+    # the frozen kernel follows changes of sigma
+    with torch.no_grad():
+        finalizers[0].gauss.sigma.fill_(2.5)
+        assert torch.allclose(finalizers[0].gauss(readout[:, [0]]), finalizers[1].gauss(readout[:, [0]]), atol=1e-6)
+
+
+def test_scanpath_readout_features_match_resized_full_size_features():
+    # 4 history fixations of 2 scanpaths; NaN marks a scanpath without enough fixations
+    x_hist = torch.tensor([[512.3, 80.0, 1000.5, 3.0], [20.0, float('nan'), 700.0, 640.0]])
+    y_hist = torch.tensor([[300.0, 12.7, 690.0, 400.2], [5.0, float('nan'), 100.0, 250.0]])
+
+    for size, readout_shape in [((720, 1280), (45, 80)), ((701, 1023), (44, 64))]:
+        expected = F.interpolate(encode_scanpath_features(x_hist, y_hist, size=size), readout_shape)
+        actual = encode_scanpath_readout_features(x_hist, y_hist, size=size, readout_shape=readout_shape)
+
+        assert actual.shape == expected.shape == (2, 12, *readout_shape)
+        assert torch.equal(actual.isnan(), expected.isnan())
+        assert torch.allclose(actual.nan_to_num(), expected.nan_to_num(), atol=1e-4)
+
+
+if __name__ == "__main__":
+    test_fused_mixture_matches_eager()
+    test_fused_mixture_shares_features()
+    test_subset_shares_weights()
+    test_parallel_mixture_matches_sequential()
+    test_low_res_mixture_matches_full_resolution()
+    test_frozen_gaussian_kernels_match_training_path()
+    test_scanpath_readout_features_match_resized_full_size_features()
+    print("All tests passed!")
@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from incremental import diff_regions, plan_patches, attention_delta, predict_incremental
+from test_tiled_inference import make_engine
+
+class PooledModel(torch.nn.Module):
+    """
+    Stand-in for DeepGaze: local features on a 16 px readout grid, page-wide
+    normalization in the readout (like DeepGaze's LayerNorm + softmax).
+    """
+    downsample = 2
+    readout_factor = 8
+
+    def __init__(self):
+        super().__init__()
+        self.models = [self]
+
+    def extract_features(self, x):
+        return [F.avg_pool2d(x.double(), 16, ceil_mode=True)]
+
+    def readout(self, features, centerbias):
+        x = features[0].mean(dim=1, keepdim=True)
+        x = (x - x.mean()) / (x.std() + 1e-8)
+        x = F.interpolate(x, size=list(centerbias.shape[1:]))
+        return x - torch.logsumexp(x.flatten(1), dim=1)[:, None, None, None]
+
+def test_diff_regions_and_patches():
+    previous = np.zeros((200, 300, 3), dtype=np.uint8)
+    current = previous.copy()
+    current[50:60, 40:80] = 255
+    current[150:160, 250:260] = 255
+
+    regions = diff_regions(previous, current, merge_gap=4)
+    assert sorted(regions) == [(38, 48, 44, 14), (248, 148, 14, 14)]
+    # Crops of both regions overlap with 100 px of context: merged into one patch
+    assert plan_patches(regions, (200, 300), padding=100) == [((0, 0, 300, 200), (0, 0, 300, 200))]
+    assert plan_patches(regions, (200, 300), padding=16) == [((22, 32, 76, 46), (30, 40, 60, 30)),
+                                                             ((232, 132, 46, 46), (240, 140, 30, 30))]
+    print("[PASS] Diff regions")
+
+def test_incremental_matches_full_prediction():
+    rng = np.random.RandomState(0)
+    previous = rng.randint(0, 255, size=(160, 240, 3)).astype(np.uint8)
+    current = previous.copy()
+    current[100:120, 30:70] = 255
+
+    engine = make_engine(tile_min_height=0)
+    engine.model = PooledModel()
+    engine.cache_bytes = 10 ** 8
+    previous_log_density = engine.log_density(previous)
+    full = make_engine(tile_min_height=0)
+    full.model = PooledModel()
+
+    log_density, comparison = predict_incremental(engine, current, previous, previous_log_density, padding=32)
+    assert comparison["mode"] == "incremental"
+    assert comparison["reinferred_fraction"] < 0.3
+    assert np.allclose(log_density, full.log_density(current))
+
+    delta = comparison["attention_delta"]
+    assert delta["regions"][0]["delta"] > 0 and delta["total_shift"] > 0
+    assert attention_delta(previous_log_density, previous_log_density)["total_shift"] == 0
+    print("[PASS] Incremental prediction")
+
+def test_batched_prediction_serves_as_reference():
+    rng = np.random.RandomState(1)
+    previous = rng.randint(0, 255, size=(160, 240, 3)).astype(np.uint8)
+    current = previous.copy()
+    current[20:40, 100:140] = 0
+
+    engine = make_engine(tile_min_height=0)
+    engine.model = PooledModel()
+    engine.cache_bytes = 10 ** 8
+    previous_log_density = engine.log_densities([previous], previous.shape[:2])[0]
+
+    log_density, comparison = predict_incremental(engine, current, previous, previous_log_density, padding=32)
+    assert comparison["mode"] == "incremental"
+    print("[PASS] Batched reference")
+
+if __name__ == "__main__":
+    test_diff_regions_and_patches()
+    test_incremental_matches_full_prediction()
+    test_batched_prediction_serves_as_reference()
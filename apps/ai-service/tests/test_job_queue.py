@@ -0,0 +1,68 @@
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job_queue import JobQueue, QueueFullError
+
+def wait_done(jobs, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+def test_priority_lanes_and_backpressure():
+    gate = threading.Event()
+    order = []
+
+    def handler(payload, progress):
+        gate.wait()
+        progress("working")
+        order.append(payload["name"])
+        return payload["name"]
+
+    jobs = JobQueue({"test": handler}, workers=1, max_depth=3)
+
+    # The first job occupies the only worker until the gate opens
+    blocker = jobs.submit("test", {"name": "blocker"}, plan="free")
+    while jobs.get(blocker)["status"] != "running":
+        time.sleep(0.01)
+
+    free_job = jobs.submit("test", {"name": "free"}, plan="free")
+    base_job = jobs.submit("test", {"name": "base"}, plan="base")
+    plus_job = jobs.submit("test", {"name": "plus"}, plan="plus")
+    assert jobs.get(plus_job)["position"] == 0
+    assert jobs.get(free_job)["position"] == 2
+
+    try:
+        jobs.submit("test", {"name": "overflow"}, plan="plus")
+        assert False, "Expected QueueFullError"
+    except QueueFullError:
+        pass
+
+    gate.set()
+    assert wait_done(jobs, free_job)["result"] == "free"
+    assert order == ["blocker", "plus", "base", "free"]
+
+    events, finished = jobs.events_since(plus_job, 0)
+    assert finished
+    assert [event["stage"] for event in events] == ["queued", "started", "working", "done"]
+    print("[PASS] Priority lanes and backpressure")
+
+def test_failed_job():
+    def handler(payload, progress):
+        raise RuntimeError("boom")
+
+    jobs = JobQueue({"test": handler}, workers=1)
+    job = wait_done(jobs, jobs.submit("test", {}))
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+    print("[PASS] Failed job")
+
+if __name__ == "__main__":
+    test_priority_lanes_and_backpressure()
+    test_failed_job()
@@ -0,0 +1,45 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnxscript")
+
+import numpy as np
+import torch
+
+from deepgaze_pytorch.modules import MixtureModel
+from onnx_backend import OnnxDeepGaze, export_onnx
+from test_fused_mixture import build_tiny_mixture, random_inputs
+
+def test_onnx_matches_eager_model():
+    model = MixtureModel([build_tiny_mixture(seed=0), build_tiny_mixture(seed=1)]).fused()
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        export_onnx(model, model_dir, sample_size=(256, 320))
+        onnx_model = OnnxDeepGaze(model_dir, intra_op_threads=1)
+        assert onnx_model.downsample * onnx_model.readout_factor == 32
+
+        # Dynamic batch / height / width. 256x320 is a whole number of 32 px readout cells;
+        # 200x450 isn't in height, 301x517 in neither axis (30.1 / 30.4 px per cell), so the
+        # grid is upsampled unevenly. Measured max differences (float32, eager vs ONNX
+        # Runtime): ~5e-5 at 256x320, ~2e-4 at 301x517. 2e-3 log units (0.2% relative
+        # density) leaves headroom for thread count / CPU kernel differences.
+        for batch_size, height, width, tolerance in [(1, 256, 320, 1e-3), (2, 200, 450, 1e-3), (1, 301, 517, 2e-3)]:
+            image, centerbias = random_inputs(batch_size, height, width)
+            with torch.no_grad():
+                expected = model(image, centerbias).numpy()
+            result = onnx_model(image, centerbias).numpy()
+            assert result.shape == expected.shape
+            assert np.abs(result - expected).max() < tolerance
+
+            # Cached features + readout, as used by SaliencyEngine
+            features = onnx_model.extract_features(image)
+            assert np.allclose(onnx_model.readout(features, centerbias).numpy(), result)
+    print("[PASS] ONNX parity")
+
+if __name__ == "__main__":
+    test_onnx_matches_eager_model()
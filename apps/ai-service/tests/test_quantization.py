@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import torch
+
+from deepgaze_pytorch.modules import MixtureModel
+from quantization import Bf16Backbones, bf16_supported, load_precision_model, plan_precisions
+from test_fused_mixture import build_tiny_mixture, random_inputs
+
+def test_plan_precisions():
+    assert plan_precisions("free:int8, plus:BF16,base:fp32") == {"free": "int8", "plus": "bf16", "base": "fp32"}
+    # Unknown precisions fall back to fp32, malformed entries are skipped
+    assert plan_precisions("free:fp8,plus") == {"free": "fp32"}
+    assert plan_precisions("") == {}
+    print("[PASS] Plan precisions")
+
+def test_missing_int8_model_falls_back(tmp_path):
+    model = MixtureModel([build_tiny_mixture(seed=0)])
+    assert load_precision_model("int8", model, torch.device("cpu"), onnx_dir=str(tmp_path)) is None
+    assert load_precision_model("fp32", model, torch.device("cpu")) is model
+    print("[PASS] int8 fallback")
+
+@pytest.mark.skipif(not bf16_supported(), reason="CPU has no native bf16")
+def test_bf16_backbones_close_to_fp32():
+    model = MixtureModel([build_tiny_mixture(seed=0), build_tiny_mixture(seed=1)]).fused()
+    bf16_model = Bf16Backbones(model)
+    image, centerbias = random_inputs(1, 200, 300)
+
+    with torch.no_grad():
+        expected = model(image, centerbias)
+        actual = bf16_model(image, centerbias)
+
+    assert actual.dtype == expected.dtype
+    density_error = (actual.exp() - expected.exp()).abs().sum().item()
+    assert density_error < 0.05, density_error
+    print("[PASS] bf16 backbones")
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    test_plan_precisions()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_missing_int8_model_falls_back(Path(tmp))
+    if bf16_supported():
+        test_bf16_backbones_close_to_fp32()
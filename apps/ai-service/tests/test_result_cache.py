@@ -0,0 +1,57 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from result_cache import ResultCache
+
+def make_image(seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.randint(0, 255, size=(48, 64, 3)).astype(np.uint8)
+
+def test_result_cache_hit_and_scope():
+    with tempfile.TemporaryDirectory() as tmp:
+        artifact = os.path.join(tmp, "saliency.png")
+        open(artifact, "wb").close()
+
+        cache = ResultCache(index_path=os.path.join(tmp, "index.json"))
+        key = cache.make_key(make_image(), plan="free")
+        assert cache.get(key) is None
+
+        cache.put(key, {"saliency_map_path": artifact}, files=[artifact])
+        assert cache.get(key) == {"saliency_map_path": artifact}
+
+        # Other plans, precisions and images are separate entries
+        assert cache.get(cache.make_key(make_image(), plan="pro")) is None
+        assert cache.get(cache.make_key(make_image(), plan="free", precision="int8")) is None
+        assert cache.get(cache.make_key(make_image(seed=1), plan="free")) is None
+
+        # The index survives a restart
+        reloaded = ResultCache(index_path=os.path.join(tmp, "index.json"))
+        assert reloaded.get(key) == {"saliency_map_path": artifact}
+
+        # Entries whose artifacts were deleted are dropped
+        os.remove(artifact)
+        assert reloaded.get(key) is None
+        print("[PASS] Result cache hit/miss")
+
+def test_result_cache_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(index_path=os.path.join(tmp, "index.json"), max_entries=2)
+        keys = [cache.make_key(make_image(seed), plan="free") for seed in range(3)]
+        for key in keys:
+            cache.put(key, {}, files=[])
+
+        # Oldest entry is evicted by size
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[2]) == {}
+
+        # Expired entries are evicted by age
+        cache.max_age = -1
+        assert cache.get(keys[2]) is None
+        print("[PASS] Result cache eviction")
+
+if __name__ == "__main__":
+    test_result_cache_hit_and_scope()
+    test_result_cache_eviction()
@@ -0,0 +1,108 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from centerbias import CenterBiasProvider
+from deepgaze_pytorch.deepgaze3 import build_saliency_network, build_scanpath_network, build_fixation_selection_network
+from deepgaze_pytorch.modules import FeatureExtractor, Finalizer, DeepGazeIIIMixture
+from scanpath_engine import ScanpathEngine, history, sample_fixations
+
+
+class TinyBackbone(nn.Sequential):
+    def __init__(self):
+        super().__init__(OrderedDict([
+            ('conv1', nn.Conv2d(3, 8, 3, stride=4, padding=1)),
+            ('relu1', nn.ReLU()),
+            ('conv2', nn.Conv2d(8, 12, 3, stride=2, padding=1)),
+        ]))
+
+    def forward(self, x):
+        return super().forward(x.float() / 255.0)
+
+
+def build_tiny_deepgaze3(components=3):
+    torch.manual_seed(0)
+    model = DeepGazeIIIMixture(
+        features=FeatureExtractor(TinyBackbone(), ['conv1', 'conv2']),
+        saliency_networks=[build_saliency_network(20) for _ in range(components)],
+        scanpath_networks=[build_scanpath_network() for _ in range(components)],
+        fixation_selection_networks=[build_fixation_selection_network() for _ in range(components)],
+        finalizers=[Finalizer(sigma=2.0, learn_sigma=True, saliency_map_factor=4) for _ in range(components)],
+        downsample=2,
+        readout_factor=4,
+        saliency_map_factor=4,
+        included_fixations=[-1, -2, -3, -4],
+    )
+    with torch.no_grad():
+        for name, parameter in model.named_parameters():
+            if not name.endswith('sigma'):
+                parameter.add_(0.3 * torch.randn(parameter.shape))
+    return model.eval()
+
+
+def test_cached_saliency_readout_matches_forward():
+    model = build_tiny_deepgaze3()
+    image = torch.randint(0, 255, (1, 3, 130, 170), dtype=torch.uint8)
+    centerbias = torch.zeros(2, 130, 170)
+    # a scanpath with one and one with three fixations so far
+    xs = torch.tensor([[85.0, 85.0, 85.0], [85.0, 20.0, 150.0]])
+    ys = torch.tensor([[65.0, 65.0, 65.0], [65.0, 100.0, 12.0]])
+    x_hist, y_hist = history(xs, ys, model.included_fixations)
+    x_hist[0, 1:] = y_hist[0, 1:] = float('nan')
+
+    with torch.no_grad():
+        expected = model(image.expand(2, -1, -1, -1), centerbias, x_hist=x_hist, y_hist=y_hist)
+        saliency = model.saliency_readout(model.extract_features(image))
+        actual = model.readout(None, centerbias, x_hist=x_hist, y_hist=y_hist,
+                               saliency=[item.expand(2, -1, -1, -1) for item in saliency])
+
+    # most recent fixation first, NaN before the start of the scanpath
+    assert x_hist[1, :3].tolist() == [150.0, 20.0, 85.0] and torch.isnan(x_hist[1, 3])
+    assert torch.allclose(actual, expected, atol=1e-5)
+    print("[PASS] Cached saliency readout")
+
+
+def test_sampled_fixations_follow_the_upsampled_density():
+    size = (5, 7)
+    low_res = torch.log(torch.tensor([[1.0, 2.0, 3.0], [4.0, 1.0, 5.0]]))[np.newaxis, np.newaxis]
+    full_res = F.interpolate(low_res, size=size)[0, 0]
+    expected = torch.softmax(full_res.flatten(), dim=0)
+
+    generator = torch.Generator().manual_seed(0)
+    xs, ys = sample_fixations(low_res.expand(40000, -1, -1, -1), size, generator=generator)
+    counts = torch.bincount((ys * size[1] + xs).long(), minlength=size[0] * size[1])
+
+    assert xs.min() >= 0 and xs.max() < size[1] and ys.min() >= 0 and ys.max() < size[0]
+    assert torch.allclose(counts / counts.sum(), expected, atol=0.01)
+    print("[PASS] Fixation sampling")
+
+
+def test_engine_simulates_reproducible_scanpaths():
+    engine = ScanpathEngine(model=build_tiny_deepgaze3(), centerbias=CenterBiasProvider(template=np.zeros((64, 64))),
+                            max_working_width=160)
+    img = np.random.RandomState(0).randint(0, 255, (150, 320, 3)).astype(np.uint8)
+
+    result = engine.simulate(img, scanpaths=4, fixations=5, seed=1)
+    paths = result["scanpaths"]
+
+    assert paths.shape == (4, 5, 2)
+    assert result["working_size"] == [160, 75]
+    assert np.allclose(paths[:, 0], [159.5, 74.5])  # image center
+    assert (paths[..., 0] >= -0.5).all() and (paths[..., 0] < 320).all()
+    assert (paths[..., 1] >= -0.5).all() and (paths[..., 1] < 150).all()
+    assert len(engine._cache) == 1
+    assert np.array_equal(engine.simulate(img, scanpaths=4, fixations=5, seed=1)["scanpaths"], paths)
+    print("[PASS] Scanpath simulation")
+
+
+if __name__ == "__main__":
+    test_cached_saliency_readout_matches_forward()
+    test_sampled_fixations_follow_the_upsampled_density()
+    test_engine_simulates_reproducible_scanpaths()
@@ -0,0 +1,42 @@
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stage_graph import Stage, run_stages
+
+def test_stage_graph():
+    def slow(value):
+        time.sleep(0.2)
+        return value
+
+    def fail():
+        raise RuntimeError("boom")
+
+    stages = [
+        Stage("a", lambda: slow(1)),
+        Stage("b", lambda: slow(2), lane="io"),
+        Stage("sum", lambda a, b: a + b, deps=("a", "b")),
+        Stage("optional", fail, fallback="n/a"),
+    ]
+
+    with ThreadPoolExecutor(2) as cpu, ThreadPoolExecutor(2) as io:
+        start = time.perf_counter()
+        results, timings = run_stages(stages, {"cpu": cpu, "io": io})
+        elapsed = time.perf_counter() - start
+
+        assert results == {"a": 1, "b": 2, "sum": 3, "optional": "n/a"}
+        assert set(timings) == {"a", "b", "sum", "optional"}
+        # Independent stages overlap instead of running back to back
+        assert elapsed < 0.35, f"Stages did not run concurrently ({elapsed:.2f}s)"
+
+        try:
+            run_stages([Stage("required", fail)], {"cpu": cpu})
+            assert False, "Expected the required stage to raise"
+        except RuntimeError:
+            pass
+    print("[PASS] Stage graph")
+
+if __name__ == "__main__":
+    test_stage_graph()
@@ -0,0 +1,97 @@
+import sys
+import os
+import threading
+from collections import OrderedDict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from scipy.special import logsumexp
+from saliency_engine import SaliencyEngine, _feather_weights, upsample_log_density
+from centerbias import CenterBiasProvider
+
+class RowModel(torch.nn.Module):
+    """
+    Stand-in for DeepGaze: log density proportional to the image's red channel.
+    """
+    def forward(self, x, centerbias):
+        log_density = torch.log(x[:, :1].double() + 1)
+        return log_density - torch.logsumexp(log_density.flatten(1), dim=1)[:, None, None, None]
+
+    def extract_features(self, x):
+        return x
+
+    def readout(self, features, centerbias):
+        return self(features, centerbias)
+
+def make_engine(**tiling):
+    # Skip __init__ so no DeepGaze weights are loaded
+    engine = SaliencyEngine.__new__(SaliencyEngine)
+    engine.device = torch.device("cpu")
+    engine.model = RowModel()
+    engine.centerbias = CenterBiasProvider(template=np.zeros((64, 64)))
+    engine.tile_height = tiling.get("tile_height", 100)
+    engine.tile_overlap = tiling.get("tile_overlap", 30)
+    engine.tile_min_height = tiling.get("tile_min_height", 150)
+    engine.memory_budget = tiling.get("memory_budget", 10 ** 9)
+    engine.bytes_per_pixel = 400
+    engine.max_working_width = tiling.get("max_working_width", 0)
+    engine.cache_bytes = 0
+    engine._cache_lock = threading.Lock()
+    engine._cache = OrderedDict()
+    engine._cache_size = 0
+    return engine
+
+def test_feather_weights_partition_of_unity():
+    upper = _feather_weights(100, 0, 30)
+    lower = _feather_weights(100, 30, 0)
+    assert np.allclose(upper[70:] + lower[:30], 1)
+    assert upper[:70].min() == 1 and lower[30:].min() == 1
+    print("[PASS] Feather weights")
+
+def test_tiled_log_density():
+    rng = np.random.RandomState(0)
+    # Row-constant image so every tile agrees on the shared rows
+    rows = rng.randint(0, 255, size=(437, 1, 1))
+    img = np.repeat(np.repeat(rows, 20, axis=1), 3, axis=2).astype(np.uint8)
+
+    # Small budget: tiles and tile batches are sized to it
+    engine = make_engine(memory_budget=100 * 20 * 400 * 2)
+    assert engine.needs_tiling(437, 20) and not engine.needs_tiling(150, 20)
+    tile_h, starts = engine.tile_layout(437, 20)
+    assert tile_h == 100 and starts[0] == 0 and starts[-1] == 437 - tile_h
+    assert all(b - a <= tile_h - 30 for a, b in zip(starts, starts[1:]))
+
+    log_density = engine.log_density_tiled(img)
+    assert log_density.shape == (437, 20)
+    assert abs(logsumexp(log_density)) < 1e-4
+
+    # Within-row values are uniform and the ordering of rows follows the image
+    assert np.allclose(log_density, log_density[:, :1], atol=1e-5)
+    assert np.corrcoef(log_density[:, 0], np.log(rows[:, 0, 0] + 1))[0, 1] > 0.99
+    print("[PASS] Tiled log density")
+
+def test_working_resolution():
+    rng = np.random.RandomState(1)
+    rows = np.repeat(rng.randint(0, 255, size=(30, 1, 1)), 10, axis=0)
+    img = np.repeat(np.repeat(rows, 200, axis=1), 3, axis=2).astype(np.uint8)
+
+    engine = make_engine(max_working_width=100, tile_min_height=0)
+    assert engine.working_size(300, 200) == (150, 100)
+    assert engine.inference_info(300, 200) == {"scale": 0.5, "working_size": [100, 150], "tiled": False}
+    assert not engine.batchable(300, 200) and engine.batchable(150, 100)
+
+    log_density = engine.log_density(img)
+    full = make_engine(tile_min_height=0).log_density(img)
+    assert log_density.shape == full.shape == (300, 200)
+    assert abs(logsumexp(log_density)) < 1e-4
+    assert np.abs(np.exp(log_density) - np.exp(full)).sum() < 0.05
+
+    upsampled = upsample_log_density(np.full((10, 10), -np.log(100)), (40, 30))
+    assert np.allclose(upsampled, -np.log(1200), atol=1e-5)
+    print("[PASS] Working resolution")
+
+if __name__ == "__main__":
+    test_feather_weights_partition_of_unity()
+    test_tiled_log_density()
+    test_working_resolution()
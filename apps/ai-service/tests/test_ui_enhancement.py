@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+from ui_enhancement import UIEnhancer, blur
+
+def test_f_pattern_matches_blurred_grid():
+    h, w = 230, 170
+    y_coords, x_coords = np.ogrid[:h, :w]
+    grid = (1.0 - (x_coords / w) * 0.5) * (1.0 - (y_coords / h) * 0.6)
+    expected = gaussian_filter(grid, sigma=min(h, w) // 10)
+
+    assert np.allclose(UIEnhancer().f_pattern(h, w), expected, atol=1e-6)
+    print("[PASS] Separable F-pattern")
+
+def test_reduced_resolution_blur():
+    rng = np.random.RandomState(0)
+    image = (rng.rand(300, 200) > 0.7).astype(np.float32)
+
+    for sigma in (1, 5, 25):
+        expected = gaussian_filter(image.astype(np.float64), sigma=sigma)
+        result = blur(image, sigma)
+        assert result.dtype == np.float32 and result.shape == image.shape
+        assert np.abs(result - expected).max() < 0.05, sigma
+        assert np.abs(result - expected).mean() < 0.01, sigma
+    print("[PASS] Reduced resolution blur")
+
+def test_enhance_normalizes():
+    rng = np.random.RandomState(1)
+    saliency = rng.rand(120, 90).astype(np.float32)
+    gray = rng.randint(0, 255, size=(120, 90)).astype(np.uint8)
+
+    enhanced = UIEnhancer().enhance(saliency, gray, faces=[(10, 10, 40, 40)])
+    assert enhanced.dtype == np.float32
+    assert abs(enhanced.min()) < 1e-6 and abs(enhanced.max() - 1) < 1e-4
+    print("[PASS] Enhancement normalization")
+
+if __name__ == "__main__":
+    test_f_pattern_matches_blurred_grid()
+    test_reduced_resolution_blur()
+    test_enhance_normalizes()
@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import io
+import json
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import JSONResponse
+
+from upload_ingest import RequestSizeLimit, RequestTooLarge, UploadTooLarge, ingest_upload
+
+
+class FakeUploadFile:
+    def __init__(self, data, filename):
+        self.filename = filename
+        self._buffer = io.BytesIO(data)
+
+    async def read(self, size=-1):
+        return self._buffer.read(size)
+
+
+def jpeg_bytes(width, height):
+    img = np.random.RandomState(0).randint(0, 255, (height, width, 3)).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(img).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def post_chunked(app, chunks, headers=()):
+    """
+    Sends `chunks` to an ASGI app one receive() at a time, like a chunked upload.
+    Returns (status code, JSON body, number of chunks the app received).
+    """
+    pending = list(chunks)
+    messages = []
+
+    async def receive():
+        if not pending:
+            return {"type": "http.disconnect"}
+        chunk = pending.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+             "path": "/upload", "raw_path": b"/upload", "root_path": "", "query_string": b"",
+             "headers": [(b"content-type", b"multipart/form-data; boundary=b"), *headers],
+             "client": ("test", 1), "server": ("test", 80)}
+    asyncio.run(app(scope, receive, send))
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return messages[0]["status"], json.loads(body), len(chunks) - len(pending)
+
+
+def test_chunked_request_is_capped_while_received():
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimit, max_bytes=4096)
+    calls = []
+
+    @app.exception_handler(RequestTooLarge)
+    async def request_too_large(request, exc):
+        return JSONResponse(status_code=413, content={"success": False, "error": exc.detail})
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        calls.append(file.filename)
+        return {"success": True}
+
+    def multipart(kilobytes):
+        header = b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+        return [header] + [b"x" * 1024] * kilobytes + [b"\r\n--b--\r\n"]
+
+    assert post_chunked(app, multipart(2))[:2] == (200, {"success": True})
+    status, body, received = post_chunked(app, multipart(100))
+    assert status == 413 and body["success"] is False
+    # the multipart parser stopped reading at the cap, and the endpoint never ran
+    assert received <= 6 and calls == ["a.png"]
+    # a declared Content-Length over the cap is rejected before reading anything
+    assert post_chunked(app, multipart(2), headers=[(b"content-length", b"5000")])[::2] == (413, 0)
+    print("[PASS] Request size cap")
+
+
+def test_upload_is_persisted_in_its_native_format():
+    data = jpeg_bytes(64, 48)
+    with tempfile.TemporaryDirectory() as upload_dir:
+        upload = asyncio.run(ingest_upload(FakeUploadFile(data, "photo.JPG"), upload_dir=upload_dir))
+
+        assert upload.image.shape == (48, 64, 3)
+        assert upload.wait().endswith(".jpg")
+        with open(upload.path, "rb") as f:
+            assert f.read() == data
+        assert os.listdir(upload_dir) == [os.path.basename(upload.path)]
+    print("[PASS] Native format persistence")
+
+
+def test_oversized_upload_is_rejected():
+    with tempfile.TemporaryDirectory() as upload_dir:
+        try:
+            asyncio.run(ingest_upload(FakeUploadFile(b"x" * 3000, "big.png"), upload_dir=upload_dir, max_bytes=2048))
+            assert False, "expected UploadTooLarge"
+        except UploadTooLarge:
+            pass
+        assert os.listdir(upload_dir) == []
+    print("[PASS] Upload size cap")
+
+
+if __name__ == "__main__":
+    test_chunked_request_is_capped_while_received()
+    test_upload_is_persisted_in_its_native_format()
+    test_oversized_upload_is_rejected()
@@ -0,0 +1,156 @@
+"""
+Upload ingestion.
+
+Request bodies are capped as they arrive (`RequestSizeLimit`), and each
+upload is read once, in chunks, and rejected past the per-file cap. Its
+original bytes are written to uploads/ in the background, in their native
+format (no PNG re-encode). The pipeline decodes the upload once, in memory,
+at full size (the overlay, the report and the scanpaths refer to the stored
+original), and hands that array to the models and the report, so nothing
+re-reads the upload from disk.
+"""
+
+import io
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+# Per-file cap (413 above it) and chunk size of the capped read
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_MB", 25)) * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# Whole-request cap (several files in a batch)
+MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_MB", 100)) * 1024 * 1024
+
+_persist_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-persist")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class RequestTooLarge(HTTPException):
+    def __init__(self, max_bytes):
+        # An HTTPException, so FastAPI re-raises it from the body parsing instead of answering 400
+        super().__init__(status_code=413, detail=f"Request exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+
+class RequestSizeLimit:
+    def __init__(self, app, max_bytes=None):
+        """
+        ASGI middleware capping request bodies at `max_bytes` (default: MAX_REQUEST_BYTES).
+
+        A larger Content-Length is answered with 413 before the body is read. Bodies
+        without one (chunked) are counted as they are received: the multipart parser
+        stops spooling at the limit and RequestTooLarge propagates (main.py turns it
+        into the 413 response).
+        """
+        self.app = app
+        self.max_bytes = max_bytes or MAX_REQUEST_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(status_code=413, content={"success": False, "error": RequestTooLarge(self.max_bytes).detail})
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def receive_capped():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise RequestTooLarge(self.max_bytes)
+            return message
+
+        await self.app(scope, receive_capped, send)
+
+
+async def read_upload(file, max_bytes=None):
+    """
+    Reads an UploadFile in chunks. Raises UploadTooLarge as soon as it exceeds `max_bytes`.
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def decode_image(source):
+    """
+    Decodes image bytes or an image file to an (H, W, 3) RGB array (the first frame of animations).
+    """
+    try:
+        img = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        return np.array(img.convert("RGB"))
+    except Exception as e:
+        raise ValueError(f"Could not process image: {e}")
+
+
+def _write(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class Upload:
+    def __init__(self, data, path):
+        """
+        An ingested upload: `path` it is persisted to (in the background) and its
+        decoded `image`. Use `wait` before reading the file from disk.
+        """
+        self.path = path
+        self._data = data
+        self._image = None
+        self._lock = threading.Lock()
+        self._write = _persist_pool.submit(_write, path, data)
+
+    @property
+    def image(self):
+        """
+        (H, W, 3) RGB array, decoded on first access.
+        """
+        if self._image is None:
+            with self._lock:
+                if self._image is None:
+                    self._image = decode_image(self._data)
+                    self._data = None
+        return self._image
+
+    def wait(self):
+        """
+        Blocks until the original is on disk; returns its path.
+        """
+        self._write.result()
+        return self.path
+
+
+async def ingest_upload(file, upload_dir="uploads", max_bytes=None):
+    """
+    Reads an UploadFile (capped, see `read_upload`) and starts persisting it
+    under `upload_dir` with a UUID name and its original extension.
+    """
+    data = await read_upload(file, max_bytes)
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = os.path.splitext(file.filename or "")[1].lower() or ".png"
+    return Upload(data, f"{upload_dir}/{uuid.uuid4()}{extension}")